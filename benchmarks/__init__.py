@@ -0,0 +1 @@
+# benchmarks : mesures de performance hors ligne (sans webcam ni modèles YOLO)
@@ -0,0 +1,233 @@
+# benchmarks/bench_pipeline.py (Débit et latences p50/p95/p99 de chaque étape du pipeline)
+#
+# Utilisation (depuis la racine du projet) :
+#   python -m benchmarks.bench_pipeline                  # mesure et compare à la référence
+#   python -m benchmarks.bench_pipeline --enregistrer    # mesure et enregistre la référence
+#   python -m benchmarks.bench_pipeline --video cours.mp4 --etapes visages
+
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+
+import numpy as np
+
+import reconnaissance_faciale
+import suivi
+from detection_bras_lever import est_bras_leve, est_debout, analyser_postures_batch
+from benchmarks.donnees_synthetiques import (
+    generer_keypoints, boites_depuis_keypoints, generer_frame, lire_frames_video, generer_base_visages
+)
+from benchmarks.modele_stub import ModeleStub
+
+CHEMIN_REFERENCE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+NB_PERSONNES = [1, 10, 30, 60]
+RESOLUTIONS = [(640, 480), (1280, 720), (1920, 1080)]
+TAILLES_BASE = [10, 50]
+
+
+def mesurer(fonction, repetitions, echauffement=2):
+    """Exécute `fonction` plusieurs fois et retourne les durées (s) de chaque appel."""
+    for _ in range(echauffement):
+        fonction()
+    durees = np.empty(repetitions, dtype=np.float64)
+    for k in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees[k] = time.perf_counter() - debut
+    return durees
+
+
+def resumer(durees, elements_par_appel=1):
+    p50, p95, p99 = np.percentile(durees, [50, 95, 99]) * 1000.0
+    return {
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "appels_par_s": float(1.0 / durees.mean()),
+        "elements_par_s": float(elements_par_appel / durees.mean()),
+    }
+
+
+# --- Étapes mesurées ---
+
+def bench_postures(repetitions):
+    resultats = {}
+    for nb in NB_PERSONNES:
+        keypoints = generer_keypoints(nb)
+
+        def scalaires():
+            for personne in keypoints:
+                est_bras_leve(personne, bras="droit", seuil_y=10)
+                est_bras_leve(personne, bras="gauche", seuil_y=10)
+                est_debout(personne)
+
+        resultats[f"postures_scalaires[P={nb}]"] = resumer(mesurer(scalaires, repetitions), nb)
+        resultats[f"postures_batch[P={nb}]"] = resumer(
+            mesurer(lambda: analyser_postures_batch(keypoints, seuil_y=10), repetitions), nb
+        )
+    return resultats
+
+
+def bench_suivi(repetitions):
+    resultats = {}
+    for nb in NB_PERSONNES:
+        keypoints = generer_keypoints(nb)
+        boites = boites_depuis_keypoints(keypoints)
+        tracker = suivi.SuiviMultiObjets()
+        decalage = np.zeros(4, dtype=np.float32)
+
+        def mise_a_jour():
+            decalage[:] += 1.0
+            tracker.mettre_a_jour(boites + decalage, keypoints)
+
+        resultats[f"suivi[P={nb}]"] = resumer(mesurer(mise_a_jour, repetitions), nb)
+    return resultats
+
+
+def bench_visages(repetitions, video=None):
+    cascade = reconnaissance_faciale.charger_haarcascade(reconnaissance_faciale.HAAR_CASCADE_PATH)
+    if cascade is None:
+        return {}
+
+    resultats = {}
+    with tempfile.TemporaryDirectory() as dossier:
+        reconnaissance_faciale.preparer_base_de_donnees_visages(
+            generer_base_visages(dossier, 10), dossier_cache=None
+        )
+
+        for largeur, hauteur in RESOLUTIONS:
+            frame = generer_frame(largeur, hauteur, nb_personnes=10)
+            keypoints = generer_keypoints(10, largeur, hauteur)
+            cle = f"{largeur}x{hauteur}"
+            resultats[f"visages_plein_cadre[{cle}]"] = resumer(mesurer(
+                lambda: reconnaissance_faciale.detecter_et_identifier_visages(frame, cascade), repetitions
+            ))
+            recherche = reconnaissance_faciale.RechercheVisagesGuidee(periode_scan_complet=10**9)
+            resultats[f"visages_guides[{cle}]"] = resumer(mesurer(
+                lambda: reconnaissance_faciale.detecter_et_identifier_visages(
+                    frame, cascade, recherche_guidee=recherche, keypoints=keypoints
+                ), repetitions
+            ))
+
+        if video:
+            frames = lire_frames_video(video, nb_frames=repetitions)
+            if frames:
+                indice = {"k": 0}
+
+                def frame_suivante():
+                    reconnaissance_faciale.detecter_et_identifier_visages(frames[indice["k"] % len(frames)], cascade)
+                    indice["k"] += 1
+
+                resultats["visages_video"] = resumer(mesurer(frame_suivante, repetitions))
+    return resultats
+
+
+def bench_preparation_base(repetitions):
+    resultats = {}
+    for nb in TAILLES_BASE:
+        with tempfile.TemporaryDirectory() as dossier:
+            generer_base_visages(dossier, nb)
+            durees = mesurer(
+                lambda: reconnaissance_faciale.preparer_base_de_donnees_visages(dossier, dossier_cache=None),
+                max(1, repetitions // 10), echauffement=0
+            )
+            resultats[f"preparation_base[N={nb}]"] = resumer(durees, nb)
+    return resultats
+
+
+def bench_inference_stub(repetitions):
+    import test1 # Import local : Ultralytics n'est requis que pour cette étape
+
+    resultats = {}
+    for nb in NB_PERSONNES:
+        modele = ModeleStub(nb_personnes=nb)
+        frame = generer_frame(1280, 720, nb_personnes=0)
+        resultats[f"inference_stub[P={nb}]"] = resumer(
+            mesurer(lambda: test1.executer_inference_frame(modele, frame), repetitions), nb
+        )
+    return resultats
+
+
+ETAPES = {
+    "postures": bench_postures,
+    "suivi": bench_suivi,
+    "visages": bench_visages,
+    "preparation_base": bench_preparation_base,
+    "inference_stub": bench_inference_stub,
+}
+
+
+# --- Référence et régressions ---
+
+def comparer_reference(resultats, reference, tolerance):
+    """Retourne la liste des mesures dont la latence p50 dépasse la référence de plus de `tolerance`."""
+    regressions = []
+    for cle, mesure in resultats.items():
+        ancienne = reference.get("mesures", {}).get(cle)
+        if ancienne and mesure["p50_ms"] > ancienne["p50_ms"] * (1.0 + tolerance):
+            regressions.append((cle, ancienne["p50_ms"], mesure["p50_ms"]))
+    return regressions
+
+
+def afficher(resultats, reference=None):
+    anciennes = (reference or {}).get("mesures", {})
+    print(f"{'étape':<34}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'éléments/s':>14}{'vs réf.':>10}")
+    for cle, mesure in resultats.items():
+        ecart = ""
+        if cle in anciennes and anciennes[cle]["p50_ms"] > 0:
+            ecart = f"{mesure['p50_ms'] / anciennes[cle]['p50_ms'] - 1.0:+.0%}"
+        print(
+            f"{cle:<34}{mesure['p50_ms']:>10.3f}{mesure['p95_ms']:>10.3f}{mesure['p99_ms']:>10.3f}"
+            f"{mesure['elements_par_s']:>14.0f}{ecart:>10}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks hors ligne des étapes du pipeline.")
+    parser.add_argument("--etapes", nargs="+", choices=sorted(ETAPES), default=sorted(ETAPES))
+    parser.add_argument("--repetitions", type=int, default=50)
+    parser.add_argument("--video", default=None, help="Vidéo enregistrée pour l'étape visages.")
+    parser.add_argument("--reference", default=CHEMIN_REFERENCE)
+    parser.add_argument("--enregistrer", action="store_true", help="Enregistre les mesures comme nouvelle référence.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Hausse de p50 tolérée avant de signaler une régression.")
+    args = parser.parse_args()
+
+    resultats = {}
+    for nom in args.etapes:
+        print(f"Mesure de l'étape '{nom}'...")
+        try:
+            if nom == "visages":
+                resultats.update(bench_visages(args.repetitions, args.video))
+            else:
+                resultats.update(ETAPES[nom](args.repetitions))
+        except ImportError as e:
+            print(f"  étape ignorée : {e}")
+
+    reference = None
+    if os.path.exists(args.reference):
+        with open(args.reference, encoding="utf-8") as f:
+            reference = json.load(f)
+
+    print()
+    afficher(resultats, reference)
+
+    if args.enregistrer:
+        with open(args.reference, "w", encoding="utf-8") as f:
+            json.dump({"machine": platform.platform(), "mesures": resultats}, f, indent=2)
+        print(f"\nRéférence enregistrée dans {args.reference}")
+    elif reference:
+        regressions = comparer_reference(resultats, reference, args.tolerance)
+        if regressions:
+            print("\nRÉGRESSIONS :")
+            for cle, avant, apres in regressions:
+                print(f"  {cle} : p50 {avant:.3f} ms -> {apres:.3f} ms")
+            raise SystemExit(1)
+        print("\nAucune régression par rapport à la référence.")
+
+
+if __name__ == "__main__":
+    main()
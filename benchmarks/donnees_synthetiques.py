@@ -0,0 +1,107 @@
+# benchmarks/donnees_synthetiques.py (Générateurs de données de test reproductibles)
+
+import os
+
+import cv2
+import numpy as np
+
+# Squelette COCO de référence (personne assise, ~100 px de haut), centré en (0, 0)
+_SQUELETTE_ASSIS = np.array([
+    [0, -45], [-4, -49], [4, -49], [-9, -47], [9, -47],       # nez, yeux, oreilles
+    [-18, -30], [18, -30], [-24, -8], [24, -8],               # épaules, coudes
+    [-22, 12], [22, 12], [-12, 10], [12, 10],                 # poignets, hanches
+    [-14, 14], [14, 14], [-14, 40], [14, 40],                 # genoux, chevilles
+], dtype=np.float32)
+
+
+def generer_keypoints(nb_personnes, largeur=1280, hauteur=720, proportion_bras_leves=0.2,
+                      proportion_debout=0.1, graine=0):
+    """
+    Génère un tenseur de keypoints (P, 17, 3) plausible pour une salle de classe.
+
+    Une partie des personnes a un bras levé ou est debout, afin que toutes les branches
+    de est_bras_leve / est_debout soient exercées. Résultat déterministe pour une graine donnée.
+    """
+    rng = np.random.default_rng(graine)
+    echelles = rng.uniform(0.6, 1.6, nb_personnes).astype(np.float32)
+    centres = np.stack([
+        rng.uniform(50, largeur - 50, nb_personnes),
+        rng.uniform(80, hauteur - 80, nb_personnes),
+    ], axis=1).astype(np.float32)
+
+    xy = np.repeat(_SQUELETTE_ASSIS[np.newaxis], nb_personnes, axis=0)
+
+    # Bras levés : poignet au-dessus de l'épaule
+    leves = rng.random(nb_personnes) < proportion_bras_leves
+    cote = rng.integers(0, 2, nb_personnes)
+    xy[leves & (cote == 0), 9, 1] = -70
+    xy[leves & (cote == 1), 10, 1] = -70
+
+    # Debout : genoux nettement sous les hanches
+    debout = rng.random(nb_personnes) < proportion_debout
+    xy[debout, 13:15, 1] = 45
+    xy[debout, 15:17, 1] = 80
+
+    xy = xy * echelles[:, np.newaxis, np.newaxis] + centres[:, np.newaxis, :]
+    xy += rng.normal(0, 1.5, xy.shape).astype(np.float32)
+    confiance = rng.uniform(0.5, 1.0, (nb_personnes, 17, 1)).astype(np.float32)
+    return np.concatenate([xy, confiance], axis=2)
+
+
+def boites_depuis_keypoints(keypoints):
+    """Boîtes (P, 4) englobant les keypoints, comme celles du modèle de pose."""
+    if keypoints.shape[0] == 0:
+        return np.empty((0, 4), dtype=np.float32)
+    mins = keypoints[:, :, :2].min(axis=1) - 5
+    maxs = keypoints[:, :, :2].max(axis=1) + 5
+    return np.concatenate([mins, maxs], axis=1).astype(np.float32)
+
+
+def generer_frame(largeur=1280, hauteur=720, nb_personnes=10, graine=0):
+    """Frame BGR synthétique : fond texturé et silhouettes (têtes et corps) aux positions des keypoints."""
+    rng = np.random.default_rng(graine)
+    frame = cv2.GaussianBlur(rng.integers(60, 200, (hauteur, largeur, 3), dtype=np.uint8), (0, 0), 5)
+    keypoints = generer_keypoints(nb_personnes, largeur, hauteur, graine=graine)
+    for personne in keypoints:
+        tete = tuple(int(v) for v in personne[0, :2])
+        rayon = max(6, int(abs(personne[6, 0] - personne[5, 0]) * 0.45))
+        cv2.circle(frame, tete, rayon, (150, 170, 200), -1)
+        cv2.circle(frame, (tete[0] - rayon // 3, tete[1] - rayon // 4), max(1, rayon // 6), (40, 40, 40), -1)
+        cv2.circle(frame, (tete[0] + rayon // 3, tete[1] - rayon // 4), max(1, rayon // 6), (40, 40, 40), -1)
+        x1, y1 = personne[:, :2].min(axis=0).astype(int)
+        x2, y2 = personne[:, :2].max(axis=0).astype(int)
+        cv2.rectangle(frame, (x1, tete[1] + rayon), (x2, y2), (90, 60, 40), -1)
+    return frame
+
+
+def lire_frames_video(chemin, nb_frames=50, largeur=None):
+    """Lit les premières frames d'une vidéo enregistrée (redimensionnées à `largeur` si fourni)."""
+    cap = cv2.VideoCapture(chemin)
+    frames = []
+    while len(frames) < nb_frames:
+        success, frame = cap.read()
+        if not success:
+            break
+        if largeur:
+            hauteur = int(frame.shape[0] * largeur / frame.shape[1])
+            frame = cv2.resize(frame, (largeur, hauteur))
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def generer_base_visages(dossier, nb_personnes, images_par_personne=5, taille=200, graine=0):
+    """
+    Crée une base de visages factice (un sous-dossier par personne) au format attendu par
+    reconnaissance_faciale.preparer_base_de_donnees_visages. Chaque personne a sa propre
+    texture, déclinée avec variations d'éclairage et de bruit.
+    """
+    rng = np.random.default_rng(graine)
+    for p in range(nb_personnes):
+        dossier_personne = os.path.join(dossier, f"eleve_{p:04d}")
+        os.makedirs(dossier_personne, exist_ok=True)
+        base = cv2.GaussianBlur(rng.integers(0, 255, (taille, taille), dtype=np.uint8), (0, 0), 3)
+        for i in range(images_par_personne):
+            image = base.astype(np.float32) * rng.uniform(0.7, 1.2) + rng.normal(0, 6, base.shape)
+            cv2.imwrite(os.path.join(dossier_personne, f"{i:03d}.png"), np.clip(image, 0, 255).astype(np.uint8))
+    return dossier
@@ -0,0 +1,93 @@
+# benchmarks/modele_stub.py (Modèle factice au format des résultats Ultralytics)
+
+import time
+
+import numpy as np
+
+from benchmarks.donnees_synthetiques import generer_keypoints, boites_depuis_keypoints
+
+
+class _TenseurStub:
+    """Imite un tenseur torch juste assez pour .cpu().numpy() et .shape."""
+
+    def __init__(self, tableau):
+        self._tableau = tableau
+        self.shape = tableau.shape
+
+    def __getitem__(self, index):
+        return _TenseurStub(self._tableau[index])
+
+    def __len__(self):
+        return len(self._tableau)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self._tableau
+
+
+class _KeypointsStub:
+    def __init__(self, keypoints):
+        self.data = _TenseurStub(keypoints)
+
+    def __bool__(self):
+        return True
+
+
+class _BoxesStub:
+    def __init__(self, boites, classes, scores):
+        self.data = _TenseurStub(np.concatenate([boites, scores[:, np.newaxis], classes[:, np.newaxis]], axis=1))
+        self.xyxy = _TenseurStub(boites)
+        self.cls = _TenseurStub(classes)
+        self.conf = _TenseurStub(scores)
+
+
+class ResultStub:
+    """Résultat d'une frame : mêmes attributs que ultralytics.engine.results.Results (boxes, keypoints)."""
+
+    def __init__(self, keypoints, task="pose"):
+        boites = boites_depuis_keypoints(keypoints)
+        self.boxes = _BoxesStub(
+            boites,
+            np.zeros(len(boites), dtype=np.float32),
+            np.full(len(boites), 0.9, dtype=np.float32),
+        )
+        self.keypoints = _KeypointsStub(keypoints) if task == "pose" else None
+
+
+class ModeleStub:
+    """
+    Remplaçant déterministe d'un modèle YOLO pour test1.executer_inference_frame.
+
+    Pour une frame donnée, retourne toujours les mêmes `nb_personnes` squelettes (la graine
+    dépend de la taille de la frame et de quelques pixels). Un coût fixe par appel et par
+    mégapixel peut être simulé pour étudier l'effet du batching sans vrai modèle.
+    """
+
+    def __init__(self, nb_personnes=10, task="pose", cout_appel_ms=0.0, cout_mpx_ms=0.0):
+        self.nb_personnes = nb_personnes
+        self.task = task
+        self.cout_appel_ms = cout_appel_ms
+        self.cout_mpx_ms = cout_mpx_ms
+
+    def _graine(self, frame):
+        echantillon = frame.reshape(-1)[::max(1, frame.size // 64)][:64]
+        return int(frame.shape[0] * 7919 + frame.shape[1] + int(echantillon.sum()))
+
+    def __call__(self, frames, **options):
+        if isinstance(frames, np.ndarray):
+            frames = [frames]
+
+        mpx = sum(frame.shape[0] * frame.shape[1] for frame in frames) / 1e6
+        cout = self.cout_appel_ms + self.cout_mpx_ms * mpx
+        if cout > 0:
+            time.sleep(cout / 1000.0)
+
+        return [
+            ResultStub(
+                generer_keypoints(self.nb_personnes, frame.shape[1], frame.shape[0], graine=self._graine(frame)),
+                self.task,
+            )
+            for frame in frames
+        ]
@@ -0,0 +1,418 @@
+# comportement.py (Analyse temporelle des comportements par élève suivi : événements et agrégats)
+
+import argparse
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from detection_bras_lever import analyser_postures_batch
+
+# Comportements suivis (une colonne des tampons circulaires chacun) et événements émis
+# lors de leurs changements d'état : (comportement, nouvel état) -> nom de l'événement
+COMPORTEMENTS = ("main_levee", "debout")
+EVENEMENTS = {
+    ("main_levee", True): "main_levee_debut",
+    ("main_levee", False): "main_levee_fin",
+    ("debout", True): "leve",
+    ("debout", False): "assis",
+}
+
+# Durée (s) pendant laquelle la condition de bascule doit tenir avant que l'état change
+DUREES_MIN_DEBUT = {"main_levee": 0.5, "debout": 1.0}
+DUREES_MIN_FIN = {"main_levee": 0.5, "debout": 1.0}
+
+
+class AgregatsEleve:
+    """Compteurs cumulés d'une personne suivie, mis à jour à chaque événement."""
+
+    __slots__ = (
+        "piste", "identite", "premiere_vue", "derniere_vue",
+        "nb_mains_levees", "duree_main_levee", "nb_leves", "duree_debout",
+    )
+
+    def __init__(self, piste, t):
+        self.piste = piste
+        self.identite = None
+        self.premiere_vue = t
+        self.derniere_vue = t
+        self.nb_mains_levees = 0
+        self.duree_main_levee = 0.0
+        self.nb_leves = 0
+        self.duree_debout = 0.0
+
+    def en_dict(self):
+        return {nom: getattr(self, nom) for nom in self.__slots__}
+
+
+class AnalyseComportements:
+    """
+    Transforme les postures image par image en événements débruités par personne suivie.
+
+    Pour chaque piste, un tampon circulaire de `taille_historique` frames garde l'état brut
+    de chaque comportement (analyser_postures_batch) ; sa somme glissante est tenue à jour
+    à chaque frame. Un comportement passe à vrai quand la part de frames vraies de la
+    fenêtre atteint `seuil_haut`, à faux quand elle retombe à `seuil_bas` (hystérésis), et
+    seulement si la condition a tenu la durée minimale du comportement (DUREES_MIN_DEBUT /
+    DUREES_MIN_FIN). L'instant de l'événement est celui où la condition a commencé.
+
+    Une piste absente depuis plus de `delai_disparition` secondes est close (ses états
+    ouverts émettent leur événement de fin) et sa place dans les tampons est recyclée.
+
+    Args:
+        ecrivain (EcrivainEvenements): Destination des événements (None = seulement retournés).
+        seuil_y, seuil_ratio, seuil_confiance: Seuils de analyser_postures_batch.
+    """
+
+    def __init__(self, ecrivain=None, taille_historique=15, seuil_haut=0.6, seuil_bas=0.3,
+                 delai_disparition=2.0, seuil_y=10, seuil_ratio=0.5, seuil_confiance=0.7, capacite=32):
+        self.ecrivain = ecrivain
+        self.taille_historique = taille_historique
+        self.seuil_haut = seuil_haut
+        self.seuil_bas = seuil_bas
+        self.delai_disparition = delai_disparition
+        self.seuil_y = seuil_y
+        self.seuil_ratio = seuil_ratio
+        self.seuil_confiance = seuil_confiance
+        self.durees_min_debut = np.array([DUREES_MIN_DEBUT[c] for c in COMPORTEMENTS])
+        self.durees_min_fin = np.array([DUREES_MIN_FIN[c] for c in COMPORTEMENTS])
+
+        self._slots = {} # piste -> ligne des tableaux d'état
+        self._pistes = np.full(0, -1, dtype=np.int64)
+        self._libres = []
+        self._allouer(capacite)
+        self.agregats = {}
+        self.nb_evenements = 0
+
+    def _allouer(self, capacite):
+        """Agrandit les tableaux d'état à `capacite` lignes (les lignes existantes sont conservées)."""
+        ancienne = self._pistes.shape[0]
+        nb_comportements = len(COMPORTEMENTS)
+
+        def agrandir(tableau, forme, valeur, dtype):
+            nouveau = np.full((capacite,) + forme, valeur, dtype=dtype)
+            if ancienne:
+                nouveau[:ancienne] = tableau
+            return nouveau
+
+        self._historique = agrandir(getattr(self, "_historique", None), (self.taille_historique, nb_comportements), 0, np.uint8)
+        self._positions = agrandir(getattr(self, "_positions", None), (), 0, np.intp)
+        self._remplis = agrandir(getattr(self, "_remplis", None), (), 0, np.int32)
+        self._sommes = agrandir(getattr(self, "_sommes", None), (nb_comportements,), 0, np.int32)
+        self._etats = agrandir(getattr(self, "_etats", None), (nb_comportements,), False, bool)
+        self._candidats = agrandir(getattr(self, "_candidats", None), (nb_comportements,), np.nan, np.float64)
+        self._debuts = agrandir(getattr(self, "_debuts", None), (nb_comportements,), np.nan, np.float64)
+        self._derniere_vue = agrandir(getattr(self, "_derniere_vue", None), (), np.nan, np.float64)
+        self._pistes = agrandir(self._pistes, (), -1, np.int64)
+        self._libres.extend(range(capacite - 1, ancienne - 1, -1))
+
+    def _slot(self, piste, t):
+        slot = self._slots.get(piste)
+        if slot is None:
+            if not self._libres:
+                self._allouer(2 * self._pistes.shape[0])
+            slot = self._libres.pop()
+            self._slots[piste] = slot
+            self._pistes[slot] = piste
+            self._historique[slot] = 0
+            self._positions[slot] = 0
+            self._remplis[slot] = 0
+            self._sommes[slot] = 0
+            self._etats[slot] = False
+            self._candidats[slot] = np.nan
+            self._debuts[slot] = np.nan
+            if piste not in self.agregats:
+                self.agregats[piste] = AgregatsEleve(piste, t)
+        return slot
+
+    def _emettre(self, slot, comportement, etat, t, index_frame, raison=None):
+        """Bascule l'état d'un comportement, met à jour les agrégats et publie l'événement."""
+        c = COMPORTEMENTS.index(comportement)
+        piste = int(self._pistes[slot])
+        agregat = self.agregats[piste]
+        evenement = {
+            "t": round(float(t), 3),
+            "frame": index_frame,
+            "piste": piste,
+            "identite": agregat.identite,
+            "evenement": EVENEMENTS[(comportement, etat)],
+            "duree": None,
+        }
+        if etat:
+            self._debuts[slot, c] = t
+            if comportement == "main_levee":
+                agregat.nb_mains_levees += 1
+            else:
+                agregat.nb_leves += 1
+        else:
+            duree = max(0.0, float(t - self._debuts[slot, c]))
+            evenement["duree"] = round(duree, 3)
+            if comportement == "main_levee":
+                agregat.duree_main_levee += duree
+            else:
+                agregat.duree_debout += duree
+            self._debuts[slot, c] = np.nan
+        if raison:
+            evenement["raison"] = raison
+        self._etats[slot, c] = etat
+
+        self.nb_evenements += 1
+        if self.ecrivain is not None:
+            self.ecrivain.ecrire(evenement)
+        return evenement
+
+    def mettre_a_jour(self, resultats, t, index_frame=None):
+        """
+        Intègre les résultats d'une frame (ResultatsFrame, instant `t` en secondes).
+        Les personnes non suivies (ids_pistes < 0) sont ignorées.
+
+        Returns:
+            list: Événements émis sur cette frame.
+        """
+        evenements = []
+        valides = np.flatnonzero(resultats.ids_pistes >= 0)
+        if valides.size:
+            bras_gauche, bras_droit, debout = analyser_postures_batch(
+                resultats.keypoints[valides], seuil_y=self.seuil_y,
+                seuil_ratio=self.seuil_ratio, seuil_confiance=self.seuil_confiance
+            )
+            observes = np.stack([bras_gauche | bras_droit, debout], axis=1).astype(np.uint8)
+            slots = np.array([self._slot(int(piste), t) for piste in resultats.ids_pistes[valides]], dtype=np.intp)
+
+            # Tampons circulaires et sommes glissantes
+            positions = self._positions[slots]
+            self._sommes[slots] += observes.astype(np.int32) - self._historique[slots, positions]
+            self._historique[slots, positions] = observes
+            self._positions[slots] = (positions + 1) % self.taille_historique
+            self._remplis[slots] = np.minimum(self._remplis[slots] + 1, self.taille_historique)
+            self._derniere_vue[slots] = t
+
+            # Hystérésis puis durée minimale
+            parts = self._sommes[slots] / self._remplis[slots][:, np.newaxis]
+            etats = self._etats[slots]
+            vers_bascule = np.where(etats, parts <= self.seuil_bas, parts >= self.seuil_haut)
+            candidats = self._candidats[slots]
+            candidats = np.where(vers_bascule, np.where(np.isnan(candidats), t, candidats), np.nan)
+            durees_min = np.where(etats, self.durees_min_fin, self.durees_min_debut)
+            bascules = vers_bascule & (t - candidats >= durees_min)
+            self._candidats[slots] = np.where(bascules, np.nan, candidats)
+
+            for k, c in zip(*np.nonzero(bascules)):
+                evenements.append(self._emettre(slots[k], COMPORTEMENTS[c], not etats[k, c], candidats[k, c], index_frame))
+
+            for slot in slots:
+                self.agregats[int(self._pistes[slot])].derniere_vue = t
+
+        self._associer_identites(resultats)
+        evenements.extend(self._clore_disparues(t, index_frame))
+        return evenements
+
+    def _associer_identites(self, resultats):
+        """Rattache aux agrégats des pistes le nom des visages reconnus qui leur sont associés."""
+        for k in np.flatnonzero((resultats.visages_pistes >= 0) & (resultats.visages_identites >= 0)):
+            agregat = self.agregats.get(int(resultats.visages_pistes[k]))
+            if agregat is not None:
+                agregat.identite = resultats.nom_visage(k)
+
+    def _clore_disparues(self, t, index_frame, toutes=False):
+        evenements = []
+        actives = self._pistes >= 0
+        disparues = actives if toutes else actives & (t - self._derniere_vue > self.delai_disparition)
+        for slot in np.flatnonzero(disparues):
+            for c in np.flatnonzero(self._etats[slot]):
+                evenements.append(self._emettre(
+                    slot, COMPORTEMENTS[c], False, self._derniere_vue[slot], index_frame, raison="disparition"
+                ))
+            del self._slots[int(self._pistes[slot])]
+            self._pistes[slot] = -1
+            self._libres.append(int(slot))
+        return evenements
+
+    def etat(self, piste):
+        """États débruités courants d'une piste : {comportement: bool}."""
+        slot = self._slots.get(piste)
+        if slot is None:
+            return dict.fromkeys(COMPORTEMENTS, False)
+        return {c: bool(self._etats[slot, k]) for k, c in enumerate(COMPORTEMENTS)}
+
+    def terminer(self, t=None, index_frame=None):
+        """Clôt toutes les pistes (fin de séance) et retourne les agrégats par piste."""
+        self._clore_disparues(time.time() if t is None else t, index_frame, toutes=True)
+        return self.agregats
+
+    def agregats_par_eleve(self):
+        """Agrégats regroupés par identité reconnue (les pistes sans identité restent séparées)."""
+        eleves = {}
+        for agregat in self.agregats.values():
+            cle = agregat.identite or f"piste {agregat.piste}"
+            total = eleves.setdefault(cle, {
+                "pistes": [], "duree_presence": 0.0, "nb_mains_levees": 0,
+                "duree_main_levee": 0.0, "nb_leves": 0, "duree_debout": 0.0,
+            })
+            total["pistes"].append(agregat.piste)
+            total["duree_presence"] += agregat.derniere_vue - agregat.premiere_vue
+            total["nb_mains_levees"] += agregat.nb_mains_levees
+            total["duree_main_levee"] += agregat.duree_main_levee
+            total["nb_leves"] += agregat.nb_leves
+            total["duree_debout"] += agregat.duree_debout
+        return eleves
+
+
+class EcrivainEvenements:
+    """
+    Écriture asynchrone et groupée des événements dans un fichier .jsonl ou une base SQLite
+    (.sqlite / .db, table `evenements`).
+
+    `ecrire()` ne fait que déposer l'événement dans une file bornée : un thread de fond
+    écrit par lots de `taille_lot` ou au plus toutes les `periode` secondes. Si la file est
+    pleine (stockage bloqué), l'événement est compté dans `nb_perdus` au lieu de ralentir
+    la boucle des frames.
+
+    Le fichier est ouvert dès la construction : s'il est inaccessible (dossier absent, base
+    verrouillée), l'erreur est affichée, aucun thread n'est lancé et tous les événements
+    sont comptés dans `nb_perdus` (`actif` vaut False).
+    """
+
+    def __init__(self, chemin, taille_lot=64, periode=1.0, taille_file=10000):
+        self.chemin = chemin
+        self.format_sqlite = chemin.endswith((".sqlite", ".db"))
+        self.taille_lot = taille_lot
+        self.periode = periode
+        self.nb_ecrits = 0
+        self.nb_perdus = 0
+        self._file = queue.Queue(maxsize=taille_file)
+        self._thread = None
+        try:
+            self._sortie = self._ouvrir()
+        except (OSError, sqlite3.Error) as e:
+            print(f"Erreur : Impossible d'ouvrir le fichier d'événements {chemin} : {e}")
+            return
+        self._thread = threading.Thread(target=self._boucle, name="ecrivain-evenements", daemon=True)
+        self._thread.start()
+
+    @property
+    def actif(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def ecrire(self, evenement):
+        if not self.actif:
+            self.nb_perdus += 1
+            return
+        try:
+            self._file.put_nowait(evenement)
+        except queue.Full:
+            self.nb_perdus += 1
+
+    def _ouvrir(self):
+        if self.format_sqlite:
+            # La connexion est créée ici mais utilisée par le thread d'écriture
+            connexion = sqlite3.connect(self.chemin, check_same_thread=False)
+            connexion.execute(
+                "CREATE TABLE IF NOT EXISTS evenements ("
+                "t REAL, frame INTEGER, piste INTEGER, identite TEXT, evenement TEXT, duree REAL, raison TEXT)"
+            )
+            connexion.commit()
+            return connexion
+        return open(self.chemin, "a", encoding="utf-8")
+
+    def _ecrire_lot(self, sortie, lot):
+        if self.format_sqlite:
+            with sortie:
+                sortie.executemany(
+                    "INSERT INTO evenements VALUES (:t, :frame, :piste, :identite, :evenement, :duree, :raison)",
+                    [dict(evenement, raison=evenement.get("raison")) for evenement in lot]
+                )
+        else:
+            sortie.write("".join(json.dumps(evenement, ensure_ascii=False) + "\n" for evenement in lot))
+            sortie.flush()
+        self.nb_ecrits += len(lot)
+
+    def _boucle(self):
+        sortie = self._sortie
+        lot = []
+        echeance = time.monotonic() + self.periode
+        fin = False
+        while not fin:
+            try:
+                evenement = self._file.get(timeout=max(0.0, echeance - time.monotonic()))
+                if evenement is None:
+                    fin = True
+                else:
+                    lot.append(evenement)
+            except queue.Empty:
+                pass
+            if lot and (fin or len(lot) >= self.taille_lot or time.monotonic() >= echeance):
+                try:
+                    self._ecrire_lot(sortie, lot)
+                except (OSError, sqlite3.Error) as e:
+                    print(f"Erreur lors de l'écriture de {len(lot)} événement(s) dans {self.chemin} : {e}")
+                    self.nb_perdus += len(lot)
+                lot = []
+            if time.monotonic() >= echeance:
+                echeance = time.monotonic() + self.periode
+        sortie.close()
+
+    def fermer(self, timeout=5.0):
+        """Écrit les événements en attente puis arrête le thread d'écriture (au plus `timeout` s)."""
+        if not self.actif:
+            return
+        try:
+            self._file.put(None, timeout=timeout)
+        except queue.Full:
+            print(f"Erreur : L'écriture des événements dans {self.chemin} est bloquée, "
+                  f"{self._file.qsize()} événement(s) perdu(s).")
+            self.nb_perdus += self._file.qsize()
+            return
+        self._thread.join(timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Événements et agrégats par élève à partir d'un enregistrement (.kpr).")
+    parser.add_argument("enregistrement", help="Fichier .kpr écrit par vision_bras.py ou traitement_hors_ligne.py.")
+    parser.add_argument("--evenements", default=None, help="Fichier .jsonl ou .sqlite où écrire les événements.")
+    parser.add_argument("--places", default=None, help="Plan des places de la caméra (JSON, voir places.py).")
+    args = parser.parse_args()
+
+    from enregistrement import LectureEnregistrement
+    import places
+
+    ecrivain = EcrivainEvenements(args.evenements) if args.evenements else None
+    analyse = AnalyseComportements(ecrivain)
+    occupation = None
+    if args.places:
+        carte = places.charger_plan(args.places)
+        occupation = places.OccupationPlaces(carte) if carte is not None else None
+    debut = time.perf_counter()
+    with LectureEnregistrement(args.enregistrement) as lecture:
+        for k in range(len(lecture)):
+            resultats, t = lecture[k], float(lecture.index["t"][k])
+            evenements = analyse.mettre_a_jour(resultats, t, int(lecture.index["frame"][k]))
+            if occupation is not None:
+                # Même échelle plan -> frame qu'en direct (taille des frames enregistrée)
+                occupation.mettre_a_jour(resultats, t, evenements, lecture.taille_frame)
+        t_fin = float(lecture.index["t"][-1]) if len(lecture) else 0.0
+        analyse.terminer(t_fin)
+        nb_frames = len(lecture)
+    if ecrivain is not None:
+        ecrivain.fermer()
+    duree = time.perf_counter() - debut
+
+    print(f"{nb_frames} frames analysées en {duree:.2f} s, {analyse.nb_evenements} événements.")
+    for eleve, total in sorted(analyse.agregats_par_eleve().items(), key=lambda e: -e[1]["nb_mains_levees"]):
+        print(
+            f"{eleve:>20} : présent {total['duree_presence']:.0f} s, {total['nb_mains_levees']} main(s) levée(s) "
+            f"({total['duree_main_levee']:.0f} s), levé {total['nb_leves']} fois ({total['duree_debout']:.0f} s debout)"
+        )
+    if occupation is not None:
+        for place in occupation.bilan():
+            print(
+                f"Place {place['place']:>6} : occupée {place['duree_occupee']:.0f} s par {place['nb_occupants']} "
+                f"occupant(s), {place['nb_mains_levees']} main(s) levée(s), {place['nb_leves']} lever(s)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# demarrage.py (Démarrage rapide : chargements en tâche de fond et chronologie du démarrage)
+
+import threading
+import time
+
+import metriques
+
+
+class _Etape:
+    __slots__ = ("_demarrage", "_nom", "_debut")
+
+    def __init__(self, demarrage, nom):
+        self._demarrage = demarrage
+        self._nom = nom
+
+    def __enter__(self):
+        self._debut = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._demarrage.enregistrer(self._nom, self._debut, time.perf_counter())
+        return False
+
+
+class Demarrage:
+    """
+    Chronologie du démarrage d'un poste et chargements lancés en tâche de fond.
+
+    - `etape(nom)` : contexte chronométrant une étape (dans n'importe quel thread) ;
+    - `marquer(nom)` : instant remarquable (première frame affichée, première frame analysée...) ;
+    - `lancer(nom, fonction)` : exécute `fonction()` dans un thread de fond ; `pret(nom)` et
+      `resultat(nom)` permettent à la boucle principale de l'utiliser dès qu'il est disponible,
+      sans jamais l'attendre.
+
+    Toutes les durées sont relatives à la création de l'objet (début du programme).
+    """
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.etapes = {} # nom -> (début, fin) en secondes depuis t0
+        self._resultats = {}
+        self._threads = {}
+        self._verrou = threading.Lock()
+
+    def etape(self, nom):
+        return _Etape(self, nom)
+
+    def enregistrer(self, nom, debut, fin):
+        with self._verrou:
+            self.etapes[nom] = (debut - self.t0, fin - self.t0)
+
+    def marquer(self, nom):
+        """Enregistre un instant, une seule fois (les appels suivants sont ignorés)."""
+        if nom not in self.etapes:
+            instant = time.perf_counter()
+            self.enregistrer(nom, instant, instant)
+
+    def lancer(self, nom, fonction):
+        def executer():
+            with self.etape(nom):
+                try:
+                    resultat = fonction()
+                except Exception as e:
+                    print(f"Erreur lors du chargement en tâche de fond '{nom}' : {e}")
+                    resultat = None
+            self._resultats[nom] = resultat
+
+        thread = threading.Thread(target=executer, name=f"demarrage-{nom}", daemon=True)
+        self._threads[nom] = thread
+        thread.start()
+
+    def pret(self, nom):
+        return nom in self._resultats
+
+    def resultat(self, nom, defaut=None):
+        return self._resultats.get(nom, defaut)
+
+    def en_cours(self):
+        """Noms des tâches de fond pas encore terminées."""
+        return [nom for nom in self._threads if nom not in self._resultats]
+
+    def attendre(self, nom, timeout=None):
+        thread = self._threads.get(nom)
+        if thread is not None:
+            thread.join(timeout)
+        return self.resultat(nom)
+
+    def rapport(self):
+        """Chronologie du démarrage, une ligne par étape, par ordre de début."""
+        with self._verrou:
+            etapes = sorted(self.etapes.items(), key=lambda e: e[1])
+        lignes = ["Chronologie du démarrage :"]
+        for nom, (debut, fin) in etapes:
+            if fin > debut:
+                lignes.append(f"  {nom:<28} {debut:6.2f} s -> {fin:6.2f} s  ({fin - debut:.2f} s)")
+            else:
+                lignes.append(f"  {nom:<28} {debut:6.2f} s")
+        return "\n".join(lignes)
+
+    def publier(self):
+        """Expose la durée (ou l'instant) de chaque étape en jauges demarrage_<nom>_secondes."""
+        for nom, (debut, fin) in list(self.etapes.items()):
+            metriques.jauge(f"demarrage_{nom}_secondes", round(fin - debut if fin > debut else debut, 3))
@@ -0,0 +1,340 @@
+# enregistrement.py (Enregistrement binaire des résultats par frame et rejeu sans modèle)
+
+import argparse
+import itertools
+import json
+import mmap
+import os
+import time
+
+import numpy as np
+
+from detection_bras_lever import analyser_postures_batch
+from resultats_frame import NB_KEYPOINTS, ResultatsFrame
+
+# Format (trois fichiers, tous en ajout seul) :
+#   <chemin>      : en-tête (TAILLE_ENTETE octets) puis, pour chaque frame, les tableaux d'un ResultatsFrame bout à bout
+#   <chemin>.idx  : une entrée DTYPE_INDEX par frame (numéro, instant, position et tailles dans <chemin>)
+#   <chemin>.json : métadonnées (noms des identités, source, fps)
+# Les deux premiers se lisent par memory mapping : une frame relue n'est qu'un jeu de vues sur le fichier.
+MAGIC = b"VBRF"
+VERSION = 1
+TAILLE_ENTETE = 16
+ALIGNEMENT = 8
+
+DTYPE_INDEX = np.dtype([
+    ("frame", "<i8"),
+    ("t", "<f8"),
+    ("position", "<i8"),
+    ("personnes", "<u4"),
+    ("objets", "<u4"),
+    ("visages", "<u4"),
+    ("reserve", "<u4"),
+])
+
+
+def _disposition(nb_personnes, nb_objets, nb_visages, nb_keypoints=NB_KEYPOINTS):
+    """
+    Champs d'un enregistrement de frame : (attribut, dtype, forme). Les tableaux 64 bits
+    sont placés en tête pour que tout reste aligné.
+    """
+    P, N, F = nb_personnes, nb_objets, nb_visages
+    return (
+        ("ids_pistes", "<i8", (P,)),
+        ("visages_pistes", "<i8", (F,)),
+        ("boites", "<f4", (P, 4)),
+        ("scores", "<f4", (P,)),
+        ("classes", "<i4", (P,)),
+        ("keypoints", "<f4", (P, nb_keypoints, 3)),
+        ("objets_boites", "<f4", (N, 4)),
+        ("objets_scores", "<f4", (N,)),
+        ("objets_classes", "<i4", (N,)),
+        ("visages_boites", "<i4", (F, 4)),
+        ("visages_identites", "<i4", (F,)),
+        ("visages_confiances", "<f4", (F,)),
+    )
+
+
+class EnregistreurResultats:
+    """
+    Écrit les ResultatsFrame successifs d'une source dans le format ci-dessus.
+
+    Les écritures passent par les tampons des fichiers ; l'index est toujours écrit
+    après les données de sa frame, si bien qu'un enregistrement interrompu reste
+    lisible jusqu'à la dernière frame complète.
+
+    Args:
+        chemin (str): Fichier de données (.kpr par convention).
+        source (str): Description de la source (vidéo, caméra), conservée dans les métadonnées.
+        fps (float): Cadence de la source, si connue.
+        taille_frame (tuple): (largeur, hauteur) des frames analysées, pour rejouer
+            l'affectation aux places (places.CartePlaces.affecter) à la même échelle qu'en direct.
+    """
+
+    def __init__(self, chemin, source=None, fps=None, nb_keypoints=NB_KEYPOINTS, taille_frame=None):
+        self.chemin = chemin
+        self.nb_keypoints = nb_keypoints
+        self.meta = {"version": VERSION, "source": source, "fps": fps, "nb_keypoints": nb_keypoints, "noms_identites": []}
+        if taille_frame is not None:
+            self.meta["largeur"], self.meta["hauteur"] = (int(v) for v in taille_frame)
+        self._donnees = open(chemin, "wb")
+        self._index = open(chemin + ".idx", "wb")
+        entete = MAGIC + np.array([VERSION, nb_keypoints, 0], dtype="<u4").tobytes()
+        self._donnees.write(entete)
+        self._position = len(entete)
+        self.nb_frames = 0
+        self._ecrire_meta()
+
+    def _ecrire_meta(self):
+        with open(self.chemin + ".json", "w", encoding="utf-8") as fichier:
+            json.dump(self.meta, fichier, ensure_ascii=False)
+
+    def ecrire(self, resultats, index_frame, t):
+        """Ajoute les résultats d'une frame (numéro `index_frame`, instant `t` en secondes)."""
+        if list(resultats.noms_identites) != self.meta["noms_identites"] and len(resultats.noms_identites):
+            self.meta["noms_identites"] = list(resultats.noms_identites)
+            self._ecrire_meta()
+
+        P, N, F = len(resultats), resultats.objets_boites.shape[0], resultats.visages_boites.shape[0]
+        blocs = [
+            np.ascontiguousarray(getattr(resultats, nom), dtype=dtype).reshape(forme).tobytes()
+            for nom, dtype, forme in _disposition(P, N, F, self.nb_keypoints)
+        ]
+        taille = sum(len(bloc) for bloc in blocs)
+        bourrage = -taille % ALIGNEMENT
+        if bourrage:
+            blocs.append(bytes(bourrage))
+        self._donnees.write(b"".join(blocs))
+
+        entree = np.array([(index_frame, t, self._position, P, N, F, 0)], dtype=DTYPE_INDEX)
+        self._index.write(entree.tobytes())
+        self._position += taille + bourrage
+        self.nb_frames += 1
+
+    def vider(self):
+        self._donnees.flush()
+        self._index.flush()
+
+    def fermer(self):
+        if self._donnees.closed:
+            return
+        self.vider()
+        self._donnees.close()
+        self._index.close()
+        self.meta["nb_frames"] = self.nb_frames
+        self._ecrire_meta()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+        return False
+
+
+class LectureEnregistrement:
+    """
+    Accès aléatoire, par memory mapping, à un enregistrement écrit par EnregistreurResultats.
+
+    `lecture[k]` retourne le ResultatsFrame de la k-ième frame enregistrée, dont les
+    tableaux sont des vues en lecture seule sur le fichier (aucune copie). `lecture.index`
+    donne le numéro, l'instant et le nombre de personnes / objets / visages de chaque frame.
+    """
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        with open(chemin + ".json", encoding="utf-8") as fichier:
+            self.meta = json.load(fichier)
+        self.noms_identites = tuple(self.meta.get("noms_identites", ()))
+        # (largeur, hauteur) des frames d'origine, None pour les enregistrements qui ne l'ont pas
+        self.taille_frame = None
+        if self.meta.get("largeur") and self.meta.get("hauteur"):
+            self.taille_frame = (self.meta["largeur"], self.meta["hauteur"])
+
+        self._fichier = open(chemin, "rb")
+        taille = os.fstat(self._fichier.fileno()).st_size
+        if taille < TAILLE_ENTETE:
+            raise ValueError(f"Enregistrement vide ou tronqué : {chemin}")
+        self._mmap = mmap.mmap(self._fichier.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:4] != MAGIC:
+            raise ValueError(f"Ce fichier n'est pas un enregistrement de résultats : {chemin}")
+        version, self.nb_keypoints, _ = np.frombuffer(self._mmap, dtype="<u4", count=3, offset=4)
+        if version != VERSION:
+            raise ValueError(f"Version d'enregistrement non prise en charge : {version}")
+        self.nb_keypoints = int(self.nb_keypoints)
+
+        taille_index = os.path.getsize(chemin + ".idx") // DTYPE_INDEX.itemsize
+        index = np.fromfile(chemin + ".idx", dtype=DTYPE_INDEX, count=taille_index)
+        # Enregistrement interrompu : on ignore les frames dont les données ne sont pas complètes
+        fins = index["position"] + self._tailles(index)
+        self.index = index[fins <= taille]
+        self._keypoints = None
+
+    def _tailles(self, index):
+        """Taille en octets (bourrage compris) de chaque enregistrement de frame."""
+        P = index["personnes"].astype(np.int64)
+        N = index["objets"].astype(np.int64)
+        F = index["visages"].astype(np.int64)
+        taille = P * (8 + 16 + 4 + 4 + self.nb_keypoints * 12) + N * (16 + 4 + 4) + F * (8 + 16 + 4 + 4)
+        return taille + (-taille % ALIGNEMENT)
+
+    def __len__(self):
+        return self.index.shape[0]
+
+    def __getitem__(self, k):
+        entree = self.index[k]
+        position = int(entree["position"])
+        champs = {}
+        for nom, dtype, forme in _disposition(
+            int(entree["personnes"]), int(entree["objets"]), int(entree["visages"]), self.nb_keypoints
+        ):
+            nombre = int(np.prod(forme))
+            champs[nom] = np.frombuffer(self._mmap, dtype=dtype, count=nombre, offset=position).reshape(forme)
+            position += nombre * np.dtype(dtype).itemsize
+
+        resultats = ResultatsFrame(
+            champs["boites"], champs["scores"], champs["classes"], champs["keypoints"], champs["ids_pistes"]
+        )
+        resultats.definir_objets(champs["objets_boites"], champs["objets_scores"], champs["objets_classes"])
+        resultats.definir_visages(
+            champs["visages_boites"], champs["visages_identites"], champs["visages_confiances"],
+            champs["visages_pistes"], self.noms_identites
+        )
+        return resultats
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
+
+    def keypoints_concatenes(self):
+        """
+        Keypoints de toutes les personnes de toutes les frames, (total, K, 3), et la frame
+        (indice dans l'enregistrement) de chaque ligne. Calculé une fois puis gardé en mémoire.
+        """
+        if self._keypoints is None:
+            debut_keypoints = self.index["position"] + self.index["personnes"].astype(np.int64) * (8 + 16 + 4 + 4) \
+                + self.index["visages"].astype(np.int64) * 8
+            taille_personne = self.nb_keypoints * 3
+            blocs = [
+                np.frombuffer(self._mmap, dtype="<f4", count=int(p) * taille_personne, offset=int(d))
+                for d, p in zip(debut_keypoints, self.index["personnes"]) if p
+            ]
+            keypoints = np.concatenate(blocs) if blocs else np.empty(0, dtype=np.float32)
+            frames = np.repeat(np.arange(len(self)), self.index["personnes"].astype(np.int64))
+            self._keypoints = (keypoints.reshape(-1, self.nb_keypoints, 3), frames)
+        return self._keypoints
+
+    def fermer(self):
+        self._keypoints = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass # Des ResultatsFrame rejoués référencent encore le fichier : fermé à leur libération
+        self._fichier.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+        return False
+
+
+def fusionner_enregistrements(parties, chemin_sortie, source=None, fps=None, taille_frame=None):
+    """Concatène, dans l'ordre, plusieurs enregistrements (segments d'une même vidéo) en un seul."""
+    if taille_frame is None and parties:
+        with LectureEnregistrement(parties[0]) as premiere:
+            taille_frame = premiere.taille_frame
+    with EnregistreurResultats(chemin_sortie, source=source, fps=fps, taille_frame=taille_frame) as sortie:
+        for chemin in parties:
+            with LectureEnregistrement(chemin) as lecture:
+                for k in range(len(lecture)):
+                    sortie.ecrire(lecture[k], int(lecture.index["frame"][k]), float(lecture.index["t"][k]))
+
+
+def supprimer_enregistrement(chemin):
+    for suffixe in ("", ".idx", ".json"):
+        if os.path.exists(chemin + suffixe):
+            os.remove(chemin + suffixe)
+
+
+def rejouer(lecture, seuil_y=10, seuil_ratio=0.5, seuil_confiance=0.7):
+    """
+    Rejoue un enregistrement dans l'analyse comportementale, frame par frame, sans modèle.
+
+    Yields:
+        tuple: (numéro de frame, instant, ResultatsFrame, bras_gauche, bras_droit, debout)
+    """
+    for k in range(len(lecture)):
+        resultats = lecture[k]
+        bras_gauche, bras_droit, debout = analyser_postures_batch(
+            resultats.keypoints, seuil_y=seuil_y, seuil_ratio=seuil_ratio, seuil_confiance=seuil_confiance
+        )
+        yield int(lecture.index["frame"][k]), float(lecture.index["t"][k]), resultats, bras_gauche, bras_droit, debout
+
+
+def balayer_seuils(lecture, seuils_y=(10,), seuils_ratio=(0.5,), seuils_confiance=(0.7,)):
+    """
+    Évalue chaque combinaison de seuils de detection_bras_lever sur tout l'enregistrement.
+
+    Les keypoints de toutes les frames sont analysés en un seul appel vectorisé par
+    combinaison (une personne par ligne), puis ramenés à la frame.
+
+    Returns:
+        list: Un dict par combinaison (seuils, personnes-frames bras levé / debout,
+              frames avec au moins une main levée).
+    """
+    keypoints, frames = lecture.keypoints_concatenes()
+    nb_frames = len(lecture)
+    bilans = []
+    for seuil_y, seuil_ratio, seuil_confiance in itertools.product(seuils_y, seuils_ratio, seuils_confiance):
+        bras_gauche, bras_droit, debout = analyser_postures_batch(
+            keypoints, seuil_y=seuil_y, seuil_ratio=seuil_ratio, seuil_confiance=seuil_confiance
+        )
+        bras_leve = bras_gauche | bras_droit
+        frames_main_levee = np.bincount(frames[bras_leve], minlength=nb_frames) > 0
+        bilans.append({
+            "seuil_y": seuil_y,
+            "seuil_ratio": seuil_ratio,
+            "seuil_confiance": seuil_confiance,
+            "bras_leves": int(bras_leve.sum()),
+            "debout": int(debout.sum()),
+            "frames_main_levee": int(frames_main_levee.sum()),
+            "part_frames_main_levee": float(frames_main_levee.mean()) if nb_frames else 0.0,
+        })
+    return bilans
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rejeu d'un enregistrement de résultats et balayage des seuils.")
+    parser.add_argument("enregistrement", help="Fichier .kpr écrit par vision_bras.py ou traitement_hors_ligne.py.")
+    parser.add_argument("--seuil-y", type=float, nargs="+", default=[10], help="Valeurs de seuil_y à tester.")
+    parser.add_argument("--seuil-ratio", type=float, nargs="+", default=[0.5], help="Valeurs de seuil_ratio à tester.")
+    parser.add_argument("--seuil-confiance", type=float, nargs="+", default=[0.7], help="Valeurs de seuil_confiance à tester.")
+    parser.add_argument("--sortie", default=None, help="Fichier JSON où écrire le bilan de chaque combinaison.")
+    args = parser.parse_args()
+
+    with LectureEnregistrement(args.enregistrement) as lecture:
+        nb_personnes = int(lecture.index["personnes"].sum())
+        print(f"{len(lecture)} frames, {nb_personnes} personnes-frames ({lecture.meta.get('source')}).")
+
+        debut = time.perf_counter()
+        bilans = balayer_seuils(lecture, args.seuil_y, args.seuil_ratio, args.seuil_confiance)
+        duree = time.perf_counter() - debut
+
+        print(f"{'seuil_y':>8} {'ratio':>6} {'conf':>5} | {'bras levés':>10} {'debout':>8} {'frames main levée':>18}")
+        for bilan in bilans:
+            print(
+                f"{bilan['seuil_y']:>8g} {bilan['seuil_ratio']:>6g} {bilan['seuil_confiance']:>5g} | "
+                f"{bilan['bras_leves']:>10} {bilan['debout']:>8} "
+                f"{bilan['frames_main_levee']:>10} ({bilan['part_frames_main_levee']:.1%})"
+            )
+        print(f"{len(bilans)} combinaison(s) en {duree:.2f} s ({len(bilans) * len(lecture) / max(duree, 1e-9):.0f} frames/s).")
+
+    if args.sortie:
+        with open(args.sortie, "w", encoding="utf-8") as fichier:
+            json.dump(bilans, fichier, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
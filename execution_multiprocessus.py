@@ -0,0 +1,576 @@
+# execution_multiprocessus.py (Étapes dans des processus séparés, frames en mémoire partagée)
+
+import multiprocessing as mp
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+import cv2
+import numpy as np
+
+import metriques
+import orchestrateur
+import reconnaissance_faciale
+import rendu as rendu_frames
+import identification_embeddings
+import suivi
+import test1
+import vision_bras
+from tuilage import Tuilage
+from resultats_frame import ResultatsFrame, extraire_boites
+
+
+class AnneauFrames:
+    """
+    Tampon circulaire de frames dans un segment de mémoire partagée.
+
+    Le segment contient un numéro de frame par case (-1 pendant l'écriture) suivi des
+    cases elles-mêmes, de forme fixe (H, W, 3). Les workers y lisent les frames par une
+    simple vue NumPy : ni copie ni pickle. Le numéro de frame permet à un lecteur de
+    vérifier que la case n'a pas été réécrite pendant qu'il l'utilisait.
+    """
+
+    def __init__(self, forme, nb_cases, nom=None, creer=True):
+        self.forme = tuple(forme)
+        self.nb_cases = nb_cases
+        taille_entete = nb_cases * 8
+        taille_case = int(np.prod(self.forme))
+        self._shm = shared_memory.SharedMemory(
+            name=nom, create=creer, size=taille_entete + nb_cases * taille_case if creer else 0
+        )
+        self.sequences = np.ndarray((nb_cases,), dtype=np.int64, buffer=self._shm.buf)
+        self.cases = np.ndarray((nb_cases,) + self.forme, dtype=np.uint8, buffer=self._shm.buf, offset=taille_entete)
+        if creer:
+            self.sequences[:] = -1
+
+    def spec(self):
+        """Description picklable permettant à un autre processus de s'attacher au segment."""
+        return (self._shm.name, self.forme, self.nb_cases)
+
+    @classmethod
+    def attacher(cls, spec):
+        nom, forme, nb_cases = spec
+        # Workers lancés en "spawn" : ils partagent le resource_tracker du processus principal,
+        # seul ce dernier détruit le segment (detruire)
+        return cls(forme, nb_cases, nom=nom, creer=False)
+
+    def ecrire(self, case, frame_id, frame):
+        self.sequences[case] = -1
+        np.copyto(self.cases[case], frame)
+        self.sequences[case] = frame_id
+
+    def lire(self, case, frame_id):
+        """Vue (sans copie) sur la frame `frame_id`, ou None si la case a été réécrite."""
+        if self.sequences[case] != frame_id:
+            return None
+        return self.cases[case]
+
+    def valide(self, case, frame_id):
+        return self.sequences[case] == frame_id
+
+    def fermer(self):
+        # Les vues doivent être libérées avant de fermer le segment
+        self.sequences = None
+        self.cases = None
+        self._shm.close()
+
+    def detruire(self):
+        self.fermer()
+        self._shm.unlink()
+
+
+# --- Étapes exécutées dans les workers ---
+# Chaque fabrique reçoit la configuration, charge ses modèles une seule fois dans le
+# processus worker et retourne fonction(source, frame, contexte) -> résultat compact
+# (ResultatsFrame ou tuple de tableaux NumPy, peu coûteux à renvoyer au processus principal).
+
+def _charger(config, cle, task):
+    """`config[cle]` peut être un chemin de poids ou un modèle déjà construit."""
+    if not isinstance(config[cle], str):
+        return config[cle]
+    return test1.charger_modele(config[cle], task=task, optimiser=False, backend=config.get("backend"))
+
+
+def _fabrique_pose(config):
+    model_pose = _charger(config, "pose", "pose")
+    tuilage = None
+    if vision_bras.INFERENCE_TUILEE:
+        tuilage = Tuilage(zone_lointaine=vision_bras.ZONE_LOINTAINE, taille_lointaine=vision_bras.TAILLE_TUILES_LOINTAINES)
+    suivis = {} # Un tracker par source
+
+    def etape_pose(source, frame, contexte):
+        if tuilage is not None:
+            results_pose = test1.executer_inference_tuilee(model_pose, frame, tuilage)
+        else:
+            results_pose = test1.executer_inference_frame(model_pose, frame)
+        resultats = ResultatsFrame.depuis_results(results_pose)
+        resultats.ids_pistes = suivis.setdefault(source, suivi.SuiviMultiObjets()).mettre_a_jour(
+            resultats.boites, resultats.keypoints
+        )
+        return resultats
+
+    return etape_pose
+
+
+def _fabrique_detect(config):
+    model_detect = _charger(config, "detect", "detect")
+
+    def etape_detect(source, frame, contexte):
+        return extraire_boites(test1.executer_inference_frame(model_detect, frame))
+
+    return etape_detect
+
+
+def _fabrique_visages(config):
+    haar_cascade = reconnaissance_faciale.charger_haarcascade(reconnaissance_faciale.HAAR_CASCADE_PATH)
+    backend_visages = identification_embeddings.preparer_backend(
+        config.get("base_visages", reconnaissance_faciale.DATABASE_FOLDER),
+        config.get("identification", vision_bras.BACKEND_IDENTIFICATION),
+        dossier_store=config.get("store_visages", reconnaissance_faciale.DOSSIER_STORE_VISAGES)
+    )
+    if haar_cascade is None or backend_visages is None:
+        print("ATTENTION: La reconnaissance faciale est désactivée (Haar Cascade ou DB non prêt).")
+    recherches, caches = {}, {} # Recherche guidée et cache d'identités propres à chaque source
+
+    def etape_visages(source, frame, contexte):
+        if haar_cascade is None or backend_visages is None:
+            return None
+        if source not in caches:
+            caches[source] = reconnaissance_faciale.CacheIdentitesPistes()
+            recherches[source] = None
+            if vision_bras.RECHERCHE_VISAGES_GUIDEE:
+                recherches[source] = reconnaissance_faciale.RechercheVisagesGuidee(
+                    vision_bras.PERIODE_SCAN_COMPLET_VISAGES
+                )
+        keypoints, ids_pistes, boites = contexte or (None, None, None)
+        return reconnaissance_faciale.detecter_et_identifier_visages_tableaux(
+            frame, haar_cascade,
+            recherche_guidee=recherches[source],
+            keypoints=keypoints,
+            cache_identites=caches[source],
+            ids_pistes=ids_pistes,
+            boites_pistes=boites,
+            backend=backend_visages
+        )
+
+    return etape_visages
+
+
+FABRIQUES_ETAPES = {
+    "pose": _fabrique_pose,
+    "detect": _fabrique_detect,
+    "visages": _fabrique_visages,
+}
+
+
+def _boucle_worker(nom, config, specs_anneaux, conn):
+    """Processus worker : lit (source, frame_id, case, contexte), exécute l'étape, renvoie le résultat."""
+    cv2.setNumThreads(config.get("threads_par_worker", 1))
+    try:
+        import torch
+        torch.set_num_threads(config.get("threads_par_worker", 1))
+    except ImportError:
+        pass
+
+    anneaux = [AnneauFrames.attacher(spec) for spec in specs_anneaux]
+    try:
+        etape = FABRIQUES_ETAPES[nom](config)
+    except Exception as e:
+        # Erreur de configuration : relancer le worker n'y changerait rien, l'étape reste vide
+        print(f"Initialisation de l'étape '{nom}' impossible : {e}")
+        etape = None
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+
+        source, frame_id, case, contexte = message
+        resultat = None
+        frame = anneaux[source].lire(case, frame_id)
+        if frame is not None and etape is not None:
+            try:
+                resultat = etape(source, frame, contexte)
+            except Exception as e:
+                print(f"Erreur dans l'étape '{nom}' (source {source}, frame {frame_id}) : {e}")
+            if not anneaux[source].valide(case, frame_id):
+                resultat = None # Frame réécrite pendant le traitement : résultat incohérent
+        conn.send((source, frame_id, resultat))
+
+    for anneau in anneaux:
+        anneau.fermer()
+
+
+class WorkerEtape:
+    """Processus worker d'une étape, avec son canal dédié et les frames qu'il a en cours."""
+
+    def __init__(self, nom, config, specs_anneaux, contexte_mp):
+        self.nom = nom
+        self.config = config
+        self.specs_anneaux = specs_anneaux
+        self.nb_redemarrages = 0
+        self._mp = contexte_mp
+        self._verrou = threading.Lock()
+        self.process = None
+        self.conn = None
+        self.en_cours = set()
+
+    def demarrer(self):
+        # Un canal par worker : un worker qui meurt en pleine écriture ne bloque pas les autres
+        self.conn, conn_enfant = self._mp.Pipe()
+        self.process = self._mp.Process(
+            target=_boucle_worker, args=(self.nom, self.config, self.specs_anneaux, conn_enfant),
+            name=f"worker-{self.nom}", daemon=True
+        )
+        self.process.start()
+        conn_enfant.close()
+        self.en_cours = set()
+
+    def envoyer(self, source, frame_id, case, contexte):
+        with self._verrou:
+            try:
+                self.conn.send((source, frame_id, case, contexte))
+            except (BrokenPipeError, OSError):
+                return False
+            self.en_cours.add((source, frame_id))
+            return True
+
+    def terminer(self, source, frame_id):
+        with self._verrou:
+            self.en_cours.discard((source, frame_id))
+
+    def redemarrer(self):
+        """Relance le processus ; retourne les frames qui étaient en cours (résultats perdus)."""
+        with self._verrou:
+            perdues = self.en_cours
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process.join(timeout=2.0)
+            self.conn.close()
+            self.nb_redemarrages += 1
+            self.demarrer()
+            return perdues
+
+    def arreter(self):
+        with self._verrou:
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(timeout=2.0)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.conn.close()
+
+
+class FrameAnneau:
+    """Frame capturée, désignée par sa case dans l'anneau de sa source."""
+
+    __slots__ = ("frame_id", "t_capture", "case")
+
+    def __init__(self, frame_id, t_capture, case):
+        self.frame_id = frame_id
+        self.t_capture = t_capture
+        self.case = case
+
+
+class SourceVideo:
+    """État d'une caméra : capture, anneau, frames en vol, files et statistiques."""
+
+    def __init__(self, index, source, cap, premiere_frame, profondeur, rendu, affichage):
+        self.index = index
+        self.source = source
+        self.cap = cap
+        self.premiere_frame = premiere_frame
+        # profondeur cases réservées (en vol) + la dernière frame écrite + la case en cours d'écriture
+        self.anneau = AnneauFrames(premiere_frame.shape, profondeur + 3)
+        self.file_capture = orchestrateur.FileDerniereFrame()
+        self.file_rendu = orchestrateur.FileDerniereFrame()
+        self.places_libres = threading.Semaphore(profondeur)
+        self.verrou = threading.Lock()
+        self.reservees = set()
+        self.en_cours = {}
+        self.derniere_pose = None
+        self.capture_terminee = threading.Event()
+        self.stats = orchestrateur.StatistiquesPipeline()
+        self.rendu = rendu
+        self.affichage = affichage
+
+    def nb_pertes(self):
+        return (self.file_capture.nb_pertes, self.file_rendu.nb_pertes)
+
+    def vide(self):
+        with self.verrou:
+            return (self.capture_terminee.is_set() and not self.en_cours
+                    and not self.file_capture.a_valeur() and not self.file_rendu.a_valeur())
+
+
+class OrchestrateurMultiProcessus:
+    """
+    Variante multi-processus de orchestrateur.Orchestrateur, pour une ou plusieurs caméras.
+
+    - Le processus principal capture (un thread par source) et écrit chaque frame dans
+      l'AnneauFrames de la source, puis affiche les résultats.
+    - Chaque étape (pose, detect, visages) tourne dans son propre processus : Haar, LBPH,
+      YOLO et leur code Python n'entrent plus en concurrence pour le GIL. Le processus
+      principal n'envoie que (source, frame_id, case) ; le worker lit la frame par une vue
+      sur la mémoire partagée et renvoie un résultat compact (tableaux NumPy).
+    - Une case reste réservée tant que sa frame est en vol : la capture ne l'écrase pas.
+    - Un worker qui meurt est détecté (canal fermé ou processus arrêté) et relancé ; ses
+      frames en cours sont jointes sans son résultat. La capture n'est pas interrompue.
+
+    Args:
+        sources (list): Index de webcams et/ou chemins vidéo.
+        config (dict): "pose", "detect" (chemins ou modèles), "backend", "base_visages", "store_visages",
+            "threads_par_worker" (défaut : cœurs / nombre d'étapes).
+        etapes (list): Étapes à exécuter, parmi FABRIQUES_ETAPES.
+        profondeur (int): Nombre maximal de frames en vol par source.
+        afficher (bool): False pour ne pas ouvrir de fenêtre (serveur sans écran).
+        frequence_affichage (float): Images affichées par seconde et par fenêtre, au plus
+            (défaut : vision_bras.FREQUENCE_AFFICHAGE_MAX).
+    """
+
+    def __init__(self, sources, config, etapes=("pose", "detect", "visages"), profondeur=2, afficher=True,
+                 frequence_affichage=None):
+        self.sources_demandees = list(sources)
+        self.config = dict(config)
+        self.noms_etapes = [nom for nom in etapes if nom in FABRIQUES_ETAPES]
+        # Les cœurs sont répartis entre les workers pour éviter la sur-souscription
+        self.config.setdefault("threads_par_worker", max(1, (os.cpu_count() or 1) // max(1, len(self.noms_etapes))))
+        self.profondeur = max(1, int(profondeur))
+        self.afficher = afficher
+        self.frequence_affichage = (
+            vision_bras.FREQUENCE_AFFICHAGE_MAX if frequence_affichage is None else frequence_affichage
+        )
+        self.sources = []
+        self.workers = {}
+        self._arret = threading.Event()
+        self._verrou_jointure = threading.Lock()
+        self._threads = []
+        self._mp = mp.get_context("spawn") # Pas de fork d'un processus qui a déjà des threads
+
+    # --- Capture ---
+
+    def _case_libre(self, source, derniere):
+        """Prochaine case ni réservée (frame en vol) ni occupée par la dernière frame écrite."""
+        for decalage in range(1, source.anneau.nb_cases + 1):
+            case = (derniere + decalage) % source.anneau.nb_cases
+            if case != derniere and case not in source.reservees:
+                return case
+        return None
+
+    def _boucle_capture(self, source):
+        frame_id, case, frame = 0, -1, source.premiere_frame
+        while not self._arret.is_set():
+            if frame is None:
+                success, frame = source.cap.read()
+                if not success:
+                    print(f"Fin du flux vidéo {source.source} (ou frame vide reçue).")
+                    break
+            if frame.shape != source.anneau.forme:
+                frame = cv2.resize(frame, (source.anneau.forme[1], source.anneau.forme[0]))
+
+            with source.verrou:
+                case = self._case_libre(source, case)
+            if case is not None:
+                source.anneau.ecrire(case, frame_id, frame)
+                source.file_capture.deposer(FrameAnneau(frame_id, time.perf_counter(), case))
+                source.stats.nb_capturees += 1
+            frame_id += 1
+            frame = None
+        source.capture_terminee.set()
+        source.file_capture.fermer()
+
+    # --- Répartition vers les workers ---
+
+    def _boucle_repartition(self):
+        while not self._arret.is_set():
+            progres = False
+            for source in self.sources:
+                if not source.places_libres.acquire(blocking=False):
+                    continue
+                with source.verrou:
+                    capturee = source.file_capture.prendre(timeout=0)
+                    if capturee is not None:
+                        source.reservees.add(capturee.case)
+                        source.en_cours[capturee.frame_id] = (capturee, {})
+                if capturee is None:
+                    source.places_libres.release()
+                    continue
+
+                progres = True
+                for nom, worker in self.workers.items():
+                    contexte = source.derniere_pose if nom == "visages" else None
+                    if not worker.envoyer(source.index, capturee.frame_id, capturee.case, contexte):
+                        self._enregistrer(source.index, capturee.frame_id, nom, None)
+            if not progres:
+                time.sleep(0.002)
+
+    # --- Jointure et supervision ---
+
+    def _enregistrer(self, index_source, frame_id, nom, resultat):
+        """Range le résultat d'une étape ; quand la frame est complète, l'envoie au rendu."""
+        source = self.sources[index_source]
+        with self._verrou_jointure:
+            entree = source.en_cours.get(frame_id)
+            if entree is None:
+                return
+            capturee, resultats = entree
+            resultats[nom] = resultat
+            if len(resultats) < len(self.workers):
+                return
+
+            # Copie pour le rendu, puis libération de la case pour la capture
+            frame = source.anneau.cases[capturee.case].copy()
+            with source.verrou:
+                del source.en_cours[frame_id]
+                source.reservees.discard(capturee.case)
+            source.places_libres.release()
+            source.stats.nb_traitees += 1
+            if resultats.get("pose") is not None:
+                pose = resultats["pose"]
+                source.derniere_pose = (pose.keypoints, pose.ids_pistes, pose.boites)
+            source.file_rendu.deposer(orchestrateur.FrameJointe(frame_id, capturee.t_capture, frame, resultats))
+
+    def _redemarrer(self, worker):
+        if self._arret.is_set():
+            return
+        print(f"Worker '{worker.nom}' arrêté de façon inattendue : redémarrage.")
+        metriques.incrementer(f"redemarrages_{worker.nom}")
+        for index_source, frame_id in worker.redemarrer():
+            self._enregistrer(index_source, frame_id, worker.nom, None)
+
+    def _boucle_jointure(self):
+        while not self._arret.is_set():
+            par_conn = {worker.conn: worker for worker in self.workers.values()}
+            for conn in wait(list(par_conn), timeout=0.1):
+                worker = par_conn[conn]
+                try:
+                    index_source, frame_id, resultat = conn.recv()
+                except (EOFError, OSError):
+                    self._redemarrer(worker)
+                    continue
+                worker.terminer(index_source, frame_id)
+                self._enregistrer(index_source, frame_id, worker.nom, resultat)
+
+            for worker in self.workers.values():
+                if not worker.process.is_alive():
+                    self._redemarrer(worker)
+
+    # --- API publique ---
+
+    def _ouvrir_sources(self):
+        for source in self.sources_demandees:
+            cap = cv2.VideoCapture(source)
+            success, frame = cap.read() if cap.isOpened() else (False, None)
+            if not success:
+                print(f"Erreur : Impossible d'ouvrir la source vidéo ({source}).")
+                cap.release()
+                continue
+            affichage = rendu_frames.AffichageLimite(
+                f"Multi-Model Vision - {source}", self.frequence_affichage, self.afficher
+            )
+            self.sources.append(
+                SourceVideo(len(self.sources), source, cap, frame, self.profondeur, orchestrateur.RenduClasse(), affichage)
+            )
+
+    def arreter(self):
+        self._arret.set()
+        for source in self.sources:
+            source.file_capture.fermer()
+            source.file_rendu.fermer()
+
+    def executer(self):
+        """Lance workers et threads, puis exécute la boucle de rendu dans le thread appelant."""
+        self._ouvrir_sources()
+        if not self.sources:
+            return
+
+        specs = [source.anneau.spec() for source in self.sources]
+        self.workers = {nom: WorkerEtape(nom, self.config, specs, self._mp) for nom in self.noms_etapes}
+        for worker in self.workers.values():
+            worker.demarrer()
+
+        self._threads = [
+            threading.Thread(target=self._boucle_capture, args=(source,), name=f"capture-{source.index}", daemon=True)
+            for source in self.sources
+        ] + [
+            threading.Thread(target=self._boucle_repartition, name="repartition", daemon=True),
+            threading.Thread(target=self._boucle_jointure, name="jointure", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+        print(f"\nDémarrage du pipeline multi-processus ({len(self.sources)} source(s), {len(self.workers)} worker(s)).")
+        try:
+            while not self._arret.is_set():
+                affichees = 0
+                quitter = False
+                for source in self.sources:
+                    jointe = source.file_rendu.prendre(timeout=0)
+                    if jointe is None:
+                        continue
+                    image = source.rendu(jointe, source)
+                    latence = time.perf_counter() - jointe.t_capture
+                    source.stats.enregistrer_latence(latence)
+                    metriques.observer("latence_bout_en_bout", latence)
+                    if image is not None:
+                        source.stats.nb_affichees += 1
+                        quitter |= source.affichage.afficher(image)
+                    affichees += 1
+
+                if quitter:
+                    break
+                if not affichees:
+                    if all(source.vide() for source in self.sources):
+                        break
+                    time.sleep(0.002)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.arreter()
+            for thread in self._threads:
+                thread.join(timeout=2.0)
+            for worker in self.workers.values():
+                worker.arreter()
+            for source in self.sources:
+                source.cap.release()
+                source.anneau.detruire()
+            for source in self.sources:
+                source.affichage.fermer()
+            self.afficher_bilan()
+
+    def afficher_bilan(self):
+        for source in self.sources:
+            p50, p95, lat_max = source.stats.latences_ms()
+            pertes_capture, pertes_rendu = source.nb_pertes()
+            print(
+                f"[{source.source}] frames capturées: {source.stats.nb_capturees}, traitées: {source.stats.nb_traitees}, "
+                f"affichées: {source.stats.nb_affichees} | abandonnées - capture: {pertes_capture}, rendu: {pertes_rendu} | "
+                f"latence p50 {p50:.1f} ms, p95 {p95:.1f} ms, max {lat_max:.1f} ms"
+            )
+        for worker in self.workers.values():
+            if worker.nb_redemarrages:
+                print(f"Worker '{worker.nom}' redémarré {worker.nb_redemarrages} fois.")
+
+
+def run_multi_processus(model_pose_path, model_detect_path, sources=(0,), profondeur=2):
+    """Point d'entrée : une fenêtre par caméra, une étape par processus."""
+    config = {"pose": model_pose_path, "detect": model_detect_path}
+    etapes = ["pose", "visages"] + (["detect"] if model_detect_path else [])
+    OrchestrateurMultiProcessus(sources, config, etapes, profondeur, afficher=vision_bras.AFFICHAGE_ACTIF).executer()
+    print("Programme terminé.")
+
+
+if __name__ == "__main__":
+    # IMPORTANT: Remplacer ceci par le chemin réel de vos modèles YOLO
+    MODEL_POSE_PATH = 'yolo11m-pose.pt'
+    MODEL_DETECT_PATH = 'yolov8n.pt'
+    SOURCES = [0] # Plusieurs caméras : [0, 1, "rtsp://..."]
+
+    run_multi_processus(MODEL_POSE_PATH, MODEL_DETECT_PATH, SOURCES)
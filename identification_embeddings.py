@@ -0,0 +1,500 @@
+# identification_embeddings.py (Identification par vecteurs caractéristiques + plus proches voisins)
+
+import cv2
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+import numpy as np
+
+import ingestion_visages
+import reconnaissance_faciale
+
+# Méthode d'identification utilisée par défaut par les pipelines : "lbph" ou "embeddings"
+BACKEND_IDENTIFICATION = "lbph"
+
+# Taille des visages passés aux extracteurs
+TAILLE_VISAGE_LBP = 96
+TAILLE_VISAGE_DNN = 112
+
+# Au-delà de ce nombre d'images dans la galerie, un index approximatif (IVF) est construit
+SEUIL_INDEX_APPROXIMATIF = 5000
+
+
+def _table_lbp_uniforme():
+    """Table 256 -> 59 : les 58 motifs LBP uniformes (≤ 2 transitions) gardent leur propre case, les autres partagent la 59e."""
+    table = np.full(256, 58, dtype=np.intp)
+    prochain = 0
+    for code in range(256):
+        bits = [(code >> k) & 1 for k in range(8)]
+        transitions = sum(bits[k] != bits[(k + 1) % 8] for k in range(8))
+        if transitions <= 2:
+            table[code] = prochain
+            prochain += 1
+    return table
+
+_TABLE_LBP = _table_lbp_uniforme()
+_NB_MOTIFS_LBP = 59
+
+
+class ExtracteurLBP:
+    """
+    Extracteur CPU sans modèle : histogrammes LBP uniformes sur une grille de cellules.
+
+    Tout le batch est traité d'un bloc : les codes LBP des B visages sont calculés par
+    décalages de tableaux, puis tous les histogrammes par un seul np.bincount.
+    Les vecteurs sont normalisés (racine carrée + L2) pour une comparaison par produit scalaire.
+    """
+
+    def __init__(self, taille=TAILLE_VISAGE_LBP, grille=8):
+        self.taille = taille
+        self.grille = grille
+        self.dimension = grille * grille * _NB_MOTIFS_LBP
+        # Identifie l'extracteur dans la clé du cache de la galerie
+        self.signature = f"lbp-{taille}-{grille}"
+
+    def _preparer(self, visages):
+        batch = np.empty((len(visages), self.taille, self.taille), dtype=np.uint8)
+        for k, visage in enumerate(visages):
+            if visage.ndim == 3:
+                visage = cv2.cvtColor(visage, cv2.COLOR_BGR2GRAY)
+            batch[k] = cv2.resize(visage, (self.taille, self.taille))
+        # Les codes LBP ne dépendent que de l'ordre des intensités : pas besoin de normaliser l'éclairage
+        return batch.astype(np.int16)
+
+    def extraire(self, visages):
+        """Retourne une matrice float32 (B, D) de vecteurs normalisés."""
+        if len(visages) == 0:
+            return np.empty((0, self.dimension), dtype=np.float32)
+
+        batch = self._preparer(visages)
+        centre = batch[:, 1:-1, 1:-1]
+        h, w = centre.shape[1:]
+        codes = np.zeros(centre.shape, dtype=np.uint8)
+        voisins = [(-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1)]
+        for bit, (dy, dx) in enumerate(voisins):
+            voisin = batch[:, 1 + dy:1 + dy + h, 1 + dx:1 + dx + w]
+            codes |= (voisin >= centre).astype(np.uint8) << bit
+        motifs = _TABLE_LBP[codes]
+
+        # Indice de cellule de chaque pixel, puis un seul bincount pour tout le batch
+        cellule_y = (np.arange(h) * self.grille // h)[:, np.newaxis]
+        cellule_x = (np.arange(w) * self.grille // w)[np.newaxis, :]
+        cellule = cellule_y * self.grille + cellule_x
+        nb_cases = self.grille * self.grille * _NB_MOTIFS_LBP
+        decalage_batch = (np.arange(len(visages)) * nb_cases)[:, np.newaxis, np.newaxis]
+        indices = decalage_batch + cellule[np.newaxis] * _NB_MOTIFS_LBP + motifs
+        histogrammes = np.bincount(indices.ravel(), minlength=len(visages) * nb_cases)
+        histogrammes = histogrammes.reshape(len(visages), nb_cases).astype(np.float32)
+
+        vecteurs = np.sqrt(histogrammes)
+        vecteurs /= np.maximum(np.linalg.norm(vecteurs, axis=1, keepdims=True), 1e-12)
+        return vecteurs
+
+
+class ExtracteurDNN:
+    """
+    Extracteur par réseau de neurones (ex: SFace, ONNX) exécuté sur CPU avec cv2.dnn.
+
+    Tous les visages de la frame forment un seul blob : une seule passe avant du réseau.
+    """
+
+    def __init__(self, model_path, taille=TAILLE_VISAGE_DNN):
+        self.taille = taille
+        self.net = cv2.dnn.readNetFromONNX(model_path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.dimension = None
+        stat = os.stat(model_path)
+        self.signature = f"dnn-{os.path.abspath(model_path)}-{stat.st_size}-{stat.st_mtime_ns}-{taille}"
+    def extraire(self, visages):
+        if len(visages) == 0:
+            return np.empty((0, self.dimension or 0), dtype=np.float32)
+
+        images = [
+            cv2.cvtColor(visage, cv2.COLOR_GRAY2BGR) if visage.ndim == 2 else visage
+            for visage in visages
+        ]
+        blob = cv2.dnn.blobFromImages(images, 1.0, (self.taille, self.taille), (0, 0, 0), True, False)
+        self.net.setInput(blob)
+        vecteurs = self.net.forward().reshape(len(visages), -1).astype(np.float32)
+        self.dimension = vecteurs.shape[1]
+        vecteurs /= np.maximum(np.linalg.norm(vecteurs, axis=1, keepdims=True), 1e-12)
+        return vecteurs
+
+
+class IndexIVF:
+    """
+    Index approximatif (fichier inversé) pour les grandes galeries.
+
+    Les vecteurs sont répartis en `nb_listes` groupes par k-moyennes ; une requête n'est
+    comparée qu'aux vecteurs des `nb_sondes` groupes dont le centre est le plus proche.
+    """
+
+    def __init__(self, vecteurs, nb_listes=None, nb_sondes=4, iterations=10, graine=0):
+        nb_vecteurs = vecteurs.shape[0]
+        self.nb_listes = nb_listes or max(1, int(np.sqrt(nb_vecteurs)))
+        self.nb_sondes = min(nb_sondes, self.nb_listes)
+
+        rng = np.random.default_rng(graine)
+        centres = vecteurs[rng.choice(nb_vecteurs, self.nb_listes, replace=False)].copy()
+        for _ in range(iterations):
+            affectation = np.argmax(vecteurs @ centres.T, axis=1)
+            for c in range(self.nb_listes):
+                membres = vecteurs[affectation == c]
+                if len(membres):
+                    centre = membres.mean(axis=0)
+                    centres[c] = centre / max(np.linalg.norm(centre), 1e-12)
+
+        self.centres = np.ascontiguousarray(centres, dtype=np.float32)
+        affectation = np.argmax(vecteurs @ self.centres.T, axis=1)
+        self.listes = [np.flatnonzero(affectation == c) for c in range(self.nb_listes)]
+
+    def rechercher(self, galerie, requetes):
+        """Retourne (indices, similarités) du plus proche voisin approximatif de chaque requête."""
+        sondes = np.argsort(-(requetes @ self.centres.T), axis=1)[:, :self.nb_sondes]
+        indices = np.full(len(requetes), -1, dtype=np.intp)
+        similarites = np.full(len(requetes), -1.0, dtype=np.float32)
+        for k, listes in enumerate(sondes):
+            candidats = np.concatenate([self.listes[c] for c in listes])
+            if candidats.size == 0:
+                continue
+            scores = galerie[candidats] @ requetes[k]
+            meilleur = int(np.argmax(scores))
+            indices[k] = candidats[meilleur]
+            similarites[k] = scores[meilleur]
+        return indices, similarites
+
+
+def lire_base(folder_path, dossier_store=None):
+    """
+    Retourne (faces, labels, noms) de la base : visages recadrés du store (ingéré ou mis
+    à jour si besoin) avec `dossier_store`, sinon photos entières redimensionnées.
+    """
+    if dossier_store:
+        store = ingestion_visages.ingerer_base_visages(folder_path, dossier_store)
+        return store.visages, store.labels, store.noms
+    return reconnaissance_faciale.lire_base_visages(folder_path)
+
+
+class BackendIdentification(ABC):
+    """
+    Interface commune des méthodes d'identification (LBPH, vecteurs caractéristiques).
+
+    `identifier_ids` identifie d'un coup tous les visages d'une frame et retourne, pour
+    chacun, l'indice de la personne dans `noms` (ou une identité spéciale
+    reconnaissance_faciale.IDENTITE_*) et la confiance. La confiance est propre au
+    backend (distance pour LBPH, similarité cosinus pour les vecteurs caractéristiques) :
+    seul `est_certain` sait dire si un match est sûr.
+    `identifier_batch` donne le même résultat sous forme de (nom, confiance).
+    """
+
+    nom = "base"
+
+    def __init__(self):
+        self.noms = []
+
+    @abstractmethod
+    def entrainer(self, faces, labels, noms):
+        """Entraîne le backend sur des visages 200x200 et leurs labels (indices dans `noms`)."""
+
+    @abstractmethod
+    def identifier_ids(self, faces):
+        """Retourne (identites (B,) int32, confiances (B,) float32) pour une liste de visages en niveaux de gris."""
+
+    @abstractmethod
+    def est_certain(self, confiances):
+        """Retourne un masque (B,) bool : True si la confiance d'un match le rend sûr (cache long)."""
+
+    def preparer(self, folder_path, dossier_store=None, **options):
+        """
+        Lit toute la base (un sous-dossier par personne) et entraîne le backend. Retourne True si prêt.
+
+        Avec `dossier_store`, l'entraînement utilise les visages détectés et recadrés du
+        store (voir ingestion_visages) au lieu des photos entières.
+        """
+        faces, labels, noms = lire_base(folder_path, dossier_store)
+        if len(faces) == 0:
+            print("Aucune image de visage trouvée pour l'entraînement.")
+            return False
+        self.entrainer(faces, labels, noms)
+        return True
+
+    def identifier_batch(self, faces):
+        identites, confiances = self.identifier_ids(faces)
+        return [
+            (reconnaissance_faciale.nom_identite(int(identite), self.noms), float(confiance))
+            for identite, confiance in zip(identites, confiances)
+        ]
+
+
+class BackendLBPH(BackendIdentification):
+    """
+    LBPH d'OpenCV (comportement de reconnaissance_faciale) : une prédiction par visage.
+
+    `preparer` passe par reconnaissance_faciale.preparer_base_de_donnees_visages et
+    réutilise le modèle qu'elle a entraîné ou relu du cache ; `entrainer` entraîne un
+    modèle indépendant (comparaison des backends).
+    """
+
+    nom = "lbph"
+
+    def __init__(self, seuil_distance=90, seuil_certitude=reconnaissance_faciale.SEUIL_CERTITUDE_LBPH):
+        super().__init__()
+        self.seuil_distance = seuil_distance
+        self.seuil_certitude = seuil_certitude
+        self.recognizer = None
+
+    def entrainer(self, faces, labels, noms):
+        self.recognizer = cv2.face.LBPHFaceRecognizer_create()
+        self.recognizer.train(list(faces), np.asarray(labels))
+        self.noms = list(noms)
+
+    def preparer(self, folder_path, **options):
+        if not reconnaissance_faciale.preparer_base_de_donnees_visages(folder_path, **options):
+            return False
+        self.recognizer = reconnaissance_faciale.face_recognizer
+        self.noms = list(reconnaissance_faciale.known_faces_names)
+        return True
+
+    def identifier_ids(self, faces):
+        identites = np.full(len(faces), reconnaissance_faciale.IDENTITE_NON_ENTRAINE, dtype=np.int32)
+        confiances = np.zeros(len(faces), dtype=np.float32)
+        if self.recognizer is None or not self.noms:
+            return identites, confiances
+        for k, face in enumerate(faces):
+            try:
+                label_id, distance = self.recognizer.predict(cv2.resize(face, (200, 200)))
+            except cv2.error:
+                identites[k] = reconnaissance_faciale.IDENTITE_ERREUR
+                continue
+            confiances[k] = distance
+            if distance < self.seuil_distance and label_id < len(self.noms):
+                identites[k] = label_id
+            else:
+                identites[k] = reconnaissance_faciale.IDENTITE_INCONNUE
+        return identites, confiances
+
+    def est_certain(self, confiances):
+        return reconnaissance_faciale.est_certain_lbph(confiances, self.seuil_certitude)
+
+
+class BackendEmbeddings(BackendIdentification):
+    """
+    Identification par vecteurs caractéristiques et plus proche voisin.
+
+    La galerie est une matrice float32 contiguë (N, D) de vecteurs normalisés : un batch
+    de B visages est comparé à toute la galerie par un seul produit matriciel (B, D) x (D, N).
+    Pour les galeries de plus de `seuil_index` images, un index IVF approximatif est utilisé.
+
+    `preparer` met la galerie et ses labels en cache (galerie.npz + galerie_meta.json),
+    avec pour clé l'empreinte de la base (manifeste, ou store de visages) et de
+    l'extracteur : tant qu'elles ne changent pas, la galerie est relue sans rien extraire.
+
+    Args:
+        extracteur: ExtracteurLBP (par défaut) ou ExtracteurDNN.
+        seuil_similarite (float): Similarité cosinus minimale pour accepter un match.
+        seuil_certitude (float): Similarité cosinus à partir de laquelle un match est jugé sûr.
+        seuil_index (int): Taille de galerie à partir de laquelle l'index approximatif est construit.
+    """
+
+    nom = "embeddings"
+
+    def __init__(self, extracteur=None, seuil_similarite=0.6, seuil_certitude=0.75, seuil_index=SEUIL_INDEX_APPROXIMATIF):
+        super().__init__()
+        self.extracteur = extracteur or ExtracteurLBP()
+        self.seuil_similarite = seuil_similarite
+        self.seuil_certitude = seuil_certitude
+        self.seuil_index = seuil_index
+        self.galerie = None
+        self.labels = None
+        self.index = None
+
+    def entrainer(self, faces, labels, noms):
+        self.galerie = np.ascontiguousarray(self.extracteur.extraire(list(faces)), dtype=np.float32)
+        self.labels = np.asarray(labels, dtype=np.intp)
+        self.noms = list(noms)
+        self.index = IndexIVF(self.galerie) if len(self.galerie) >= self.seuil_index else None
+
+    def preparer(self, folder_path, dossier_store=None, dossier_cache=reconnaissance_faciale.CACHE_FOLDER,
+                 entrainer=True, **options):
+        """
+        Relit la galerie depuis `dossier_cache` si elle est à jour, sinon la calcule sur la
+        base (visages du store avec `dossier_store`, photos entières sinon) et l'y enregistre.
+
+        Avec entrainer=False, la galerie est seulement relue depuis un cache à jour : c'est
+        le mode des processus workers, une fois le cache préparé par le processus principal.
+        """
+        if dossier_store:
+            store = ingestion_visages.ingerer_base_visages(folder_path, dossier_store)
+            empreinte_base = store.empreinte
+        else:
+            store = None
+            empreinte_base = reconnaissance_faciale.empreinte_manifeste(
+                reconnaissance_faciale.construire_manifeste(folder_path)
+            )
+        empreinte = reconnaissance_faciale.empreinte_manifeste({
+            "base": empreinte_base,
+            "source": "store" if store is not None else "photos",
+            "extracteur": self.extracteur.signature,
+        })
+
+        if dossier_cache and self._charger_galerie(dossier_cache, empreinte):
+            print(f"Galerie de visages chargée depuis le cache ({len(self.galerie)} images, {len(self.noms)} personnes).")
+            return True
+        if not entrainer:
+            print("Aucune galerie de visages à jour dans le cache.")
+            return False
+
+        if store is not None:
+            faces, labels, noms = store.visages, store.labels, store.noms
+        else:
+            faces, labels, noms = reconnaissance_faciale.lire_base_visages(folder_path)
+        if len(faces) == 0:
+            print("Aucune image de visage trouvée pour l'entraînement.")
+            return False
+        print(f"Calcul de la galerie de visages ({len(faces)} images)...")
+        self.entrainer(faces, labels, noms)
+        if dossier_cache:
+            self._sauvegarder_galerie(dossier_cache, empreinte)
+        return True
+
+    def _sauvegarder_galerie(self, dossier_cache, empreinte):
+        """Écrit la galerie puis ses métadonnées (fichiers temporaires remplacés d'un coup, comme le cache LBPH)."""
+        chemin_galerie = os.path.join(dossier_cache, "galerie.npz")
+        chemin_meta = os.path.join(dossier_cache, "galerie_meta.json")
+        # L'extension doit rester .npz : np.savez l'ajouterait sinon
+        temporaire_galerie = os.path.join(dossier_cache, f"galerie.{os.getpid()}.tmp.npz")
+        temporaire_meta = f"{chemin_meta}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(dossier_cache, exist_ok=True)
+            np.savez(temporaire_galerie, galerie=self.galerie, labels=self.labels)
+            with open(temporaire_meta, "w", encoding="utf-8") as f:
+                json.dump({"empreinte": empreinte, "noms": self.noms}, f)
+            os.replace(temporaire_galerie, chemin_galerie)
+            os.replace(temporaire_meta, chemin_meta)
+        except OSError as e:
+            print(f"Attention : impossible de sauvegarder le cache de la galerie de visages : {e}")
+
+    def _charger_galerie(self, dossier_cache, empreinte):
+        """Relit la galerie en cache si son empreinte correspond ; retourne True si chargée."""
+        try:
+            with open(os.path.join(dossier_cache, "galerie_meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("empreinte") != empreinte:
+                return False
+            with np.load(os.path.join(dossier_cache, "galerie.npz")) as contenu:
+                galerie, labels = contenu["galerie"], contenu["labels"]
+        except (OSError, ValueError, KeyError):
+            return False
+        self.galerie = np.ascontiguousarray(galerie, dtype=np.float32)
+        self.labels = labels.astype(np.intp)
+        self.noms = list(meta["noms"])
+        self.extracteur.dimension = self.galerie.shape[1]
+        self.index = IndexIVF(self.galerie) if len(self.galerie) >= self.seuil_index else None
+        return True
+
+    def ajouter(self, faces, label_id):
+        """Ajoute les images d'une personne (inscription) sans recalculer la galerie."""
+        vecteurs = self.extracteur.extraire(list(faces))
+        if self.galerie is None:
+            # Inscription avant tout entraînement : galerie vide (0, D)
+            self.galerie = np.empty((0, vecteurs.shape[1]), dtype=np.float32)
+            self.labels = np.empty(0, dtype=np.intp)
+        self.galerie = np.ascontiguousarray(np.concatenate([self.galerie, vecteurs]), dtype=np.float32)
+        self.labels = np.concatenate([self.labels, np.full(len(vecteurs), label_id, dtype=np.intp)])
+        if self.index is not None or len(self.galerie) >= self.seuil_index:
+            self.index = IndexIVF(self.galerie)
+
+    def rechercher(self, vecteurs):
+        """Retourne (indices, similarités) du plus proche voisin de chaque vecteur dans la galerie."""
+        if self.index is not None:
+            return self.index.rechercher(self.galerie, vecteurs)
+        similarites = vecteurs @ self.galerie.T
+        indices = np.argmax(similarites, axis=1)
+        return indices, similarites[np.arange(len(vecteurs)), indices]
+
+    def identifier_ids(self, faces):
+        if self.galerie is None or len(self.galerie) == 0 or len(faces) == 0:
+            return (np.full(len(faces), reconnaissance_faciale.IDENTITE_NON_ENTRAINE, dtype=np.int32),
+                    np.zeros(len(faces), dtype=np.float32))
+
+        indices, similarites = self.rechercher(self.extracteur.extraire(list(faces)))
+        reconnus = (indices >= 0) & (similarites >= self.seuil_similarite)
+        identites = np.where(reconnus, self.labels[indices], reconnaissance_faciale.IDENTITE_INCONNUE)
+        return identites.astype(np.int32), similarites.astype(np.float32)
+
+    def est_certain(self, confiances):
+        # Similarité cosinus : plus elle est grande, plus le match est sûr
+        return np.asarray(confiances) >= self.seuil_certitude
+
+
+BACKENDS = {
+    BackendLBPH.nom: BackendLBPH,
+    BackendEmbeddings.nom: BackendEmbeddings,
+}
+
+
+def preparer_backend(folder_path, nom=None, **options):
+    """
+    Crée le backend d'identification `nom` (BACKEND_IDENTIFICATION par défaut) et le
+    prépare sur la base `folder_path`. Les `options` (dossier_store, dossier_cache,
+    entrainer) sont celles de reconnaissance_faciale.preparer_base_de_donnees_visages.
+
+    Returns:
+        BackendIdentification: Le backend prêt, ou None si la base est vide ou le nom inconnu.
+    """
+    nom = nom or BACKEND_IDENTIFICATION
+    if nom not in BACKENDS:
+        print(f"Erreur : Backend d'identification inconnu '{nom}' (disponibles : {', '.join(BACKENDS)}).")
+        return None
+    backend = BACKENDS[nom]()
+    return backend if backend.preparer(folder_path, **options) else None
+
+
+def comparer_backends(backends, folder_path, proportion_test=0.3, graine=0, dossier_store=None):
+    """
+    Compare plusieurs backends sur la même base : entraînement sur une partie des images
+    de chaque personne, test sur le reste.
+
+    Returns:
+        dict: {nom_backend: {"precision": ..., "ms_par_visage": ..., "s_entrainement": ...}}
+    """
+    faces, labels, noms = lire_base(folder_path, dossier_store)
+    labels = np.asarray(labels)
+    rng = np.random.default_rng(graine)
+    test = rng.random(len(faces)) < proportion_test
+
+    faces_entrainement = [f for f, t in zip(faces, test) if not t]
+    faces_test = [f for f, t in zip(faces, test) if t]
+
+    bilan = {}
+    for backend in backends:
+        debut = time.perf_counter()
+        backend.entrainer(faces_entrainement, labels[~test], noms)
+        duree_entrainement = time.perf_counter() - debut
+
+        debut = time.perf_counter()
+        predictions = backend.identifier_batch(faces_test)
+        duree_test = time.perf_counter() - debut
+
+        attendus = [noms[label] for label in labels[test]]
+        corrects = sum(nom == attendu for (nom, _), attendu in zip(predictions, attendus))
+        bilan[backend.nom] = {
+            "precision": corrects / len(faces_test) if faces_test else 0.0,
+            "ms_par_visage": 1000.0 * duree_test / max(len(faces_test), 1),
+            "s_entrainement": duree_entrainement,
+        }
+        print(
+            f"{backend.nom:>10} : précision {bilan[backend.nom]['precision']:.1%}, "
+            f"{bilan[backend.nom]['ms_par_visage']:.2f} ms/visage, "
+            f"entraînement {duree_entrainement:.2f} s"
+        )
+    return bilan
+
+
+if __name__ == "__main__":
+    comparer_backends(
+        [BackendLBPH(), BackendEmbeddings()], reconnaissance_faciale.DATABASE_FOLDER,
+        dossier_store=reconnaissance_faciale.DOSSIER_STORE_VISAGES
+    )
@@ -0,0 +1,235 @@
+# ingestion_visages.py (Prétraitement parallèle et mis en cache de la base de photos)
+
+import cv2
+import os
+import json
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import numpy as np
+
+import reconnaissance_faciale
+
+# Dossier du store de visages normalisés (visages.npy + index.json)
+STORE_FOLDER = reconnaissance_faciale.DOSSIER_STORE_VISAGES or '.store_visages'
+
+TAILLE_VISAGE = 200
+
+# Raisons de rejet d'une image
+REJET_ILLISIBLE = "illisible"
+REJET_AUCUN_VISAGE = "aucun visage détecté"
+
+# Classifieurs Haar propres à chaque thread/processus (detectMultiScale n'est pas partagé)
+_local = threading.local()
+
+
+def _classifieurs(cascade_path):
+    if getattr(_local, "cascade_path", None) != cascade_path:
+        _local.cascade_path = cascade_path
+        _local.visage = cv2.CascadeClassifier(cascade_path)
+        # Classifieur des yeux fourni avec les roues pip d'OpenCV (alignement désactivé s'il manque)
+        chemin_yeux = os.path.join(cv2.data.haarcascades, "haarcascade_eye.xml") if hasattr(cv2, "data") else ""
+        _local.yeux = cv2.CascadeClassifier(chemin_yeux) if os.path.exists(chemin_yeux) else None
+    return _local.visage, _local.yeux
+
+
+def _aligner(gray, visage, cascade_yeux):
+    """Redresse le visage pour que les deux yeux soient à l'horizontale (si deux yeux sont trouvés)."""
+    x, y, w, h = visage
+    if cascade_yeux is None:
+        return gray
+    haut_visage = gray[y:y + h // 2, x:x + w]
+    yeux = cascade_yeux.detectMultiScale(haut_visage, scaleFactor=1.1, minNeighbors=5, minSize=(w // 10, w // 10))
+    if len(yeux) < 2:
+        return gray
+
+    # Les deux plus grands yeux, triés de gauche à droite
+    yeux = sorted(sorted(yeux, key=lambda e: e[2] * e[3], reverse=True)[:2], key=lambda e: e[0])
+    (x1, y1, w1, h1), (x2, y2, w2, h2) = yeux
+    dx = (x2 + w2 / 2) - (x1 + w1 / 2)
+    dy = (y2 + h2 / 2) - (y1 + h1 / 2)
+    angle = np.degrees(np.arctan2(dy, dx))
+    if abs(angle) < 1.0 or abs(angle) > 30.0:
+        return gray
+
+    centre = (x + w / 2, y + h / 2)
+    rotation = cv2.getRotationMatrix2D(centre, angle, 1.0)
+    return cv2.warpAffine(gray, rotation, (gray.shape[1], gray.shape[0]), flags=cv2.INTER_LINEAR)
+
+
+def pretraiter_image(image_path, cascade_path=reconnaissance_faciale.HAAR_CASCADE_PATH, marge=0.1):
+    """
+    Décode une photo, détecte le plus grand visage, l'aligne et le recadre en 200x200.
+
+    Returns:
+        tuple: (visage np.ndarray 200x200 ou None, raison du rejet ou None)
+    """
+    gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return None, REJET_ILLISIBLE
+
+    cascade_visage, cascade_yeux = _classifieurs(cascade_path)
+    visages = cascade_visage.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(40, 40))
+    if len(visages) == 0:
+        return None, REJET_AUCUN_VISAGE
+
+    visage = max(visages, key=lambda v: v[2] * v[3])
+    gray = _aligner(gray, visage, cascade_yeux)
+
+    x, y, w, h = visage
+    dm = int(max(w, h) * marge)
+    x1, y1 = max(0, x - dm), max(0, y - dm)
+    x2, y2 = min(gray.shape[1], x + w + dm), min(gray.shape[0], y + h + dm)
+    return cv2.resize(gray[y1:y2, x1:x2], (TAILLE_VISAGE, TAILLE_VISAGE)), None
+
+
+class StoreVisages:
+    """
+    Visages normalisés de la base, lus par projection mémoire (np.load mmap_mode='r').
+
+    Attributs:
+        visages (np.ndarray): Tableau (N, 200, 200) uint8 projeté en mémoire.
+        chemins (list): Chemin source de chaque visage.
+        labels (np.ndarray): Indice de la personne (dans `noms`) de chaque visage.
+        noms (list): Noms des personnes.
+        rejets (dict): {raison: [chemins]} des images écartées.
+        parametres (str): Empreinte des paramètres de recadrage (cascade, marge, taille).
+    """
+
+    def __init__(self, dossier):
+        with open(os.path.join(dossier, "index.json"), encoding="utf-8") as f:
+            index = json.load(f)
+        chemin_visages = os.path.join(dossier, "visages.npy")
+        if index["chemins"]:
+            self.visages = np.load(chemin_visages, mmap_mode="r")
+        else:
+            self.visages = np.empty((0, TAILLE_VISAGE, TAILLE_VISAGE), dtype=np.uint8)
+        self.chemins = index["chemins"]
+        self.labels = np.asarray(index["labels"], dtype=np.int32)
+        self.noms = index["noms"]
+        self.rejets = index["rejets"]
+        self.empreinte = index["empreinte"]
+        self.parametres = index["parametres"]
+        self._positions = {chemin: k for k, chemin in enumerate(self.chemins)}
+
+    def lire(self, image_path):
+        """Retourne le visage normalisé d'une image de la base, ou None si elle a été rejetée."""
+        k = self._positions.get(os.path.normpath(image_path))
+        return None if k is None else self.visages[k]
+
+
+def empreinte_parametres(cascade_path, marge):
+    """Empreinte des paramètres de recadrage : les changer invalide les visages du store."""
+    try:
+        stat = os.stat(cascade_path)
+        fichier_cascade = [stat.st_size, stat.st_mtime_ns]
+    except OSError:
+        fichier_cascade = None
+    return reconnaissance_faciale.empreinte_manifeste({
+        "cascade": os.path.abspath(cascade_path),
+        "fichier_cascade": fichier_cascade,
+        "marge": marge,
+        "taille": TAILLE_VISAGE,
+    })
+
+
+def ingerer_base_visages(folder_path, dossier_store=STORE_FOLDER, nb_workers=None,
+                         utiliser_processus=False, cascade_path=reconnaissance_faciale.HAAR_CASCADE_PATH, marge=0.1):
+    """
+    Prétraite toute la base de photos (décodage, détection, alignement, recadrage 200x200)
+    en parallèle et enregistre le résultat dans un store compact :
+    - visages.npy : tableau (N, 200, 200) uint8, relu par projection mémoire ;
+    - index.json : chemins, labels, noms, rejets et empreinte du manifeste de la base.
+
+    Si le manifeste de la base (voir reconnaissance_faciale.construire_manifeste) et les
+    paramètres de recadrage (cascade, marge) n'ont pas changé, le store existant est
+    réutilisé sans rien décoder.
+
+    Args:
+        folder_path (str): Dossier de la base (un sous-dossier par personne).
+        dossier_store (str): Dossier de sortie du store.
+        nb_workers (int): Taille du pool (par défaut : nombre de cœurs).
+        utiliser_processus (bool): Pool de processus au lieu de threads (OpenCV libère
+            déjà le GIL pendant le décodage et la détection, les threads suffisent en général).
+        cascade_path (str): Classifieur Haar de détection des visages.
+        marge (float): Marge ajoutée autour du visage détecté (part de sa taille).
+
+    Returns:
+        StoreVisages: Le store prêt à être lu.
+    """
+    manifeste = reconnaissance_faciale.construire_manifeste(folder_path)
+    parametres = empreinte_parametres(cascade_path, marge)
+    empreinte = reconnaissance_faciale.empreinte_manifeste({"manifeste": manifeste, "parametres": parametres})
+
+    chemin_index = os.path.join(dossier_store, "index.json")
+    if os.path.exists(chemin_index):
+        try:
+            store = StoreVisages(dossier_store)
+            if store.empreinte == empreinte:
+                print(f"Store de visages à jour ({len(store.chemins)} visages).")
+                return store
+            # Libère la projection de l'ancien visages.npy avant de le remplacer
+            # (sous Windows, un fichier projeté ne peut être ni tronqué ni remplacé)
+            del store
+        except (OSError, ValueError, KeyError):
+            pass
+
+    noms = list(manifeste)
+    images = [
+        (os.path.normpath(os.path.join(folder_path, name, image_name)), label)
+        for label, name in enumerate(noms)
+        for image_name in manifeste[name]
+    ]
+    print(f"Ingestion de {len(images)} images ({len(noms)} personnes)...")
+
+    nb_workers = nb_workers or os.cpu_count() or 1
+    Pool = ProcessPoolExecutor if utiliser_processus else ThreadPoolExecutor
+    with Pool(max_workers=nb_workers) as pool:
+        resultats = list(pool.map(
+            pretraiter_image, [chemin for chemin, _ in images], [cascade_path] * len(images), [marge] * len(images),
+            chunksize=8 if utiliser_processus else 1
+        ))
+
+    gardes = [k for k, (visage, _) in enumerate(resultats) if visage is not None]
+    rejets = {}
+    for (chemin, _), (_, raison) in zip(images, resultats):
+        if raison is not None:
+            rejets.setdefault(raison, []).append(chemin)
+
+    # Écriture dans des fichiers temporaires remplacés ensuite d'un coup (os.replace) :
+    # visages.npy d'abord, index.json en dernier, pour qu'un store interrompu en cours
+    # d'écriture ne soit jamais lu comme valide
+    os.makedirs(dossier_store, exist_ok=True)
+    if gardes:
+        chemin_visages = os.path.join(dossier_store, "visages.npy")
+        visages = np.lib.format.open_memmap(
+            chemin_visages + ".tmp", mode="w+",
+            dtype=np.uint8, shape=(len(gardes), TAILLE_VISAGE, TAILLE_VISAGE)
+        )
+        for position, k in enumerate(gardes):
+            visages[position] = resultats[k][0]
+        visages.flush()
+        del visages
+        os.replace(chemin_visages + ".tmp", chemin_visages)
+
+    with open(chemin_index + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({
+            "empreinte": empreinte,
+            "parametres": parametres,
+            "noms": noms,
+            "chemins": [images[k][0] for k in gardes],
+            "labels": [images[k][1] for k in gardes],
+            "rejets": rejets,
+        }, f)
+    os.replace(chemin_index + ".tmp", chemin_index)
+
+    compteur = Counter({raison: len(chemins) for raison, chemins in rejets.items()})
+    print(f"Ingestion terminée : {len(gardes)} visages gardés, {sum(compteur.values())} rejetés.")
+    for raison, nombre in compteur.most_common():
+        print(f"  - {raison} : {nombre}")
+    return StoreVisages(dossier_store)
+
+
+if __name__ == "__main__":
+    ingerer_base_visages(reconnaissance_faciale.DATABASE_FOLDER)
@@ -0,0 +1,280 @@
+# metriques.py (Instrumentation du pipeline : chronomètres par étape, compteurs, export Prometheus)
+
+import bisect
+import csv
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Bornes (secondes) des histogrammes de durée, au format Prometheus
+BORNES_DUREES = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+PORT_PAR_DEFAUT = 9108
+
+
+class _ChronometreNul:
+    """Chronomètre utilisé quand l'instrumentation est désactivée : ne fait rien."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_CHRONO_NUL = _ChronometreNul()
+
+
+class _Chronometre:
+    __slots__ = ("_registre", "_nom", "_debut")
+
+    def __init__(self, registre, nom):
+        self._registre = registre
+        self._nom = nom
+
+    def __enter__(self):
+        self._debut = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._registre.observer(self._nom, time.perf_counter() - self._debut)
+        return False
+
+
+class Histogramme:
+    """Histogramme cumulatif (export Prometheus) + fenêtre glissante pour les quantiles."""
+
+    def __init__(self, bornes=BORNES_DUREES, taille_fenetre=1000):
+        self.bornes = bornes
+        self.comptes = [0] * (len(bornes) + 1)
+        self.somme = 0.0
+        self.nombre = 0
+        self.fenetre = deque(maxlen=taille_fenetre)
+        self._verrou = threading.Lock()
+
+    def observer(self, valeur):
+        with self._verrou:
+            self.comptes[bisect.bisect_left(self.bornes, valeur)] += 1
+            self.somme += valeur
+            self.nombre += 1
+            self.fenetre.append(valeur)
+
+    def instantane(self):
+        """Copie cohérente (comptes, somme, nombre), prise sous le verrou de l'histogramme."""
+        with self._verrou:
+            return list(self.comptes), self.somme, self.nombre
+
+    def quantiles(self, qs=(0.5, 0.95, 0.99)):
+        with self._verrou:
+            if not self.fenetre:
+                return [0.0] * len(qs)
+            valeurs = np.fromiter(self.fenetre, dtype=np.float64)
+        return [float(v) for v in np.quantile(valeurs, qs)]
+
+
+class RegistreMetriques:
+    """
+    Registre des métriques du processus : histogrammes de durées, compteurs et jauges.
+
+    Désactivé, `chronometre()` retourne un objet vide partagé et `observer()`,
+    `incrementer()`, `jauge()` retournent immédiatement : le coût se limite à un test.
+    L'activation peut être changée à tout moment (activer / desactiver, ou une requête
+    POST sur /activer et /desactiver du serveur HTTP).
+    """
+
+    def __init__(self):
+        self.actif = False
+        self.histogrammes = {}
+        self.compteurs = {}
+        self.jauges = {}
+        self._verrou = threading.Lock()
+        self._trace = None
+
+    # --- Activation ---
+
+    def activer(self):
+        self.actif = True
+
+    def desactiver(self):
+        self.actif = False
+
+    # --- Mesures (chemin critique) ---
+
+    def chronometre(self, nom):
+        """Contexte mesurant la durée d'une étape : `with metriques.chronometre("haar"): ...`"""
+        if not self.actif:
+            return _CHRONO_NUL
+        return _Chronometre(self, nom)
+
+    def observer(self, nom, duree):
+        if not self.actif:
+            return
+        histogramme = self.histogrammes.get(nom)
+        if histogramme is None:
+            with self._verrou:
+                histogramme = self.histogrammes.setdefault(nom, Histogramme())
+        histogramme.observer(duree)
+        if self._trace is not None:
+            self._trace.ecrire("duree", nom, duree)
+
+    def incrementer(self, nom, valeur=1):
+        if not self.actif:
+            return
+        with self._verrou:
+            self.compteurs[nom] = self.compteurs.get(nom, 0) + valeur
+
+    def jauge(self, nom, valeur):
+        if not self.actif:
+            return
+        with self._verrou:
+            self.jauges[nom] = valeur
+        if self._trace is not None:
+            self._trace.ecrire("jauge", nom, valeur)
+
+    # --- Trace fichier ---
+
+    def activer_trace(self, chemin):
+        """Écrit chaque observation dans un fichier .csv ou .jsonl (selon l'extension)."""
+        self.desactiver_trace()
+        self._trace = _FichierTrace(chemin)
+
+    def desactiver_trace(self):
+        if self._trace is not None:
+            self._trace.fermer()
+            self._trace = None
+
+    # --- Export ---
+
+    def texte_prometheus(self, prefixe="vision"):
+        """Retourne toutes les métriques au format texte de Prometheus."""
+        # Copies prises sous verrou : le thread des frames peut ajouter des noms pendant l'export
+        with self._verrou:
+            histogrammes = list(self.histogrammes.items())
+            compteurs = list(self.compteurs.items())
+            jauges = list(self.jauges.items())
+        lignes = []
+        for nom, histogramme in sorted(histogrammes):
+            # Buckets, somme et nombre d'un même instantané : _bucket et _count concordent
+            comptes, somme, nombre = histogramme.instantane()
+            metrique = f"{prefixe}_{nom}_secondes"
+            lignes.append(f"# TYPE {metrique} histogram")
+            cumul = 0
+            for borne, compte in zip(histogramme.bornes, comptes):
+                cumul += compte
+                lignes.append(f'{metrique}_bucket{{le="{borne}"}} {cumul}')
+            lignes.append(f'{metrique}_bucket{{le="+Inf"}} {nombre}')
+            lignes.append(f"{metrique}_sum {somme:.6f}")
+            lignes.append(f"{metrique}_count {nombre}")
+            for q, valeur in zip((0.5, 0.95, 0.99), histogramme.quantiles()):
+                lignes.append(f'{prefixe}_{nom}_fenetre_secondes{{quantile="{q}"}} {valeur:.6f}')
+        for nom, valeur in sorted(compteurs):
+            lignes.append(f"# TYPE {prefixe}_{nom}_total counter")
+            lignes.append(f"{prefixe}_{nom}_total {valeur}")
+        for nom, valeur in sorted(jauges):
+            lignes.append(f"# TYPE {prefixe}_{nom} gauge")
+            lignes.append(f"{prefixe}_{nom} {valeur}")
+        lignes.append(f"{prefixe}_instrumentation_active {int(self.actif)}")
+        return "\n".join(lignes) + "\n"
+
+    def reinitialiser(self):
+        with self._verrou:
+            self.histogrammes.clear()
+            self.compteurs.clear()
+            self.jauges.clear()
+
+
+class _FichierTrace:
+    """Fichier de trace avec tampon, vidé au plus toutes les `periode` secondes."""
+
+    def __init__(self, chemin, periode=1.0):
+        self.format_csv = chemin.endswith(".csv")
+        self._fichier = open(chemin, "a", encoding="utf-8", newline="")
+        self._csv = csv.writer(self._fichier) if self.format_csv else None
+        self._verrou = threading.Lock()
+        self._periode = periode
+        self._dernier_vidage = time.time()
+
+    def ecrire(self, type_mesure, nom, valeur):
+        instant = time.time()
+        with self._verrou:
+            if self._fichier.closed:
+                return
+            if self._csv is not None:
+                self._csv.writerow((f"{instant:.6f}", type_mesure, nom, valeur))
+            else:
+                self._fichier.write(json.dumps({"t": instant, "type": type_mesure, "nom": nom, "valeur": valeur}) + "\n")
+            if instant - self._dernier_vidage > self._periode:
+                self._fichier.flush()
+                self._dernier_vidage = instant
+
+    def fermer(self):
+        with self._verrou:
+            self._fichier.close()
+
+
+# Registre global du processus
+METRIQUES = RegistreMetriques()
+chronometre = METRIQUES.chronometre
+observer = METRIQUES.observer
+incrementer = METRIQUES.incrementer
+jauge = METRIQUES.jauge
+
+
+class _GestionnaireHTTP(BaseHTTPRequestHandler):
+    registre = METRIQUES
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._repondre(self.registre.texte_prometheus().encode("utf-8"))
+        elif self.path in ("/activer", "/desactiver"):
+            # Changement d'état : POST seulement (un GET ne doit rien modifier)
+            self.send_response(405)
+            self.send_header("Allow", "POST")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        if self.path == "/activer":
+            self.registre.activer()
+            self._repondre(b"instrumentation activee\n")
+        elif self.path == "/desactiver":
+            self.registre.desactiver()
+            self._repondre(b"instrumentation desactivee\n")
+        else:
+            self.send_error(404)
+
+    def _repondre(self, corps):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corps)))
+        self.end_headers()
+        self.wfile.write(corps)
+
+    def log_message(self, format, *args):
+        pass # Pas de journal par requête dans la console
+
+
+def demarrer_serveur(port=PORT_PAR_DEFAUT, hote="127.0.0.1"):
+    """
+    Sert /metrics (GET, format Prometheus), /activer et /desactiver (POST) dans un thread de fond.
+
+    Si le port est déjà pris (second poste, redémarrage rapide), l'erreur est affichée et
+    le pipeline continue sans serveur : retourne None.
+    """
+    try:
+        serveur = ThreadingHTTPServer((hote, port), _GestionnaireHTTP)
+    except OSError as e:
+        print(f"Attention : serveur de métriques non démarré sur {hote}:{port} : {e}")
+        return None
+    thread = threading.Thread(target=serveur.serve_forever, name="serveur-metriques", daemon=True)
+    thread.start()
+    print(f"Métriques disponibles sur http://{hote}:{port}/metrics")
+    return serveur
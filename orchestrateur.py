@@ -0,0 +1,547 @@
+# orchestrateur.py (Pipeline concurrent : capture / inférence / rendu)
+
+import cv2
+import threading
+import queue
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import test1
+import reconnaissance_faciale
+import identification_embeddings
+import metriques
+import rendu as rendu_frames
+import suivi
+import vision_bras
+from porte_mouvement import PorteMouvement
+from tuilage import Tuilage
+from comportement import AnalyseComportements, EcrivainEvenements
+from resultats_frame import ResultatsFrame, extraire_boites
+
+
+class FileDerniereFrame:
+    """
+    File bornée à une seule place : déposer une nouvelle valeur remplace celle
+    qui attend encore (elle est alors comptée comme perdue).
+
+    Le consommateur récupère donc toujours la valeur la plus récente, ce qui
+    empêche la latence de croître quand une étape est plus lente que la capture.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._valeur = None
+        self._presente = False
+        self._fermee = False
+        self.nb_pertes = 0
+
+    def deposer(self, valeur):
+        with self._condition:
+            if self._presente:
+                self.nb_pertes += 1
+            self._valeur = valeur
+            self._presente = True
+            self._condition.notify()
+
+    def prendre(self, timeout=None):
+        """Retourne la dernière valeur déposée, ou None si la file est fermée / timeout."""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._presente or self._fermee, timeout):
+                return None
+            if not self._presente:
+                return None
+            valeur = self._valeur
+            self._valeur = None
+            self._presente = False
+            return valeur
+
+    def a_valeur(self):
+        with self._condition:
+            return self._presente
+
+    def fermer(self):
+        with self._condition:
+            self._fermee = True
+            self._condition.notify_all()
+
+
+class FrameCapturee:
+    """Frame brute avec son identifiant et son instant de capture."""
+
+    __slots__ = ("frame_id", "t_capture", "frame")
+
+    def __init__(self, frame_id, t_capture, frame):
+        self.frame_id = frame_id
+        self.t_capture = t_capture
+        self.frame = frame
+
+
+class FrameJointe:
+    """Frame accompagnée des résultats de toutes les étapes, joints par frame_id."""
+
+    __slots__ = ("frame_id", "t_capture", "frame", "resultats")
+
+    def __init__(self, frame_id, t_capture, frame, resultats):
+        self.frame_id = frame_id
+        self.t_capture = t_capture
+        self.frame = frame
+        self.resultats = resultats
+
+
+class StatistiquesPipeline:
+    """Latence de bout en bout (capture -> affichage) et compteurs de frames perdues."""
+
+    def __init__(self, taille_fenetre=300):
+        self._latences = deque(maxlen=taille_fenetre)
+        self._verrou = threading.Lock()
+        self.nb_capturees = 0
+        self.nb_traitees = 0
+        self.nb_reutilisees = 0
+        self.nb_affichees = 0
+
+    def enregistrer_latence(self, latence):
+        with self._verrou:
+            self._latences.append(latence)
+
+    def latences_ms(self):
+        """Retourne (p50, p95, max) de la latence en millisecondes sur la fenêtre glissante."""
+        with self._verrou:
+            if not self._latences:
+                return (0.0, 0.0, 0.0)
+            valeurs = np.fromiter(self._latences, dtype=np.float64) * 1000.0
+        p50, p95 = np.percentile(valeurs, [50, 95])
+        return (float(p50), float(p95), float(valeurs.max()))
+
+
+class Orchestrateur:
+    """
+    Exécute la capture, les étapes d'inférence et le rendu de manière concurrente.
+
+    - La capture tourne dans son propre thread et dépose chaque frame dans une
+      FileDerniereFrame : les frames périmées sont abandonnées.
+    - Chaque étape (visages, detect, pose...) possède un worker dédié (un seul
+      thread par étape : les modèles ne sont pas partagés entre threads). Une même
+      frame est soumise à toutes les étapes, qui s'exécutent en parallèle.
+    - Jusqu'à `profondeur` frames peuvent être en vol : l'étape rapide peut déjà
+      traiter la frame N+1 pendant que l'étape lente termine la frame N.
+    - Les résultats sont joints par frame_id puis transmis au rendu (thread principal,
+      requis par cv2.imshow) via une autre FileDerniereFrame.
+    - Avec une `porte_mouvement`, une frame sans mouvement ne passe pas par les étapes :
+      elle reprend les résultats joints de la frame précédente, une fois celle-ci jointe.
+    - `analyse` reçoit chaque frame, analysée ou réutilisée, dès sa jointure, dans l'ordre
+      des frames et indépendamment du rendu (qui peut abandonner des frames).
+    - L'affichage passe par `affichage` (rendu.AffichageLimite) : cadence plafonnée, ou
+      aucune fenêtre sur un poste sans écran. Le rendu consulte orchestrateur.affichage
+      pour ne copier et dessiner que les frames qui seront affichées.
+
+    Args:
+        source: Index de webcam ou chemin vidéo passé à cv2.VideoCapture.
+        etapes (dict): {nom: fonction(frame) -> résultat}.
+        rendu (callable): fonction(frame_jointe, orchestrateur) -> image à afficher ou None.
+        profondeur (int): Nombre maximal de frames en cours d'inférence.
+        nom_fenetre (str): Titre de la fenêtre d'affichage.
+        porte_mouvement (PorteMouvement): Porte de mouvement optionnelle.
+        analyse (callable): fonction(frame_jointe) appelée dans le thread de jointure.
+        affichage (rendu.AffichageLimite): Fenêtre d'affichage (par défaut : chaque frame rendue).
+    """
+
+    def __init__(self, source, etapes, rendu, profondeur=2, nom_fenetre="Multi-Model Vision",
+                 porte_mouvement=None, analyse=None, affichage=None):
+        self.source = source
+        self.etapes = dict(etapes)
+        self.rendu = rendu
+        self.analyse = analyse
+        self.affichage = affichage or rendu_frames.AffichageLimite(nom_fenetre, frequence_max=None)
+        self.profondeur = max(1, int(profondeur))
+        self.nom_fenetre = nom_fenetre
+        self.stats = StatistiquesPipeline()
+        self.porte_mouvement = porte_mouvement
+        self._derniers_resultats = None
+
+        self._file_capture = FileDerniereFrame()
+        self._file_rendu = FileDerniereFrame()
+        self._file_resultats = queue.Queue(maxsize=self.profondeur * max(1, len(self.etapes)))
+        self._places_libres = threading.Semaphore(self.profondeur)
+        self._en_cours = {}
+        self._arret = threading.Event()
+        self._capture_terminee = threading.Event()
+        self._verrou_en_cours = threading.Lock()
+        self._workers = {
+            nom: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"etape-{nom}")
+            for nom in self.etapes
+        }
+        self._threads = []
+
+    # --- Threads internes ---
+
+    def _boucle_capture(self, cap):
+        frame_id = 0
+        while not self._arret.is_set():
+            success, frame = cap.read()
+            if not success:
+                print("Fin du flux vidéo (ou frame vide reçue).")
+                break
+            self._file_capture.deposer(FrameCapturee(frame_id, time.perf_counter(), frame))
+            self.stats.nb_capturees += 1
+            frame_id += 1
+        self._capture_terminee.set()
+        self._file_capture.fermer()
+
+    def _boucle_repartition(self):
+        while not self._arret.is_set():
+            # Attendre qu'une place se libère AVANT de prendre la frame : on récupère
+            # ainsi la plus récente au moment où le pipeline peut réellement la traiter.
+            if not self._places_libres.acquire(timeout=0.1):
+                continue
+            with self._verrou_en_cours:
+                capturee = self._file_capture.prendre(timeout=0)
+                if capturee is not None:
+                    self._en_cours[capturee.frame_id] = (capturee, {})
+            if capturee is None:
+                self._places_libres.release()
+                # Rien à traiter : attendre la prochaine frame sans garder le verrou
+                time.sleep(0.002)
+                continue
+
+            if self.porte_mouvement is not None and self._reutiliser(capturee):
+                continue
+
+            metriques.jauge("frames_en_vol", len(self._en_cours))
+            for nom, fonction in self.etapes.items():
+                future = self._workers[nom].submit(self._executer_etape, nom, fonction, capturee.frame)
+                future.add_done_callback(
+                    lambda f, fid=capturee.frame_id, n=nom: self._file_resultats.put((fid, n, f))
+                )
+
+    def _reutiliser(self, capturee):
+        """
+        Si la scène n'a pas bougé, confie la frame au thread de jointure pour qu'elle soit
+        analysée et rendue sans inférence, avec les résultats de la frame précédente.
+        """
+        with metriques.chronometre("porte_mouvement"):
+            relancer = self.porte_mouvement.evaluer(capturee.frame, forcer=self._derniers_resultats is None)
+        if relancer:
+            return False
+        # Étape None : frame réutilisée (voir _boucle_jointure)
+        self._file_resultats.put((capturee.frame_id, None, None))
+        return True
+
+    @staticmethod
+    def _executer_etape(nom, fonction, frame):
+        with metriques.chronometre(f"etape_{nom}"):
+            return fonction(frame)
+
+    def _boucle_jointure(self):
+        reutilisees = deque() # Frames réutilisées en attente, par frame_id croissant
+        while not self._arret.is_set():
+            try:
+                frame_id, nom, future = self._file_resultats.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            if nom is None:
+                reutilisees.append(frame_id)
+            else:
+                capturee, resultats = self._en_cours[frame_id]
+                try:
+                    resultats[nom] = future.result()
+                except Exception as e:
+                    print(f"Erreur dans l'étape '{nom}' (frame {frame_id}) : {e}")
+                    resultats[nom] = None
+                if len(resultats) < len(self.etapes):
+                    continue
+                self._derniers_resultats = resultats
+                self._publier(frame_id, resultats)
+
+            # Une frame réutilisée attend que toutes les frames plus anciennes soient jointes :
+            # le rendu et l'analyse ne reculent jamais dans le temps
+            while reutilisees and not self._plus_anciennes_en_vol(reutilisees[0]):
+                self.stats.nb_reutilisees += 1
+                metriques.incrementer("frames_reutilisees")
+                self._publier(reutilisees.popleft(), self._derniers_resultats)
+
+    def _plus_anciennes_en_vol(self, frame_id):
+        with self._verrou_en_cours:
+            return any(autre < frame_id for autre in self._en_cours)
+
+    def _publier(self, frame_id, resultats):
+        """Transmet une frame jointe (ou réutilisée) à l'analyse puis au rendu et libère sa place."""
+        capturee, _ = self._en_cours[frame_id]
+        jointe = FrameJointe(frame_id, capturee.t_capture, capturee.frame, resultats)
+        if self.analyse is not None:
+            try:
+                self.analyse(jointe)
+            except Exception as e:
+                print(f"Erreur dans l'analyse de la frame {frame_id} : {e}")
+        self._file_rendu.deposer(jointe)
+        with self._verrou_en_cours:
+            del self._en_cours[frame_id]
+        self._places_libres.release()
+        self.stats.nb_traitees += 1
+
+    # --- API publique ---
+
+    def nb_pertes(self):
+        """Retourne (frames perdues à la capture, frames perdues avant le rendu)."""
+        return (self._file_capture.nb_pertes, self._file_rendu.nb_pertes)
+
+    def _pipeline_vide(self):
+        """Vrai quand la capture est terminée et que plus aucune frame n'est en vol."""
+        if not self._capture_terminee.is_set():
+            return False
+        with self._verrou_en_cours:
+            return not self._en_cours and not self._file_capture.a_valeur()
+
+    def arreter(self):
+        self._arret.set()
+        self._file_capture.fermer()
+        self._file_rendu.fermer()
+
+    def executer(self):
+        """Lance le pipeline et exécute la boucle de rendu dans le thread appelant."""
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            print(f"Erreur : Impossible d'ouvrir la source vidéo ({self.source}).")
+            return
+
+        self._threads = [
+            threading.Thread(target=self._boucle_capture, args=(cap,), name="capture", daemon=True),
+            threading.Thread(target=self._boucle_repartition, name="repartition", daemon=True),
+            threading.Thread(target=self._boucle_jointure, name="jointure", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+        print(f"\nDémarrage du pipeline. {'Appuyez sur q' if self.affichage.actif else 'Ctrl+C'} pour quitter.")
+        try:
+            while not self._arret.is_set():
+                jointe = self._file_rendu.prendre(timeout=0.1)
+                if jointe is None:
+                    if self._pipeline_vide() and not self._file_rendu.a_valeur():
+                        break
+                    continue
+
+                with metriques.chronometre("rendu"):
+                    image = self.rendu(jointe, self)
+                latence = time.perf_counter() - jointe.t_capture
+                self.stats.enregistrer_latence(latence)
+                metriques.observer("latence_bout_en_bout", latence)
+                pertes_capture, pertes_rendu = self.nb_pertes()
+                metriques.jauge("frames_perdues_capture", pertes_capture)
+                metriques.jauge("frames_perdues_rendu", pertes_rendu)
+
+                if image is not None:
+                    self.stats.nb_affichees += 1
+                    if self.affichage.afficher(image):
+                        break
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.arreter()
+            for thread in self._threads:
+                thread.join(timeout=2.0)
+            for worker in self._workers.values():
+                worker.shutdown(wait=True, cancel_futures=True)
+            cap.release()
+            self.affichage.fermer()
+            self.afficher_bilan()
+
+    def afficher_bilan(self):
+        p50, p95, lat_max = self.stats.latences_ms()
+        pertes_capture, pertes_rendu = self.nb_pertes()
+        print(
+            f"Frames capturées: {self.stats.nb_capturees}, traitées: {self.stats.nb_traitees}, "
+            f"affichées: {self.stats.nb_affichees}"
+        )
+        if self.porte_mouvement is not None:
+            print(f"Frames sans mouvement (résultats réutilisés): {self.stats.nb_reutilisees}")
+        print(f"Frames abandonnées - capture: {pertes_capture}, rendu: {pertes_rendu}")
+        print(f"Latence bout-en-bout (ms) - p50: {p50:.1f}, p95: {p95:.1f}, max: {lat_max:.1f}")
+
+
+def construire_etapes(model_pose, model_detect=None, haar_cascade=None, backend_visages=None):
+    """
+    Construit le dictionnaire des étapes indépendantes exécutées sur chaque frame.
+
+    Les étapes visages et pose tournant en parallèle sur la même frame, la recherche
+    de visages guidée utilise les keypoints de la dernière frame traitée par la pose
+    (décalage d'une frame, couvert par la marge des régions de tête), de même que
+    l'association visage -> piste pour le cache d'identités.
+
+    Returns:
+        dict: {nom: fonction(frame) -> résultat}. L'étape "pose" retourne un ResultatsFrame
+        (personnes et pistes), "detect" et "visages" les tableaux à y ranger
+        (definir_objets, definir_visages).
+    """
+    dernieres_poses = {"valeur": (None, None, None)} # (keypoints, ids_pistes, boites)
+    # Le tracker vit dans l'étape pose : son worker unique voit les frames dans l'ordre
+    suivi_personnes = suivi.SuiviMultiObjets()
+    tuilage = None
+    if vision_bras.INFERENCE_TUILEE:
+        tuilage = Tuilage(
+            zone_lointaine=vision_bras.ZONE_LOINTAINE, taille_lointaine=vision_bras.TAILLE_TUILES_LOINTAINES
+        )
+
+    def etape_pose(frame):
+        if tuilage is not None:
+            results_pose = test1.executer_inference_tuilee(model_pose, frame, tuilage)
+        else:
+            results_pose = test1.executer_inference_frame(model_pose, frame)
+        resultats = ResultatsFrame.depuis_results(results_pose)
+        resultats.ids_pistes = suivi_personnes.mettre_a_jour(resultats.boites, resultats.keypoints)
+        # Un seul tuple remplacé d'un coup : l'étape visages lit toujours un triplet cohérent
+        dernieres_poses["valeur"] = (resultats.keypoints, resultats.ids_pistes, resultats.boites)
+        return resultats
+
+    etapes = {"pose": etape_pose}
+    if model_detect:
+        etapes["detect"] = lambda frame: extraire_boites(test1.executer_inference_frame(model_detect, frame))
+    if haar_cascade and backend_visages is not None:
+        recherche_visages = None
+        if vision_bras.RECHERCHE_VISAGES_GUIDEE:
+            recherche_visages = reconnaissance_faciale.RechercheVisagesGuidee(
+                vision_bras.PERIODE_SCAN_COMPLET_VISAGES
+            )
+        cache_identites = reconnaissance_faciale.CacheIdentitesPistes()
+
+        def etape_visages(frame):
+            keypoints, ids_pistes, boites = dernieres_poses["valeur"]
+            return reconnaissance_faciale.detecter_et_identifier_visages_tableaux(
+                frame, haar_cascade,
+                recherche_guidee=recherche_visages,
+                keypoints=keypoints,
+                cache_identites=cache_identites,
+                ids_pistes=ids_pistes,
+                boites_pistes=boites,
+                backend=backend_visages
+            )
+
+        etapes["visages"] = etape_visages
+    return etapes
+
+
+def assembler_resultats(resultats_etapes):
+    """Regroupe les sorties des étapes d'une frame (None si l'étape a échoué) en un ResultatsFrame."""
+    resultats = resultats_etapes.get("pose")
+    if resultats is None:
+        resultats = ResultatsFrame()
+    if resultats_etapes.get("detect") is not None:
+        resultats.definir_objets(*resultats_etapes["detect"])
+    if resultats_etapes.get("visages") is not None:
+        resultats.definir_visages(*resultats_etapes["visages"])
+    return resultats
+
+
+class RenduClasse:
+    """
+    Rendu des résultats joints, identique à celui de vision_bras, avec FPS et latence.
+
+    Seules les frames que `orchestrateur.affichage` va afficher sont copiées et dessinées
+    (dans son tampon réutilisé) ; les autres ne coûtent rien et le rendu retourne None.
+    """
+
+    def __init__(self):
+        self._fps_start_time = time.time()
+        self._fps_frame_count = 0
+        self._fps_text = "FPS: N/A"
+
+    def __call__(self, jointe, orchestrateur):
+        self._fps_frame_count += 1
+        if time.time() - self._fps_start_time >= 1.0:
+            fps = self._fps_frame_count / (time.time() - self._fps_start_time)
+            p50, p95, _ = orchestrateur.stats.latences_ms()
+            pertes_capture, pertes_rendu = orchestrateur.nb_pertes()
+            self._fps_text = f"FPS: {fps:.2f}"
+            print(
+                f"{self._fps_text} | latence p50 {p50:.0f} ms, p95 {p95:.0f} ms | "
+                f"pertes capture {pertes_capture}, rendu {pertes_rendu}"
+            )
+            self._fps_start_time = time.time()
+            self._fps_frame_count = 0
+
+        if not orchestrateur.affichage.doit_afficher():
+            return None
+        annotated_frame = orchestrateur.affichage.preparer(jointe.frame)
+        self.dessiner_resultats(annotated_frame, jointe.resultats)
+        vision_bras.dessiner_texte_fps(annotated_frame, self._fps_text)
+        return annotated_frame
+
+    def dessiner_resultats(self, annotated_frame, resultats):
+        vision_bras.dessiner_resultats(annotated_frame, assembler_resultats(resultats))
+
+
+def analyse_comportements(comportements):
+    """
+    Fonction d'analyse pour Orchestrateur(analyse=...) : transmet chaque frame jointe à
+    `comportements` (comportement.AnalyseComportements), dans l'ordre des frames.
+    """
+    def analyser(jointe):
+        with metriques.chronometre("comportements"):
+            # t_capture est un instant perf_counter : ramené à l'heure murale pour les événements
+            t = time.time() - (time.perf_counter() - jointe.t_capture)
+            comportements.mettre_a_jour(assembler_resultats(jointe.resultats), t, jointe.frame_id)
+    return analyser
+
+
+def run_orchestrateur(model_pose_path, model_detect_path, source=0, profondeur=2):
+    """Point d'entrée : charge les modèles puis lance le pipeline concurrent."""
+    print("\n--- Chargement des modèles ---")
+    model_pose = test1.charger_modele(model_pose_path, task="pose")
+    model_detect = test1.charger_modele(model_detect_path, task="detect")
+
+    haar_cascade = reconnaissance_faciale.charger_haarcascade(
+        reconnaissance_faciale.HAAR_CASCADE_PATH
+    )
+    backend_visages = identification_embeddings.preparer_backend(
+        reconnaissance_faciale.DATABASE_FOLDER, vision_bras.BACKEND_IDENTIFICATION,
+        dossier_store=reconnaissance_faciale.DOSSIER_STORE_VISAGES
+    )
+
+    if model_pose is None:
+        print("ERREUR CRITIQUE: Modèle de pose manquant. Arrêt.")
+        return
+    if haar_cascade is None or backend_visages is None:
+        print("ATTENTION: La reconnaissance faciale est désactivée (Haar Cascade ou DB non prêt).")
+
+    if vision_bras.METRIQUES_ACTIVES or vision_bras.TRACE_METRIQUES:
+        metriques.demarrer_serveur(vision_bras.PORT_METRIQUES)
+    if vision_bras.METRIQUES_ACTIVES:
+        metriques.METRIQUES.activer()
+    if vision_bras.TRACE_METRIQUES:
+        metriques.METRIQUES.activer_trace(vision_bras.TRACE_METRIQUES)
+
+    etapes = construire_etapes(model_pose, model_detect, haar_cascade, backend_visages)
+    porte = None
+    if vision_bras.PORTE_MOUVEMENT_ACTIVE:
+        porte = PorteMouvement(
+            sensibilite=vision_bras.SENSIBILITE_MOUVEMENT, age_max=vision_bras.AGE_MAX_REUTILISATION
+        )
+    comportements = None
+    if vision_bras.ANALYSE_COMPORTEMENTS:
+        ecrivain = EcrivainEvenements(vision_bras.FICHIER_EVENEMENTS) if vision_bras.FICHIER_EVENEMENTS else None
+        comportements = AnalyseComportements(ecrivain)
+    orchestrateur = Orchestrateur(
+        source, etapes, RenduClasse(), profondeur=profondeur, porte_mouvement=porte,
+        analyse=analyse_comportements(comportements) if comportements is not None else None,
+        affichage=rendu_frames.AffichageLimite(
+            "Multi-Model Vision", vision_bras.FREQUENCE_AFFICHAGE_MAX, vision_bras.AFFICHAGE_ACTIF
+        )
+    )
+    orchestrateur.executer()
+    if comportements is not None:
+        comportements.terminer()
+        if comportements.ecrivain is not None:
+            comportements.ecrivain.fermer()
+    metriques.METRIQUES.desactiver_trace()
+    print("Programme terminé.")
+
+
+if __name__ == "__main__":
+    # IMPORTANT: Remplacer ceci par le chemin réel de vos modèles YOLO
+    MODEL_POSE_PATH = 'yolo11m-pose.pt'
+    MODEL_DETECT_PATH = 'yolov8n.pt'
+
+    run_orchestrateur(MODEL_POSE_PATH, MODEL_DETECT_PATH)
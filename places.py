@@ -0,0 +1,216 @@
+# places.py (Plan des places d'une salle : affectation des personnes aux places et occupation)
+
+import json
+
+import cv2
+import numpy as np
+
+from detection_bras_lever import KEYPOINT_INDEX
+
+AUCUNE_PLACE = -1
+
+# Couleurs du dessin des places
+PLACE_COLOR_OCCUPEE = (0, 200, 0)
+PLACE_COLOR_VIDE = (128, 128, 128)
+
+
+def charger_plan(chemin, reduction=2):
+    """
+    Lit le plan des places d'une caméra (JSON) :
+
+        {"camera": "salle_b12", "largeur": 1920, "hauteur": 1080,
+         "places": [{"nom": "A1", "polygone": [[x, y], [x, y], ...]}, ...]}
+
+    Les coordonnées sont en pixels de l'image de référence (largeur x hauteur).
+
+    Returns:
+        CartePlaces: La carte précalculée, ou None si le fichier est illisible.
+    """
+    try:
+        with open(chemin, encoding="utf-8") as fichier:
+            plan = json.load(fichier)
+        return CartePlaces(
+            [place["nom"] for place in plan["places"]],
+            [place["polygone"] for place in plan["places"]],
+            plan["largeur"], plan["hauteur"], camera=plan.get("camera"), reduction=reduction,
+        )
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Erreur : Impossible de charger le plan des places {chemin} : {e}")
+        return None
+
+
+def points_ancrage(keypoints, boites=None, seuil_confiance=0.5):
+    """
+    Point d'ancrage (P, 2) de chaque personne pour l'affectation à une place : milieu des
+    hanches si elles sont fiables, sinon milieu des épaules (élève assis derrière une table),
+    sinon le bas du centre de la boîte. NaN si rien n'est disponible.
+    """
+    nb = keypoints.shape[0]
+    ancrages = np.full((nb, 2), np.nan, dtype=np.float32)
+    if nb == 0:
+        return ancrages
+    if boites is not None and len(boites) == nb:
+        ancrages[:, 0] = (boites[:, 0] + boites[:, 2]) / 2
+        ancrages[:, 1] = boites[:, 3]
+    for gauche, droite in (("épaule_gauche", "épaule_droite"), ("hanche_gauche", "hanche_droite")):
+        g, d = KEYPOINT_INDEX[gauche], KEYPOINT_INDEX[droite]
+        fiables = (keypoints[:, g, 2] >= seuil_confiance) & (keypoints[:, d, 2] >= seuil_confiance)
+        ancrages[fiables] = (keypoints[fiables, g, :2] + keypoints[fiables, d, :2]) / 2
+    return ancrages
+
+
+class CartePlaces:
+    """
+    Plan des places précalculé en image d'étiquettes.
+
+    Chaque polygone est rempli une fois (cv2.fillPoly) dans une image réduite d'un facteur
+    `reduction`, dont chaque pixel contient l'indice de la place (AUCUNE_PLACE ailleurs).
+    Affecter un point à une place revient alors à lire un pixel : le coût ne dépend ni du
+    nombre de places ni de leur forme, et toutes les personnes d'une frame sont traitées
+    par une seule indexation NumPy. En cas de chevauchement, la dernière place du plan l'emporte.
+
+    Args:
+        noms (list): Nom de chaque place.
+        polygones (list): Sommets (x, y) de chaque place, dans l'image de référence.
+        largeur, hauteur (int): Taille de l'image de référence de la caméra.
+        reduction (int): Facteur de réduction de l'image d'étiquettes.
+    """
+
+    def __init__(self, noms, polygones, largeur, hauteur, camera=None, reduction=2):
+        self.noms = list(noms)
+        self.polygones = [np.asarray(polygone, dtype=np.float32).reshape(-1, 2) for polygone in polygones]
+        self.largeur = largeur
+        self.hauteur = hauteur
+        self.camera = camera
+        self.reduction = reduction
+
+        self.etiquettes = np.full(
+            (-(-hauteur // reduction), -(-largeur // reduction)), AUCUNE_PLACE, dtype=np.int16
+        )
+        for k, polygone in enumerate(self.polygones):
+            cv2.fillPoly(self.etiquettes, [np.round(polygone / reduction).astype(np.int32)], k)
+
+    def __len__(self):
+        return len(self.noms)
+
+    def affecter(self, points, taille_frame=None):
+        """
+        Place de chaque point (N, 2) : indice dans `noms`, AUCUNE_PLACE hors des places.
+
+        Args:
+            taille_frame (tuple): (largeur, hauteur) de la frame si elle diffère de l'image de référence.
+        """
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        echelle_x = echelle_y = 1.0 / self.reduction
+        if taille_frame is not None and tuple(taille_frame) != (self.largeur, self.hauteur):
+            echelle_x = self.largeur / (taille_frame[0] * self.reduction)
+            echelle_y = self.hauteur / (taille_frame[1] * self.reduction)
+
+        places = np.full(points.shape[0], AUCUNE_PLACE, dtype=np.int64)
+        valides = ~np.isnan(points).any(axis=1)
+        colonnes = np.floor(points[valides, 0] * echelle_x).astype(np.int64)
+        lignes = np.floor(points[valides, 1] * echelle_y).astype(np.int64)
+        dans_image = (colonnes >= 0) & (colonnes < self.etiquettes.shape[1]) & (lignes >= 0) & (lignes < self.etiquettes.shape[0])
+        indices = np.flatnonzero(valides)[dans_image]
+        places[indices] = self.etiquettes[lignes[dans_image], colonnes[dans_image]]
+        return places
+
+
+class OccupationPlaces:
+    """
+    Occupation et événements par place, mis à jour de façon incrémentale frame après frame.
+
+    Pour chaque place : occupant courant (piste, -1 si vide), temps occupé cumulé, nombre
+    d'occupants distincts, nombre de mains levées et de levers (événements de
+    comportement.AnalyseComportements rattachés à la place de leur piste).
+    Seules les personnes suivies (ids_pistes >= 0) occupent une place ; si plusieurs
+    tombent sur la même place, la mieux détectée l'occupe.
+    """
+
+    def __init__(self, carte):
+        self.carte = carte
+        nb = len(carte)
+        self.occupants = np.full(nb, -1, dtype=np.int64)
+        self.durees_occupees = np.zeros(nb, dtype=np.float64)
+        self.nb_occupants = np.zeros(nb, dtype=np.int64)
+        self.nb_mains_levees = np.zeros(nb, dtype=np.int64)
+        self.nb_leves = np.zeros(nb, dtype=np.int64)
+        self.identites = [None] * nb
+        self.places_pistes = {} # piste -> dernière place occupée
+        self._occupations_vues = set() # (place, piste) déjà comptées dans nb_occupants
+        self._t_precedent = None
+
+    def mettre_a_jour(self, resultats, t, evenements=(), taille_frame=None):
+        """
+        Intègre une frame (ResultatsFrame à l'instant `t`) et les événements de comportement
+        émis sur cette frame.
+
+        Returns:
+            np.ndarray: Place (P,) de chaque personne de la frame (AUCUNE_PLACE si hors place).
+        """
+        places = self.carte.affecter(points_ancrage(resultats.keypoints, resultats.boites), taille_frame)
+
+        # Une seule personne suivie par place : tri par score croissant, la dernière écriture l'emporte
+        occupants = np.full(len(self.carte), -1, dtype=np.int64)
+        ordre = np.argsort(resultats.scores, kind="stable")
+        dans_place = ordre[(places[ordre] >= 0) & (resultats.ids_pistes[ordre] >= 0)]
+        occupants[places[dans_place]] = resultats.ids_pistes[dans_place]
+
+        if self._t_precedent is not None:
+            self.durees_occupees[self.occupants >= 0] += t - self._t_precedent
+        self._t_precedent = t
+
+        # Une piste ne compte qu'une fois par place : une détection manquée le temps
+        # d'une frame ne doit pas en faire un nouvel occupant à son retour
+        for place in np.flatnonzero((occupants >= 0) & (occupants != self.occupants)):
+            occupation = (int(place), int(occupants[place]))
+            if occupation not in self._occupations_vues:
+                self._occupations_vues.add(occupation)
+                self.nb_occupants[place] += 1
+        self.occupants = occupants
+        occupees = np.flatnonzero(occupants >= 0)
+        # Dernière place connue de chaque piste : un élève qui se lève reste rattaché à sa place
+        self.places_pistes.update(zip(occupants[occupees].tolist(), occupees.tolist()))
+
+        for evenement in evenements:
+            place = self.places_pistes.get(evenement["piste"])
+            if place is None:
+                continue
+            if evenement["evenement"] == "main_levee_debut":
+                self.nb_mains_levees[place] += 1
+            elif evenement["evenement"] == "leve":
+                self.nb_leves[place] += 1
+            if evenement.get("identite"):
+                self.identites[place] = evenement["identite"]
+        return places
+
+    def places_vides(self):
+        return [self.carte.noms[k] for k in np.flatnonzero(self.occupants < 0)]
+
+    def bilan(self):
+        """Un dict par place : nom, occupant courant, identité, temps occupé, compteurs."""
+        return [
+            {
+                "place": nom,
+                "occupant": int(self.occupants[k]),
+                "identite": self.identites[k],
+                "duree_occupee": round(float(self.durees_occupees[k]), 1),
+                "nb_occupants": int(self.nb_occupants[k]),
+                "nb_mains_levees": int(self.nb_mains_levees[k]),
+                "nb_leves": int(self.nb_leves[k]),
+            }
+            for k, nom in enumerate(self.carte.noms)
+        ]
+
+    def dessiner(self, annotated_frame):
+        """Contours des places (vert si occupée, gris si vide), à l'échelle de la frame."""
+        hauteur, largeur = annotated_frame.shape[:2]
+        echelle = np.array([largeur / self.carte.largeur, hauteur / self.carte.hauteur], dtype=np.float32)
+        for occupee, couleur in ((True, PLACE_COLOR_OCCUPEE), (False, PLACE_COLOR_VIDE)):
+            polygones = [
+                np.round(polygone * echelle).astype(np.int32)
+                for polygone, occupant in zip(self.carte.polygones, self.occupants)
+                if (occupant >= 0) == occupee
+            ]
+            if polygones:
+                cv2.polylines(annotated_frame, polygones, True, couleur, 1)
@@ -0,0 +1,98 @@
+# porte_mouvement.py (Porte de mouvement : ne relancer l'inférence que si la scène a bougé)
+
+import cv2
+import numpy as np
+
+
+class PorteMouvement:
+    """
+    Décide, pour chaque frame, s'il faut relancer l'inférence ou réutiliser les derniers résultats.
+
+    La frame est réduite (niveaux de gris, `largeur_reduite` pixels de large), légèrement
+    floutée puis comparée à la frame de la dernière inférence. La comparaison se fait par
+    tuile d'une grille `grille` (colonnes, lignes) : une tuile est "en mouvement" si la part
+    de ses pixels ayant changé de plus de `seuil_pixel` niveaux dépasse `sensibilite`.
+    Travailler par tuile évite qu'un petit mouvement local (une main levée au fond de la
+    salle) soit noyé dans la moyenne de toute l'image.
+
+    La référence n'est remplacée qu'à chaque inférence : un mouvement lent finit donc par
+    déclencher une inférence. Au-delà de `age_max` frames réutilisées, l'inférence est
+    relancée quoi qu'il arrive.
+
+    Args:
+        largeur_reduite (int): Largeur de l'image réduite utilisée pour la différence.
+        grille (tuple): Nombre de tuiles (colonnes, lignes).
+        seuil_pixel (int): Écart de niveau de gris à partir duquel un pixel a changé.
+        sensibilite (float): Part de pixels changés (0-1) qui met une tuile en mouvement.
+        age_max (int): Nombre maximal de frames consécutives réutilisant les mêmes résultats.
+    """
+
+    def __init__(self, largeur_reduite=160, grille=(8, 6), seuil_pixel=15, sensibilite=0.02, age_max=30):
+        self.largeur_reduite = largeur_reduite
+        self.colonnes, self.lignes = grille
+        self.seuil_pixel = seuil_pixel
+        self.sensibilite = sensibilite
+        self.age_max = age_max
+
+        self.tuiles_en_mouvement = np.ones((self.lignes, self.colonnes), dtype=bool)
+        self._reference = None
+        self._taille = None
+        self.age = 0
+        self.nb_inferences = 0
+        self.nb_reutilisations = 0
+
+    def _taille_reduite(self, frame):
+        """Taille (largeur, hauteur) réduite, multiple de la grille pour un découpage exact."""
+        hauteur, largeur = frame.shape[:2]
+        l = max(self.colonnes, (self.largeur_reduite // self.colonnes) * self.colonnes)
+        h = int(round(l * hauteur / largeur))
+        h = max(self.lignes, (h // self.lignes) * self.lignes)
+        return l, h
+
+    def _reduire(self, frame):
+        if self._taille is None:
+            self._taille = self._taille_reduite(frame)
+        petite = cv2.resize(frame, self._taille, interpolation=cv2.INTER_AREA)
+        if petite.ndim == 3:
+            petite = cv2.cvtColor(petite, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(petite, (3, 3), 0)
+
+    def mesurer(self, petite):
+        """Retourne la part (lignes, colonnes) de pixels changés par tuile par rapport à la référence."""
+        h, l = petite.shape
+        changes = cv2.absdiff(petite, self._reference) > self.seuil_pixel
+        return changes.reshape(self.lignes, h // self.lignes, self.colonnes, l // self.colonnes).mean(axis=(1, 3))
+
+    def evaluer(self, frame, forcer=False):
+        """
+        Retourne True s'il faut relancer l'inférence sur `frame`, False si les derniers
+        résultats peuvent être réutilisés. `forcer=True` impose une inférence (par exemple
+        quand aucun résultat n'est encore disponible).
+        """
+        petite = self._reduire(frame)
+
+        relancer = forcer or self._reference is None or self.age >= self.age_max
+        if relancer:
+            self.tuiles_en_mouvement[:] = True
+        else:
+            self.tuiles_en_mouvement = self.mesurer(petite) > self.sensibilite
+            relancer = bool(self.tuiles_en_mouvement.any())
+
+        if relancer:
+            self._reference = petite
+            self.age = 0
+            self.nb_inferences += 1
+        else:
+            self.age += 1
+            self.nb_reutilisations += 1
+        return relancer
+
+    def reinitialiser(self):
+        """Oublie la référence (changement de source ou de résolution)."""
+        self._reference = None
+        self._taille = None
+        self.age = 0
+
+    def taux_reutilisation(self):
+        total = self.nb_inferences + self.nb_reutilisations
+        return self.nb_reutilisations / total if total else 0.0
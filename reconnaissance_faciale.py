@@ -1,174 +1,718 @@
-# reconnaissance_faciale.py
-
-import cv2
-import os
-import numpy as np
-
-# --- Configuration et chemins ---
-# Chemin vers le fichier Haar Cascade pour la détection de visage (doit être téléchargé)
-HAAR_CASCADE_PATH = 'haarcascade_frontalface_alt.xml' 
-
-
-# Dossier contenant les images de référence pour la comparaison
-DATABASE_FOLDER = 'C:/Users/bastien/Desktop/acab/pp/tetes' 
-# IMPORTANT : Remplacez ceci par le chemin réel de votre dossier.
-
-# --- Globales pour l'entraînement et la détection ---
-face_recognizer = None
-known_faces_labels = {}
-known_faces_names = [] # Liste des noms dans l'ordre de l'entraînement
-
-def charger_haarcascade(path):
-    """Charge le classifieur Haar Cascade."""
-    if not os.path.exists(path):
-        print(f"Erreur: Fichier Haar Cascade non trouvé à l'emplacement: {path}")
-        return None
-    return cv2.CascadeClassifier(path)
-
-def preparer_base_de_donnees_visages(folder_path):
-    """
-    Entraîne un modèle de reconnaissance (ex: LBPH) avec les images du dossier.
-    Structure du dossier attendue :
-    - /dossier_visages/
-        - /alice/
-            - img1.jpg
-            - img2.jpg
-        - /bob/
-            - img1.jpg
-    """
-    global face_recognizer, known_faces_names
-
-    print(f"Préparation de la base de données faciale dans : {folder_path}...")
-    
-    # 1. Initialiser le modèle de reconnaissance (utilisons l'approche LBPH)
-    # L'approche LBPH est généralement robuste et fournie avec OpenCV
-    face_recognizer = cv2.face.LBPHFaceRecognizer_create()
-    
-    faces = []
-    labels = []
-    label_id = 0
-    known_faces_names = []
-    
-    # Parcourir chaque sous-dossier (chaque sous-dossier est une personne)
-    for name in os.listdir(folder_path):
-        subject_dir = os.path.join(folder_path, name)
-        
-        if os.path.isdir(subject_dir):
-            known_faces_names.append(name)
-            
-            for image_name in os.listdir(subject_dir):
-                image_path = os.path.join(subject_dir, image_name)
-                
-                # Lire l'image en niveaux de gris
-                img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-                
-                if img is not None:
-                    # Pour l'entraînement, on suppose que l'image contient déjà un visage centré.
-                    # Si non, il faudrait utiliser Haar Cascade ici pour extraire la zone de visage, 
-                    # mais pour simplifier, on suppose que les images de la DB sont des visages.
-                    
-                    # Redimensionnement standard pour une meilleure performance
-                    img = cv2.resize(img, (200, 200)) 
-                    
-                    faces.append(img)
-                    labels.append(label_id)
-            
-            label_id += 1
-
-    if faces:
-        # 2. Entraînement
-        print("Entraînement du modèle de reconnaissance faciale...")
-        face_recognizer.train(faces, np.array(labels))
-        print(f"Entraînement terminé avec {len(known_faces_names)} personnes.")
-        return True
-    else:
-        print("Aucune image de visage trouvée pour l'entraînement.")
-        return False
-
-def identifier_visage(gray_face):
-    """
-    Identifie le visage fourni par rapport à la base de données entraînée.
-    
-    Args:
-        gray_face (np.ndarray): La zone de visage en niveaux de gris.
-        
-    Returns:
-        tuple: (nom_personne, confiance) ou (None, None)
-    """
-    global face_recognizer, known_faces_names
-    
-    if face_recognizer is None or not known_faces_names:
-        return "Non entraîné", 0
-
-    # Redimensionnement de l'image du visage détecté pour correspondre à l'entraînement
-    resized_face = cv2.resize(gray_face, (200, 200))
-    
-    try:
-        # Prédiction (label_id, confidence)
-        label_id, confidence = face_recognizer.predict(resized_face)
-        
-        # Le seuil de confiance dépend de votre modèle/besoins. Plus la confiance est faible, mieux c'est (distance).
-        # On utilise un seuil inverse (ex: < 80) pour considérer le match comme valide.
-        CONFIDENCE_THRESHOLD = 90
-        
-        if confidence < CONFIDENCE_THRESHOLD and label_id < len(known_faces_names):
-            name = known_faces_names[label_id]
-            return name, confidence
-        else:
-            return "Inconnu", confidence
-            
-    except Exception as e:
-        # print(f"Erreur de prédiction : {e}")
-        return "Erreur", 0
-
-
-def detecter_et_identifier_visages(frame_rgb, cascade):
-    """
-    Détecte les visages dans une frame et les identifie.
-    
-    Args:
-        frame_rgb (np.ndarray): La frame actuelle en couleur.
-        cascade (cv2.CascadeClassifier): Le modèle Haar Cascade.
-        
-    Returns:
-        list: Une liste de dictionnaires [{'box': (x, y, w, h), 'name': '...', 'conf': '...'}]
-    """
-    if cascade is None:
-        return []
-        
-    # Conversion en niveaux de gris pour la détection
-    gray_frame = cv2.cvtColor(frame_rgb, cv2.COLOR_BGR2GRAY)
-    
-    # 1. Détection des visages (Haar Cascade)
-    # Paramètres typiques : 
-    # scaleFactor=1.1, minNeighbors=5, minSize=(30, 30)
-    faces = cascade.detectMultiScale(
-        gray_frame, 
-        scaleFactor=1.1, 
-        minNeighbors=5, 
-        minSize=(60, 60) # Ajusté un peu plus grand pour la vidéo
-    )
-    
-    resultats_identification = []
-    
-    # 2. Identification de chaque visage détecté
-    for (x, y, w, h) in faces:
-        # Extraire la zone du visage
-        face_roi = gray_frame[y:y + h, x:x + w]
-        
-        name, confidence = identifier_visage(face_roi)
-        
-        resultats_identification.append({
-            'box': (x, y, w, h),
-            'name': name,
-            'conf': confidence
-        })
-        
-    return resultats_identification
-
-if __name__ == "__main__":
-    print("Ce module contient la logique de reconnaissance faciale.")
-    # Exécutez l'entraînement si le chemin est défini (pour tester)
-    
-
-    preparer_base_de_donnees_visages(DATABASE_FOLDER)
+# reconnaissance_faciale.py
+
+import cv2
+import os
+import json
+import hashlib
+import time
+import warnings
+from collections import OrderedDict
+import numpy as np
+
+import metriques
+import suivi
+
+# --- Configuration et chemins ---
+# Chemin vers le fichier Haar Cascade pour la détection de visage (doit être téléchargé)
+HAAR_CASCADE_PATH = 'haarcascade_frontalface_alt.xml' 
+
+
+# Dossier contenant les images de référence pour la comparaison
+DATABASE_FOLDER = 'C:/Users/bastien/Desktop/acab/pp/tetes' 
+# IMPORTANT : Remplacez ceci par le chemin réel de votre dossier.
+
+# Dossier où est mis en cache le modèle LBPH entraîné (clé : manifeste de la base)
+CACHE_FOLDER = '.cache_visages'
+
+# Dossier du store des visages détectés et recadrés (voir ingestion_visages), sur lesquels
+# les backends d'identification sont entraînés ; None : entraînement sur les photos entières
+DOSSIER_STORE_VISAGES = '.store_visages'
+
+# --- Globales pour l'entraînement et la détection ---
+face_recognizer = None
+known_faces_labels = {}
+known_faces_names = [] # Liste des noms dans l'ordre de l'entraînement
+
+# Identités spéciales (négatives) ; une identité >= 0 est un indice dans known_faces_names
+IDENTITE_INCONNUE = -1
+IDENTITE_ERREUR = -2
+IDENTITE_NON_ENTRAINE = -3
+NOMS_IDENTITES_SPECIALES = {IDENTITE_INCONNUE: "Inconnu", IDENTITE_ERREUR: "Erreur", IDENTITE_NON_ENTRAINE: "Non entraîné"}
+
+# Distance LBPH en dessous de laquelle un match est jugé sûr (gardé plus longtemps en cache)
+SEUIL_CERTITUDE_LBPH = 70
+
+def charger_haarcascade(path):
+    """Charge le classifieur Haar Cascade."""
+    if not os.path.exists(path):
+        print(f"Erreur: Fichier Haar Cascade non trouvé à l'emplacement: {path}")
+        return None
+    return cv2.CascadeClassifier(path)
+
+def _lire_visage(image_path):
+    """Lit une image de la base en niveaux de gris et la redimensionne en 200x200 (None si illisible)."""
+    # Lire l'image en niveaux de gris
+    img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    
+    if img is None:
+        return None
+    
+    # Pour l'entraînement, on suppose que l'image contient déjà un visage centré.
+    # Si non, il faudrait utiliser Haar Cascade ici pour extraire la zone de visage, 
+    # mais pour simplifier, on suppose que les images de la DB sont des visages.
+    
+    # Redimensionnement standard pour une meilleure performance
+    return cv2.resize(img, (200, 200)) 
+
+def lire_base_visages(folder_path, lecteur=None):
+    """
+    Lit toutes les images de la base (un sous-dossier par personne).
+    
+    Args:
+        folder_path (str): Dossier de la base.
+        lecteur (callable): chemin -> visage 200x200 ou None. Par défaut l'image est
+            décodée et redimensionnée ; voir ingestion_visages.StoreVisages.lire pour
+            relire des visages déjà détectés et recadrés.
+    
+    Returns:
+        tuple: (faces, labels, noms) où faces est une liste d'images 200x200 en niveaux
+               de gris, labels l'indice de la personne dans `noms` pour chaque image.
+    """
+    lecteur = lecteur or _lire_visage
+    faces = []
+    labels = []
+    label_id = 0
+    noms = []
+    
+    # Parcourir chaque sous-dossier (chaque sous-dossier est une personne)
+    for name in os.listdir(folder_path):
+        subject_dir = os.path.join(folder_path, name)
+        
+        if os.path.isdir(subject_dir):
+            noms.append(name)
+            
+            for image_name in os.listdir(subject_dir):
+                img = lecteur(os.path.join(subject_dir, image_name))
+                
+                if img is not None:
+                    faces.append(img)
+                    labels.append(label_id)
+            
+            label_id += 1
+    
+    return faces, labels, noms
+
+def construire_manifeste(folder_path):
+    """
+    Construit le manifeste de la base : {personne: {image: [taille, mtime_ns]}}.
+    
+    Seules les métadonnées des fichiers sont lues (aucun décodage d'image), ce qui
+    permet de savoir très rapidement si la base a changé depuis le dernier entraînement.
+    """
+    manifeste = {}
+    for name in sorted(os.listdir(folder_path)):
+        subject_dir = os.path.join(folder_path, name)
+        if not os.path.isdir(subject_dir):
+            continue
+        
+        fichiers = {}
+        for image_name in sorted(os.listdir(subject_dir)):
+            stat = os.stat(os.path.join(subject_dir, image_name))
+            fichiers[image_name] = [stat.st_size, stat.st_mtime_ns]
+        manifeste[name] = fichiers
+    return manifeste
+
+def empreinte_manifeste(manifeste):
+    """Empreinte (SHA-1) stable du manifeste, utilisée comme clé du cache."""
+    contenu = json.dumps(manifeste, sort_keys=True).encode("utf-8")
+    return hashlib.sha1(contenu).hexdigest()
+
+def _chemins_cache(dossier_cache):
+    return (
+        os.path.join(dossier_cache, "lbph.yml"),
+        os.path.join(dossier_cache, "lbph_meta.json"),
+    )
+
+def _sauvegarder_cache(dossier_cache, manifeste, source):
+    """
+    Sauvegarde le modèle entraîné et known_faces_names avec le manifeste associé.
+    
+    Chaque fichier est écrit à côté puis remplacé d'un coup (os.replace), le modèle avant
+    les métadonnées : un autre processus ne lit jamais un fichier à moitié écrit.
+    """
+    chemin_modele, chemin_meta = _chemins_cache(dossier_cache)
+    # L'extension doit rester .yml : OpenCV en déduit le format d'écriture
+    temporaire_modele = os.path.splitext(chemin_modele)[0] + f".{os.getpid()}.tmp.yml"
+    temporaire_meta = f"{chemin_meta}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(dossier_cache, exist_ok=True)
+        face_recognizer.write(temporaire_modele)
+        with open(temporaire_meta, "w", encoding="utf-8") as f:
+            json.dump({
+                "empreinte": empreinte_manifeste(manifeste),
+                "source": source,
+                "noms": known_faces_names,
+                "manifeste": manifeste,
+            }, f)
+        os.replace(temporaire_modele, chemin_modele)
+        os.replace(temporaire_meta, chemin_meta)
+    except (OSError, cv2.error) as e:
+        print(f"Attention : impossible de sauvegarder le cache du modèle facial : {e}")
+
+def _charger_cache(dossier_cache):
+    """Retourne les métadonnées du cache ou None si le cache est absent/illisible."""
+    chemin_modele, chemin_meta = _chemins_cache(dossier_cache)
+    if not (os.path.exists(chemin_modele) and os.path.exists(chemin_meta)):
+        return None
+    try:
+        with open(chemin_meta, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _lire_modele(chemin_modele):
+    """Relit un modèle LBPH mis en cache ; None si le fichier est tronqué ou corrompu."""
+    modele = cv2.face.LBPHFaceRecognizer_create()
+    try:
+        modele.read(chemin_modele)
+    except cv2.error as e:
+        print(f"Attention : cache du modèle facial illisible ({chemin_modele}), réentraînement complet : {e}")
+        return None
+    return modele
+
+def _images_ajoutees(ancien_manifeste, manifeste):
+    """
+    Compare deux manifestes. Retourne {personne: [images ajoutées]} si la base n'a fait
+    que grandir (nouvelles images ou nouvelles personnes), ou None si une image a été
+    supprimée ou modifiée (LBPH ne sait pas "oublier" : réentraînement complet requis).
+    """
+    for name, fichiers in ancien_manifeste.items():
+        actuels = manifeste.get(name)
+        if actuels is None:
+            return None
+        for image_name, meta in fichiers.items():
+            if actuels.get(image_name) != meta:
+                return None
+    
+    ajouts = {}
+    for name, fichiers in manifeste.items():
+        anciens = ancien_manifeste.get(name, {})
+        nouvelles = [image_name for image_name in fichiers if image_name not in anciens]
+        if nouvelles or name not in ancien_manifeste:
+            ajouts[name] = nouvelles
+    return ajouts
+
+def preparer_base_de_donnees_visages(folder_path, dossier_cache=CACHE_FOLDER, dossier_store=None, entrainer=True):
+    """
+    Entraîne un modèle de reconnaissance (ex: LBPH) avec les images du dossier.
+    Structure du dossier attendue :
+    - /dossier_visages/
+        - /alice/
+            - img1.jpg
+            - img2.jpg
+        - /bob/
+            - img1.jpg
+    
+    Le modèle entraîné est mis en cache dans `dossier_cache` avec le manifeste de la
+    base (chemins, tailles, dates de modification) :
+    - base inchangée : le modèle est simplement relu depuis le disque ;
+    - images ou personnes ajoutées : seules les nouvelles images sont lues et
+      le modèle est mis à jour (LBPH update) ;
+    - sinon : réentraînement complet.
+    Passer dossier_cache=None pour désactiver le cache.
+    
+    Si `dossier_store` est fourni, la base est d'abord ingérée (voir ingestion_visages :
+    détection, alignement et recadrage en parallèle, mis en cache) et l'entraînement
+    utilise ces visages recadrés au lieu des photos entières.
+    
+    Avec entrainer=False, le modèle est seulement relu depuis un cache à jour (rien
+    n'est entraîné ni écrit) : c'est le mode des processus workers, une fois le cache
+    préparé par le processus principal.
+    """
+    global face_recognizer, known_faces_names
+
+    print(f"Préparation de la base de données faciale dans : {folder_path}...")
+    
+    lecteur = _lire_visage
+    source = "photos"
+    if dossier_store:
+        import ingestion_visages # Import local : ingestion_visages dépend de ce module
+        store = ingestion_visages.ingerer_base_visages(folder_path, dossier_store)
+        lecteur = store.lire
+        # Un modèle entraîné sur les photos entières, ou sur des visages recadrés avec
+        # d'autres paramètres (cascade, marge), n'est pas réutilisable
+        source = f"store:{store.parametres}"
+    manifeste = construire_manifeste(folder_path) if dossier_cache else None
+    cache = _charger_cache(dossier_cache) if dossier_cache else None
+    if cache is not None and cache.get("source", "photos") != source:
+        cache = None
+    
+    if cache is not None:
+        chemin_modele, _ = _chemins_cache(dossier_cache)
+        inchangee = cache.get("empreinte") == empreinte_manifeste(manifeste)
+        ajouts = None if inchangee else _images_ajoutees(cache.get("manifeste", {}), manifeste)
+        # Modèle relu seulement s'il sert ; illisible (None) : réentraînement complet
+        modele = None
+        if inchangee or (ajouts is not None and entrainer):
+            modele = _lire_modele(chemin_modele)
+        
+        # 1. Base inchangée : relecture directe du modèle
+        if inchangee and modele is not None:
+            face_recognizer = modele
+            known_faces_names = list(cache["noms"])
+            print(f"Modèle facial chargé depuis le cache ({len(known_faces_names)} personnes).")
+            return True
+        
+        # 2. Base seulement enrichie : mise à jour incrémentale
+        if ajouts is not None and modele is not None:
+            face_recognizer = modele
+            known_faces_names = list(cache["noms"])
+            
+            faces = []
+            labels = []
+            for name, nouvelles_images in ajouts.items():
+                if name not in known_faces_names:
+                    known_faces_names.append(name)
+                label_id = known_faces_names.index(name)
+                for image_name in nouvelles_images:
+                    img = lecteur(os.path.join(folder_path, name, image_name))
+                    if img is not None:
+                        faces.append(img)
+                        labels.append(label_id)
+            
+            if faces:
+                print(f"Mise à jour incrémentale du modèle facial avec {len(faces)} nouvelle(s) image(s)...")
+                face_recognizer.update(faces, np.array(labels))
+            _sauvegarder_cache(dossier_cache, manifeste, source)
+            print(f"Modèle facial à jour avec {len(known_faces_names)} personnes.")
+            return True
+    
+    if not entrainer:
+        print("Aucun modèle facial à jour dans le cache.")
+        return False
+    
+    # 3. Réentraînement complet
+    # 1. Initialiser le modèle de reconnaissance (utilisons l'approche LBPH)
+    # L'approche LBPH est généralement robuste et fournie avec OpenCV
+    face_recognizer = cv2.face.LBPHFaceRecognizer_create()
+    
+    faces, labels, known_faces_names = lire_base_visages(folder_path, lecteur)
+
+    if faces:
+        # 2. Entraînement
+        print("Entraînement du modèle de reconnaissance faciale...")
+        face_recognizer.train(faces, np.array(labels))
+        print(f"Entraînement terminé avec {len(known_faces_names)} personnes.")
+        if dossier_cache:
+            _sauvegarder_cache(dossier_cache, manifeste, source)
+        return True
+    else:
+        print("Aucune image de visage trouvée pour l'entraînement.")
+        return False
+
+def nom_identite(identite, noms=None):
+    """Nom correspondant à une identité (indice dans `noms`, known_faces_names par défaut)."""
+    noms = known_faces_names if noms is None else noms
+    if 0 <= identite < len(noms):
+        return noms[identite]
+    return NOMS_IDENTITES_SPECIALES.get(identite, "Inconnu")
+
+def identifier_visage(gray_face):
+    """
+    Identifie le visage fourni par rapport à la base de données entraînée.
+    
+    Args:
+        gray_face (np.ndarray): La zone de visage en niveaux de gris.
+        
+    Returns:
+        tuple: (nom_personne, confiance) ou (None, None)
+    """
+    identite, confidence = identifier_visage_id(gray_face)
+    return nom_identite(identite), confidence
+
+def identifier_visage_id(gray_face):
+    """Comme identifier_visage, mais retourne (identite, confiance) : indice dans known_faces_names ou IDENTITE_*."""
+    global face_recognizer, known_faces_names
+    
+    if face_recognizer is None or not known_faces_names:
+        return IDENTITE_NON_ENTRAINE, 0
+
+    # Redimensionnement de l'image du visage détecté pour correspondre à l'entraînement
+    resized_face = cv2.resize(gray_face, (200, 200))
+    
+    try:
+        # Prédiction (label_id, confidence)
+        label_id, confidence = face_recognizer.predict(resized_face)
+        
+        # Le seuil de confiance dépend de votre modèle/besoins. Plus la confiance est faible, mieux c'est (distance).
+        # On utilise un seuil inverse (ex: < 80) pour considérer le match comme valide.
+        CONFIDENCE_THRESHOLD = 90
+        
+        if confidence < CONFIDENCE_THRESHOLD and label_id < len(known_faces_names):
+            return label_id, confidence
+        else:
+            return IDENTITE_INCONNUE, confidence
+            
+    except Exception as e:
+        # print(f"Erreur de prédiction : {e}")
+        return IDENTITE_ERREUR, 0
+
+
+def identifier_visages_ids(faces):
+    """Identifie une liste de visages avec le modèle LBPH global ; retourne (identites (B,) int32, confiances (B,) float32)."""
+    identites = np.empty(len(faces), dtype=np.int32)
+    confiances = np.empty(len(faces), dtype=np.float32)
+    for k, face in enumerate(faces):
+        identites[k], confiances[k] = identifier_visage_id(face)
+    return identites, confiances
+
+
+def est_certain_lbph(confiances, seuil=SEUIL_CERTITUDE_LBPH):
+    """La confiance LBPH est une distance : un match est sûr si elle est inférieure au seuil."""
+    return np.asarray(confiances) < seuil
+
+
+def detecter_visages_plein_cadre(gray_frame, cascade):
+    """Détection Haar sur toute la frame en niveaux de gris. Retourne un tableau (N, 4) de (x, y, w, h)."""
+    # Paramètres typiques : 
+    # scaleFactor=1.1, minNeighbors=5, minSize=(30, 30)
+    faces = cascade.detectMultiScale(
+        gray_frame, 
+        scaleFactor=1.1, 
+        minNeighbors=5, 
+        minSize=(60, 60) # Ajusté un peu plus grand pour la vidéo
+    )
+    return np.asarray(faces, dtype=np.int32).reshape(-1, 4)
+
+# Indices COCO utilisés pour localiser la tête : nez, yeux, oreilles, épaules
+_INDICES_TETE = [0, 1, 2, 3, 4]
+_EPAULE_GAUCHE, _EPAULE_DROITE = 5, 6
+
+def regions_tetes_depuis_keypoints(keypoints, frame_shape, seuil_confiance=0.5, marge=1.3):
+    """
+    Calcule les régions de recherche de visage (une par personne) à partir des keypoints de pose.
+    
+    Le centre de la région est la moyenne des points fiables de la tête (nez, yeux,
+    oreilles) ; sa taille est proportionnelle à la largeur des épaules (ou, à défaut,
+    à l'étendue des points de la tête). Tout le calcul est vectorisé sur les P personnes.
+    
+    Args:
+        keypoints (np.ndarray): Keypoints de forme (P, 17, 3).
+        frame_shape (tuple): Forme de la frame (hauteur, largeur, ...).
+        seuil_confiance (float): Confiance minimale d'un keypoint pour être utilisé.
+        marge (float): Côté de la région en proportion de la largeur des épaules.
+        
+    Returns:
+        np.ndarray: Régions (R, 4) en (x1, y1, x2, y2), bornées à la frame.
+    """
+    keypoints = np.asarray(keypoints, dtype=np.float32)
+    if keypoints.ndim != 3 or keypoints.shape[0] == 0 or keypoints.shape[1] <= _EPAULE_DROITE:
+        return np.empty((0, 4), dtype=np.int32)
+    
+    hauteur, largeur = frame_shape[:2]
+    tete = keypoints[:, _INDICES_TETE]
+    fiable = tete[:, :, 2] >= seuil_confiance
+    nb_fiables = fiable.sum(axis=1)
+    
+    # Centre de la tête : moyenne des points fiables
+    poids = fiable.astype(np.float32)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        centre_x = (tete[:, :, 0] * poids).sum(axis=1) / nb_fiables
+        centre_y = (tete[:, :, 1] * poids).sum(axis=1) / nb_fiables
+    
+    # Taille : largeur des épaules si fiables, sinon 3x l'étendue des points de la tête
+    epaules = keypoints[:, [_EPAULE_GAUCHE, _EPAULE_DROITE]]
+    epaules_fiables = (epaules[:, :, 2] >= seuil_confiance).all(axis=1)
+    largeur_epaules = np.abs(epaules[:, 0, 0] - epaules[:, 1, 0])
+    
+    x_tete = np.where(fiable, tete[:, :, 0], np.nan)
+    with np.errstate(invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        etendue_tete = np.nanmax(x_tete, axis=1) - np.nanmin(x_tete, axis=1)
+    cote = np.where(epaules_fiables, largeur_epaules * marge, etendue_tete * 3.0)
+    
+    valides = (nb_fiables > 0) & np.isfinite(cote) & (cote >= 20)
+    if not valides.any():
+        return np.empty((0, 4), dtype=np.int32)
+    
+    centre_x, centre_y, demi = centre_x[valides], centre_y[valides], cote[valides] / 2
+    regions = np.stack([centre_x - demi, centre_y - demi, centre_x + demi, centre_y + demi], axis=1)
+    regions = np.clip(regions, 0, [largeur, hauteur, largeur, hauteur]).astype(np.int32)
+    
+    # Éliminer les régions dégénérées après recadrage
+    non_vides = (regions[:, 2] - regions[:, 0] >= 20) & (regions[:, 3] - regions[:, 1] >= 20)
+    return regions[non_vides]
+
+def _supprimer_doublons(faces, seuil_iou=0.3):
+    """Supprime les visages détectés deux fois (régions voisines qui se chevauchent)."""
+    if len(faces) <= 1:
+        return faces
+    
+    x1, y1 = faces[:, 0], faces[:, 1]
+    x2, y2 = x1 + faces[:, 2], y1 + faces[:, 3]
+    aires = faces[:, 2] * faces[:, 3]
+    ordre = np.argsort(-aires)
+    
+    gardes = []
+    while ordre.size > 0:
+        i = ordre[0]
+        gardes.append(i)
+        reste = ordre[1:]
+        inter_w = np.clip(np.minimum(x2[i], x2[reste]) - np.maximum(x1[i], x1[reste]), 0, None)
+        inter_h = np.clip(np.minimum(y2[i], y2[reste]) - np.maximum(y1[i], y1[reste]), 0, None)
+        inter = inter_w * inter_h
+        iou = inter / (aires[i] + aires[reste] - inter)
+        ordre = reste[iou < seuil_iou]
+    return faces[np.sort(np.array(gardes))]
+
+def detecter_visages_dans_regions(gray_frame, cascade, regions):
+    """
+    Détection Haar limitée aux régions de tête. Les coordonnées sont ramenées dans la frame complète.
+    
+    L'échelle de recherche est bornée par la taille de chaque région (le visage occupe
+    une part connue de la tête), ce qui réduit fortement le nombre d'échelles testées.
+    
+    Returns:
+        np.ndarray: Visages (N, 4) en (x, y, w, h) dans le repère de la frame.
+    """
+    faces = []
+    for (x1, y1, x2, y2) in regions:
+        roi = gray_frame[y1:y2, x1:x2]
+        cote = min(x2 - x1, y2 - y1)
+        taille_min = max(20, int(cote * 0.3))
+        detections = cascade.detectMultiScale(
+            roi,
+            scaleFactor=1.1,
+            minNeighbors=5,
+            minSize=(taille_min, taille_min),
+            maxSize=(cote, cote)
+        )
+        for (x, y, w, h) in detections:
+            faces.append((x + x1, y + y1, w, h))
+    
+    if not faces:
+        return np.empty((0, 4), dtype=np.int32)
+    return _supprimer_doublons(np.asarray(faces, dtype=np.int32))
+
+class RechercheVisagesGuidee:
+    """
+    Choisit, frame par frame, entre une recherche de visages guidée par la pose et un scan complet.
+    
+    Le scan complet n'est exécuté que toutes les `periode_scan_complet` frames (pour
+    rattraper les visages dont la pose n'a pas été détectée) ou lorsque la pose ne
+    trouve personne. Le reste du temps, Haar ne parcourt que les régions de tête.
+    """
+    
+    def __init__(self, periode_scan_complet=15, seuil_confiance=0.5, marge=1.3):
+        self.periode_scan_complet = max(1, int(periode_scan_complet))
+        self.seuil_confiance = seuil_confiance
+        self.marge = marge
+        self._compteur = 0
+        self.nb_scans_complets = 0
+        self.nb_scans_guides = 0
+    
+    def detecter(self, gray_frame, cascade, keypoints=None):
+        """Retourne les visages (N, 4) en (x, y, w, h) selon le mode choisi pour cette frame."""
+        scan_periodique = self._compteur % self.periode_scan_complet == 0
+        self._compteur += 1
+        
+        regions = None
+        if keypoints is not None and not scan_periodique:
+            regions = regions_tetes_depuis_keypoints(
+                keypoints, gray_frame.shape, self.seuil_confiance, self.marge
+            )
+        
+        if regions is None or len(regions) == 0:
+            self.nb_scans_complets += 1
+            return detecter_visages_plein_cadre(gray_frame, cascade)
+        
+        self.nb_scans_guides += 1
+        return detecter_visages_dans_regions(gray_frame, cascade, regions)
+
+class CacheIdentitesPistes:
+    """
+    Cache des identités reconnues, par piste du tracker (voir suivi.py).
+    
+    Tant qu'une piste garde son identité en cache, l'identification n'est pas relancée
+    pour son visage. Une entrée est considérée invalide (nouvelle identification) si :
+    - elle a dépassé sa durée de vie (`ttl`, ou `ttl_incertain` pour un visage
+      inconnu ou un match que le backend n'a pas jugé sûr, voir
+      identification_embeddings.BackendIdentification.est_certain) ;
+    - la boîte de la piste a trop changé depuis l'identification (IoU < `iou_min`).
+    Le cache est borné à `taille_max` pistes, éviction LRU.
+    """
+    
+    def __init__(self, ttl=3.0, ttl_incertain=0.5, iou_min=0.5, taille_max=256):
+        self.ttl = ttl
+        self.ttl_incertain = ttl_incertain
+        self.iou_min = iou_min
+        self.taille_max = taille_max
+        self._entrees = OrderedDict() # piste_id -> (instant, boite, identite, confidence, certain)
+        self.nb_hits = 0
+        self.nb_misses = 0
+    
+    def obtenir(self, piste_id, boite_piste, maintenant=None):
+        """Retourne (identite, confidence) en cache pour la piste, ou None s'il faut réidentifier."""
+        entree = self._entrees.get(piste_id)
+        if entree is None:
+            self.nb_misses += 1
+            return None
+        
+        maintenant = time.monotonic() if maintenant is None else maintenant
+        instant, boite, identite, confidence, certain = entree
+        duree_vie = self.ttl if certain and identite >= 0 else self.ttl_incertain
+        
+        if maintenant - instant > duree_vie or suivi.iou_matrice(boite, boite_piste)[0, 0] < self.iou_min:
+            del self._entrees[piste_id]
+            self.nb_misses += 1
+            return None
+        
+        self._entrees.move_to_end(piste_id)
+        self.nb_hits += 1
+        return identite, confidence
+    
+    def enregistrer(self, piste_id, boite_piste, identite, confidence, certain, maintenant=None):
+        """`certain` : le backend juge le match sûr (la sémantique de la confiance lui est propre)."""
+        maintenant = time.monotonic() if maintenant is None else maintenant
+        self._entrees[piste_id] = (
+            maintenant, np.asarray(boite_piste, dtype=np.float32), identite, confidence, bool(certain)
+        )
+        self._entrees.move_to_end(piste_id)
+        while len(self._entrees) > self.taille_max:
+            self._entrees.popitem(last=False)
+    
+    def taux_hits(self):
+        total = self.nb_hits + self.nb_misses
+        return self.nb_hits / total if total else 0.0
+
+def associer_visages_pistes(faces, boites_pistes):
+    """
+    Associe chaque visage (x, y, w, h) à la piste (x1, y1, x2, y2) qui le contient.
+    
+    Le centre du visage doit se trouver dans la moitié haute de la boîte de la piste ;
+    si plusieurs pistes conviennent, la plus étroite est retenue.
+    
+    Returns:
+        np.ndarray: Indice de piste (F,) pour chaque visage, -1 si aucune.
+    """
+    faces = np.asarray(faces, dtype=np.float32).reshape(-1, 4)
+    boites_pistes = np.asarray(boites_pistes, dtype=np.float32).reshape(-1, 4)
+    if faces.shape[0] == 0 or boites_pistes.shape[0] == 0:
+        return np.full(faces.shape[0], -1, dtype=np.intp)
+    
+    cx = (faces[:, 0] + faces[:, 2] / 2)[:, np.newaxis]
+    cy = (faces[:, 1] + faces[:, 3] / 2)[:, np.newaxis]
+    x1, y1, x2, y2 = (boites_pistes[:, k][np.newaxis, :] for k in range(4))
+    contenu = (cx >= x1) & (cx <= x2) & (cy >= y1) & (cy <= (y1 + y2) / 2)
+    
+    largeurs = np.where(contenu, x2 - x1, np.inf)
+    indices = np.argmin(largeurs, axis=1)
+    return np.where(contenu.any(axis=1), indices, -1)
+
+def detecter_et_identifier_visages_tableaux(frame_rgb, cascade, recherche_guidee=None, keypoints=None,
+                                            cache_identites=None, ids_pistes=None, boites_pistes=None, backend=None):
+    """
+    Détecte les visages dans une frame et les identifie.
+    
+    Tous les visages à identifier de la frame (ceux sans identité en cache) sont passés
+    en un seul appel au backend d'identification.
+    
+    Args:
+        frame_rgb (np.ndarray): La frame actuelle en couleur.
+        cascade (cv2.CascadeClassifier): Le modèle Haar Cascade.
+        recherche_guidee (RechercheVisagesGuidee): Si fourni, limite la détection aux
+            régions de tête déduites de `keypoints` (scan complet périodique).
+        keypoints (np.ndarray): Keypoints de pose (P, 17, 3) de la frame, ou None.
+        cache_identites (CacheIdentitesPistes): Si fourni avec les pistes, réutilise
+            l'identité déjà reconnue de la piste au lieu de relancer LBPH.
+        ids_pistes (np.ndarray): Identifiants des pistes du tracker (P,).
+        boites_pistes (np.ndarray): Boîtes (P, 4) des pistes en (x1, y1, x2, y2).
+        backend (identification_embeddings.BackendIdentification): Méthode d'identification
+            (voir identification_embeddings.preparer_backend) ; par défaut, le modèle LBPH global.
+        
+    Returns:
+        tuple: (boites (F, 4) int32 en (x, y, w, h), identites (F,) int32, confiances (F,) float32,
+        pistes (F,) int64 (-1 si aucune), noms), au format de ResultatsFrame.definir_visages.
+    """
+    noms = tuple(known_faces_names if backend is None else backend.noms)
+    if cascade is None:
+        return (np.empty((0, 4), dtype=np.int32), np.empty(0, dtype=np.int32),
+                np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64), noms)
+        
+    # Conversion en niveaux de gris pour la détection
+    gray_frame = cv2.cvtColor(frame_rgb, cv2.COLOR_BGR2GRAY)
+    
+    # 1. Détection des visages (Haar Cascade)
+    with metriques.chronometre("haar"):
+        if recherche_guidee is not None:
+            faces = recherche_guidee.detecter(gray_frame, cascade, keypoints)
+        else:
+            faces = detecter_visages_plein_cadre(gray_frame, cascade)
+    faces = np.ascontiguousarray(faces, dtype=np.int32).reshape(-1, 4)
+    
+    utiliser_cache = cache_identites is not None and ids_pistes is not None and boites_pistes is not None
+    indices_pistes = associer_visages_pistes(faces, boites_pistes) if utiliser_cache else None
+    
+    identites = np.empty(faces.shape[0], dtype=np.int32)
+    confiances = np.empty(faces.shape[0], dtype=np.float32)
+    pistes = np.full(faces.shape[0], -1, dtype=np.int64)
+    
+    # 2. Identités en cache des pistes ; les autres visages sont identifiés ensemble
+    a_identifier = []
+    for k, (x, y, w, h) in enumerate(faces):
+        identite = None
+        if utiliser_cache and indices_pistes[k] >= 0:
+            pistes[k] = ids_pistes[indices_pistes[k]]
+            identite = cache_identites.obtenir(int(pistes[k]), boites_pistes[indices_pistes[k]])
+        
+        if identite is None:
+            a_identifier.append(k)
+        else:
+            identites[k], confiances[k] = identite
+    
+    if a_identifier:
+        # Extraire la zone de chaque visage, puis un seul appel pour toute la frame
+        rois = [gray_frame[y:y + h, x:x + w] for x, y, w, h in faces[a_identifier]]
+        with metriques.chronometre("identification"):
+            if backend is None:
+                identites[a_identifier], confiances[a_identifier] = identifier_visages_ids(rois)
+            else:
+                identites[a_identifier], confiances[a_identifier] = backend.identifier_ids(rois)
+        
+        if utiliser_cache:
+            if backend is None:
+                certains = est_certain_lbph(confiances[a_identifier])
+            else:
+                certains = backend.est_certain(confiances[a_identifier])
+            for k, certain in zip(a_identifier, certains):
+                if pistes[k] >= 0:
+                    cache_identites.enregistrer(
+                        int(pistes[k]), boites_pistes[indices_pistes[k]], int(identites[k]), float(confiances[k]), certain
+                    )
+        
+    return faces, identites, confiances, pistes, noms
+
+def detecter_et_identifier_visages(frame_rgb, cascade, **options):
+    """
+    Comme detecter_et_identifier_visages_tableaux, au format d'origine (export JSON, scripts).
+        
+    Returns:
+        list: Une liste de dictionnaires [{'box': (x, y, w, h), 'name': '...', 'conf': '...', 'piste': id ou None}]
+    """
+    faces, identites, confiances, pistes, noms = detecter_et_identifier_visages_tableaux(frame_rgb, cascade, **options)
+    return [
+        {
+            'box': tuple(int(v) for v in faces[k]),
+            'name': nom_identite(int(identites[k]), noms),
+            'conf': float(confiances[k]),
+            'piste': int(pistes[k]) if pistes[k] >= 0 else None
+        }
+        for k in range(faces.shape[0])
+    ]
+
+if __name__ == "__main__":
+    print("Ce module contient la logique de reconnaissance faciale.")
+    # Exécutez l'entraînement si le chemin est défini (pour tester)
+    
+
+    preparer_base_de_donnees_visages(DATABASE_FOLDER)
@@ -0,0 +1,110 @@
+# rendu.py (Dessin groupé des résultats et affichage à cadence limitée)
+
+import time
+
+import cv2
+import numpy as np
+
+# Décalages (dy, dx) des pixels d'un disque plein, par rayon (calculés une fois)
+_disques = {}
+
+
+def _disque(rayon):
+    """Pixels du disque que trace cv2.circle(..., rayon, thickness=-1) autour de (0, 0)."""
+    if rayon not in _disques:
+        masque = np.zeros((2 * rayon + 1, 2 * rayon + 1), dtype=np.uint8)
+        cv2.circle(masque, (rayon, rayon), rayon, 1, -1)
+        dy, dx = np.nonzero(masque)
+        _disques[rayon] = (dy.astype(np.int64) - rayon, dx.astype(np.int64) - rayon)
+    return _disques[rayon]
+
+
+def dessiner_points(image, points, couleur, rayon):
+    """
+    Dessine des disques pleins en `points` (M, 2) en une seule écriture NumPy.
+
+    Même résultat qu'un cv2.circle(image, (int(x), int(y)), rayon, couleur, -1) par point,
+    sans appel OpenCV par point : les pixels de tous les disques sont calculés à partir
+    d'un disque modèle puis écrits ensemble.
+    """
+    if len(points) == 0:
+        return
+    hauteur, largeur = image.shape[:2]
+    dy, dx = _disque(rayon)
+    centres = np.asarray(points).astype(np.int64) # Troncature, comme int(x)
+    ys = (centres[:, 1, np.newaxis] + dy).ravel()
+    xs = (centres[:, 0, np.newaxis] + dx).ravel()
+    dedans = (ys >= 0) & (ys < hauteur) & (xs >= 0) & (xs < largeur)
+    ys, xs = ys[dedans], xs[dedans]
+
+    if image.ndim == 3 and image.dtype == np.uint8 and image.flags.c_contiguous:
+        # Chaque pixel vu comme un seul élément de `canaux` octets : une écriture par pixel
+        # au lieu d'une par canal (environ 3x plus rapide que l'indexation (N, 3))
+        canaux = image.shape[2]
+        pixels = image.reshape(-1, canaux).view(np.dtype((np.void, canaux))).ravel()
+        valeur = np.array(couleur, dtype=np.uint8).view(np.dtype((np.void, canaux)))[0]
+        pixels[ys * largeur + xs] = valeur
+    else:
+        image[ys, xs] = couleur
+
+
+def dessiner_keypoints(image, keypoints, couleur, rayon, seuil_confiance=0.5):
+    """Dessine d'un coup tous les keypoints (P, K, 3) dont la confiance dépasse `seuil_confiance`."""
+    if keypoints.shape[0] == 0:
+        return
+    fiables = keypoints[..., 2] > seuil_confiance
+    dessiner_points(image, keypoints[fiables][:, :2], couleur, rayon)
+
+
+def dessiner_boites(image, boites, couleur, epaisseur):
+    """Dessine toutes les boîtes (N, 4) en (x1, y1, x2, y2) en un seul appel cv2.polylines."""
+    if len(boites) == 0:
+        return
+    b = np.asarray(boites).astype(np.int32)
+    contours = np.stack([b[:, [0, 1]], b[:, [2, 1]], b[:, [2, 3]], b[:, [0, 3]]], axis=1)
+    cv2.polylines(image, list(contours), True, couleur, epaisseur)
+
+
+class AffichageLimite:
+    """
+    Fenêtre d'affichage découplée de la cadence d'analyse.
+
+    - `doit_afficher()` : True si une image doit être dessinée et affichée maintenant
+      (au plus `frequence_max` images par seconde, jamais si `actif` est faux).
+      Quand il retourne False, la boucle saute la copie de la frame et tout le dessin.
+    - `preparer(frame)` : copie la frame dans un tampon réutilisé d'une image à l'autre
+      (pas d'allocation par frame) et le retourne pour y dessiner.
+    - `afficher(image)` : affiche et traite les événements clavier ; retourne True si
+      l'utilisateur a demandé à quitter ('q').
+
+    Sans affichage (`actif=False`, postes sans écran), aucune fenêtre n'est créée : la
+    boucle s'arrête par Ctrl+C.
+    """
+
+    def __init__(self, nom_fenetre, frequence_max=15.0, actif=True):
+        self.nom_fenetre = nom_fenetre
+        self.periode = 1.0 / frequence_max if frequence_max else 0.0
+        self.actif = actif
+        self.nb_affichees = 0
+        self._dernier_affichage = 0.0
+        self._tampon = None
+
+    def doit_afficher(self):
+        return self.actif and time.perf_counter() - self._dernier_affichage >= self.periode
+
+    def preparer(self, frame):
+        if self._tampon is None or self._tampon.shape != frame.shape or self._tampon.dtype != frame.dtype:
+            self._tampon = np.empty_like(frame)
+        np.copyto(self._tampon, frame)
+        return self._tampon
+
+    def afficher(self, image):
+        self._dernier_affichage = time.perf_counter()
+        self.nb_affichees += 1
+        cv2.imshow(self.nom_fenetre, image)
+        return cv2.waitKey(1) & 0xFF == ord("q")
+
+    def fermer(self):
+        # Seule une fenêtre réellement ouverte est fermée (rien à faire sans écran)
+        if self.nb_affichees:
+            cv2.destroyWindow(self.nom_fenetre)
@@ -0,0 +1,95 @@
+# resultats_frame.py (Résultats d'une frame en tableaux NumPy contigus)
+
+import numpy as np
+
+import reconnaissance_faciale
+
+NB_KEYPOINTS = 17
+
+
+def extraire_boites(results):
+    """
+    Boîtes, scores et classes de tous les résultats Ultralytics d'une frame.
+
+    Un seul transfert vers la mémoire hôte par résultat : `boxes.data` contient déjà
+    (x1, y1, x2, y2, [id de suivi,] score, classe) pour toutes les détections.
+
+    Returns:
+        tuple: (boites (N, 4) float32, scores (N,) float32, classes (N,) int32)
+    """
+    blocs = [result.boxes.data.cpu().numpy() for result in results if result.boxes is not None]
+    donnees = np.concatenate(blocs, axis=0) if blocs else np.empty((0, 6), dtype=np.float32)
+    return (
+        np.ascontiguousarray(donnees[:, :4], dtype=np.float32),
+        np.ascontiguousarray(donnees[:, -2], dtype=np.float32),
+        donnees[:, -1].astype(np.int32),
+    )
+
+
+def extraire_keypoints(results):
+    """Keypoints (P, 17, 3) de tous les résultats de pose d'une frame, un transfert par résultat."""
+    blocs = [result.keypoints.data.cpu().numpy() for result in results if result.keypoints is not None]
+    if not blocs:
+        return np.empty((0, NB_KEYPOINTS, 3), dtype=np.float32)
+    return np.ascontiguousarray(np.concatenate(blocs, axis=0), dtype=np.float32)
+
+
+class ResultatsFrame:
+    """
+    Résultats d'une frame, rangés dans des tableaux NumPy contigus (une ligne par élément).
+
+    - Personnes (modèle de pose) : boites (P, 4) en (x1, y1, x2, y2), scores (P,),
+      classes (P,), keypoints (P, 17, 3), ids_pistes (P,) (-1 sans tracker).
+    - Objets (modèle de détection) : objets_boites (N, 4), objets_scores (N,), objets_classes (N,).
+    - Visages : visages_boites (F, 4) en (x, y, w, h), visages_identites (F,) (indice
+      dans noms_identites, négatif pour Inconnu / Erreur / Non entraîné, voir
+      reconnaissance_faciale), visages_confiances (F,), visages_pistes (F,) (-1 si aucune).
+
+    L'analyse et le dessin indexent directement ces tableaux : aucun objet Python
+    n'est créé par personne ou par visage.
+    """
+
+    __slots__ = (
+        "boites", "scores", "classes", "keypoints", "ids_pistes",
+        "objets_boites", "objets_scores", "objets_classes",
+        "visages_boites", "visages_identites", "visages_confiances", "visages_pistes", "noms_identites",
+    )
+
+    def __init__(self, boites=None, scores=None, classes=None, keypoints=None, ids_pistes=None):
+        self.boites = boites if boites is not None else np.empty((0, 4), dtype=np.float32)
+        nb = self.boites.shape[0]
+        self.scores = scores if scores is not None else np.ones(nb, dtype=np.float32)
+        self.classes = classes if classes is not None else np.zeros(nb, dtype=np.int32)
+        self.keypoints = keypoints if keypoints is not None else np.empty((0, NB_KEYPOINTS, 3), dtype=np.float32)
+        self.ids_pistes = ids_pistes if ids_pistes is not None else np.full(nb, -1, dtype=np.int64)
+        self.definir_objets(np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int32))
+        self.definir_visages(
+            np.empty((0, 4), dtype=np.int32), np.empty(0, dtype=np.int32),
+            np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64), ()
+        )
+
+    @classmethod
+    def depuis_results(cls, results_pose):
+        """Construit les résultats d'une frame à partir de la sortie du modèle de pose."""
+        boites, scores, classes = extraire_boites(results_pose)
+        return cls(boites, scores, classes, extraire_keypoints(results_pose))
+
+    def __len__(self):
+        return self.boites.shape[0]
+
+    def definir_objets(self, boites, scores, classes):
+        """Range la sortie du modèle de détection (voir extraire_boites)."""
+        self.objets_boites = boites
+        self.objets_scores = scores
+        self.objets_classes = classes
+
+    def definir_visages(self, boites, identites, confiances, pistes, noms):
+        """Range la sortie de reconnaissance_faciale.detecter_et_identifier_visages_tableaux."""
+        self.visages_boites = boites
+        self.visages_identites = identites
+        self.visages_confiances = confiances
+        self.visages_pistes = pistes
+        self.noms_identites = noms
+
+    def nom_visage(self, k):
+        return reconnaissance_faciale.nom_identite(int(self.visages_identites[k]), self.noms_identites)
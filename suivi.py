@@ -0,0 +1,209 @@
+# suivi.py (Tracking multi-objets : identifiants stables d'une frame à l'autre)
+
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError: # SciPy absent : association gloutonne (voir _assignation)
+    linear_sum_assignment = None
+    print("Attention : SciPy absent (voir requirements.txt), le suivi utilise une association gloutonne non optimale.")
+
+# Coût attribué aux paires interdites (IoU trop faible) dans la matrice d'association
+COUT_INTERDIT = 1e6
+
+
+def iou_matrice(boites_a, boites_b):
+    """
+    Calcule l'IoU de toutes les paires de boîtes en une seule opération vectorisée.
+
+    Args:
+        boites_a (np.ndarray): Boîtes (A, 4) en (x1, y1, x2, y2).
+        boites_b (np.ndarray): Boîtes (B, 4) en (x1, y1, x2, y2).
+
+    Returns:
+        np.ndarray: Matrice (A, B) des IoU.
+    """
+    boites_a = np.asarray(boites_a, dtype=np.float32).reshape(-1, 4)
+    boites_b = np.asarray(boites_b, dtype=np.float32).reshape(-1, 4)
+
+    a = boites_a[:, np.newaxis, :]
+    b = boites_b[np.newaxis, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+
+    aire_a = (boites_a[:, 2] - boites_a[:, 0]) * (boites_a[:, 3] - boites_a[:, 1])
+    aire_b = (boites_b[:, 2] - boites_b[:, 0]) * (boites_b[:, 3] - boites_b[:, 1])
+    union = aire_a[:, np.newaxis] + aire_b[np.newaxis, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def similarite_keypoints_matrice(kp_a, kp_b, boites_b, seuil_confiance=0.5):
+    """
+    Similarité (A, B) entre squelettes : exp(-d²) où d est la distance moyenne des
+    keypoints fiables des deux côtés, normalisée par la diagonale de la boîte B.
+    Donne une valeur comparable à l'IoU (1 = identique, 0 = éloigné).
+    """
+    kp_a = np.asarray(kp_a, dtype=np.float32)
+    kp_b = np.asarray(kp_b, dtype=np.float32)
+    boites_b = np.asarray(boites_b, dtype=np.float32).reshape(-1, 4)
+
+    diff = kp_a[:, np.newaxis, :, :2] - kp_b[np.newaxis, :, :, :2]          # (A, B, K, 2)
+    distances = np.sqrt((diff ** 2).sum(axis=-1))                          # (A, B, K)
+    fiables = (kp_a[:, np.newaxis, :, 2] >= seuil_confiance) & (kp_b[np.newaxis, :, :, 2] >= seuil_confiance)
+    nb_fiables = fiables.sum(axis=-1)
+
+    distance_moyenne = np.where(fiables, distances, 0).sum(axis=-1) / np.maximum(nb_fiables, 1)
+    diagonale = np.hypot(boites_b[:, 2] - boites_b[:, 0], boites_b[:, 3] - boites_b[:, 1])
+    d = distance_moyenne / np.maximum(diagonale, 1.0)[np.newaxis, :]
+    return np.where(nb_fiables > 0, np.exp(-(d * 4.0) ** 2), 0.0)
+
+
+def _assignation(cout):
+    """
+    Retourne les paires (lignes, colonnes) de coût minimal.
+    Utilise l'algorithme hongrois (SciPy) ; à défaut, une association gloutonne par coût croissant.
+    """
+    if cout.size == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+    if linear_sum_assignment is not None:
+        lignes, colonnes = linear_sum_assignment(cout)
+    else:
+        ordre = np.argsort(cout, axis=None)
+        lignes_prises = np.zeros(cout.shape[0], dtype=bool)
+        colonnes_prises = np.zeros(cout.shape[1], dtype=bool)
+        lignes, colonnes = [], []
+        for i, j in zip(*np.unravel_index(ordre, cout.shape)):
+            if cout[i, j] >= COUT_INTERDIT:
+                break
+            if not lignes_prises[i] and not colonnes_prises[j]:
+                lignes_prises[i] = colonnes_prises[j] = True
+                lignes.append(i)
+                colonnes.append(j)
+        lignes, colonnes = np.array(lignes, dtype=np.intp), np.array(colonnes, dtype=np.intp)
+
+    valides = cout[lignes, colonnes] < COUT_INTERDIT
+    return lignes[valides], colonnes[valides]
+
+
+class Piste:
+    """Une personne suivie : dernière boîte, vitesse estimée et compteurs de vie."""
+
+    __slots__ = ("id", "boite", "keypoints", "vitesse", "nb_detections", "nb_manquees")
+
+    def __init__(self, piste_id, boite, keypoints=None):
+        self.id = piste_id
+        self.boite = np.asarray(boite, dtype=np.float32)
+        self.keypoints = keypoints
+        self.vitesse = np.zeros(4, dtype=np.float32)
+        self.nb_detections = 1
+        self.nb_manquees = 0
+
+
+class SuiviMultiObjets:
+    """
+    Tracker multi-objets par association IoU (ou distance de keypoints) et affectation optimale.
+
+    - Naissance : toute détection non associée crée une nouvelle piste, confirmée
+      après `min_detections` détections.
+    - Roue libre : une piste non détectée continue sur sa vitesse estimée pendant
+      au plus `max_manquees` frames.
+    - Mort : au-delà, la piste est supprimée.
+
+    Args:
+        seuil_iou (float): Similarité minimale pour associer une détection à une piste.
+        max_manquees (int): Nombre de frames sans détection avant suppression.
+        min_detections (int): Nombre de détections avant qu'une piste soit confirmée.
+        mode_cout (str): "iou" (boîtes) ou "keypoints" (squelettes).
+    """
+
+    def __init__(self, seuil_iou=0.3, max_manquees=15, min_detections=3, mode_cout="iou"):
+        self.seuil_iou = seuil_iou
+        self.max_manquees = max_manquees
+        self.min_detections = min_detections
+        self.mode_cout = mode_cout
+        self.pistes = []
+        self._prochain_id = 1
+
+    def _nouvelle_piste(self, boite, keypoints):
+        piste = Piste(self._prochain_id, boite, keypoints)
+        self._prochain_id += 1
+        self.pistes.append(piste)
+        return piste
+
+    def mettre_a_jour(self, boites, keypoints=None):
+        """
+        Associe les détections de la frame aux pistes existantes.
+
+        Args:
+            boites (np.ndarray): Boîtes détectées (N, 4) en (x1, y1, x2, y2).
+            keypoints (np.ndarray): Keypoints (N, 17, 3) correspondants, ou None.
+
+        Returns:
+            np.ndarray: Identifiant de piste (N,) de chaque détection, dans l'ordre d'entrée.
+        """
+        boites = np.asarray(boites, dtype=np.float32).reshape(-1, 4)
+        nb_detections = boites.shape[0]
+        ids = np.zeros(nb_detections, dtype=np.int64)
+
+        # 1. Prédiction : chaque piste avance selon sa vitesse estimée
+        for piste in self.pistes:
+            piste.boite = piste.boite + piste.vitesse
+
+        # 2. Matrice de similarité pistes x détections, puis affectation optimale
+        lignes = colonnes = np.empty(0, dtype=np.intp)
+        if self.pistes and nb_detections:
+            boites_pistes = np.stack([piste.boite for piste in self.pistes])
+            if self.mode_cout == "keypoints" and keypoints is not None and all(
+                piste.keypoints is not None for piste in self.pistes
+            ):
+                similarite = similarite_keypoints_matrice(
+                    np.stack([piste.keypoints for piste in self.pistes]), keypoints, boites
+                )
+            else:
+                similarite = iou_matrice(boites_pistes, boites)
+            cout = np.where(similarite >= self.seuil_iou, 1.0 - similarite, COUT_INTERDIT)
+            lignes, colonnes = _assignation(cout)
+
+        # 3. Mise à jour des pistes associées
+        detections_associees = np.zeros(nb_detections, dtype=bool)
+        pistes_associees = np.zeros(len(self.pistes), dtype=bool)
+        for i, j in zip(lignes, colonnes):
+            piste = self.pistes[i]
+            nouvelle_boite = boites[j]
+            # Vitesse lissée (la boîte prédite contient déjà l'ancienne vitesse)
+            piste.vitesse = 0.5 * piste.vitesse + 0.5 * (nouvelle_boite - (piste.boite - piste.vitesse))
+            piste.boite = nouvelle_boite.copy()
+            piste.keypoints = None if keypoints is None else keypoints[j]
+            piste.nb_detections += 1
+            piste.nb_manquees = 0
+            ids[j] = piste.id
+            detections_associees[j] = True
+            pistes_associees[i] = True
+
+        # 4. Roue libre puis mort des pistes non associées
+        for piste, associee in zip(list(self.pistes), pistes_associees):
+            if not associee:
+                piste.nb_manquees += 1
+        self.pistes = [piste for piste in self.pistes if piste.nb_manquees <= self.max_manquees]
+
+        # 5. Naissance des nouvelles pistes
+        for j in np.flatnonzero(~detections_associees):
+            piste = self._nouvelle_piste(boites[j], None if keypoints is None else keypoints[j])
+            ids[j] = piste.id
+
+        return ids
+
+    def est_confirmee(self, piste_id):
+        for piste in self.pistes:
+            if piste.id == piste_id:
+                return piste.nb_detections >= self.min_detections
+        return False
+
+    def pistes_actives(self):
+        """Pistes confirmées et détectées sur la dernière frame."""
+        return [
+            piste for piste in self.pistes
+            if piste.nb_manquees == 0 and piste.nb_detections >= self.min_detections
+        ]
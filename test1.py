@@ -1,50 +1,548 @@
-# test1.py (VERSION MODIFIÉE - AJOUT DE LA DÉTECTION DE TÊTE/PERSONNE)
-
-import cv2
-from ultralytics import YOLO
-import time 
-import numpy as np # Ajouté pour les types NumPy si nécessaire
-
-def charger_modele(model_path, task="pose"):
-    """
-    Charge et retourne un modèle YOLO (pose ou detect).
-    
-    Args:
-        model_path (str): Le chemin vers le fichier du modèle.
-        task (str): La tâche du modèle ('pose' ou 'detect').
-        
-    Returns:
-        YOLO: Le modèle chargé ou None en cas d'erreur.
-    """
-    print(f"Chargement du modèle de {task} : {model_path}...")
-    try:
-        # Tâche par défaut est 'pose' pour la compatibilité avec l'ancien code.
-        model = YOLO(model_path, task=task)
-        print(f"Modèle de {task} chargé avec succès.")
-        return model
-    except Exception as e:
-        print(f"Erreur lors du chargement du modèle de {task} : {e}")
-        return None
-
-# Renommé et adapté pour accepter le modèle en paramètre
-def executer_inference_frame(model, frame):
-    """
-    Exécute la détection (pose ou detect) sur une seule frame.
-    
-    Args:
-        model (YOLO): Le modèle de détection chargé.
-        frame (np.ndarray): La frame à analyser.
-        
-    Returns:
-        list: La liste des objets Result d'Ultralytics.
-    """
-    if model is None:
-        return []
-        
-    # 'stream=False' pour une seule frame est plus direct.
-    # Utilisation d'un seuil de confiance par défaut de 0.5
-    results = model(frame, stream=False, conf=0.5, save=False, verbose=False)
-    return results
-
-if __name__ == "__main__":
+# test1.py (VERSION MODIFIÉE - AJOUT DE LA DÉTECTION DE TÊTE/PERSONNE)
+
+import cv2
+import time 
+import threading
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import numpy as np # Ajouté pour les types NumPy si nécessaire
+
+import metriques
+from resultats_frame import extraire_boites, extraire_keypoints
+
+# --- Backends d'inférence CPU optimisés ---
+# Les exports (ONNX Runtime, OpenVINO) sont mis en cache dans CACHE_MODELES, nommés d'après
+# l'empreinte des poids .pt et la taille d'entrée : ils ne sont refaits que si les poids changent.
+CACHE_MODELES = ".cache_modeles"
+TAILLE_ENTREE = 640
+BACKENDS_OPTIMISES = ("openvino", "onnx") # Essayés dans cet ordre, s'ils sont installés
+QUANTIFICATION_INT8 = False # Ajoute des variantes INT8 aux candidats (plus rapides, un peu moins précises)
+_MODULES_BACKENDS = {"openvino": "openvino", "onnx": "onnxruntime"}
+
+# Backend retenu pour chaque modèle (clé : poids, taille d'entrée, tâche) : au redémarrage,
+# le modèle est chargé directement avec ce backend, sans repasser par PyTorch ni rechronométrer
+FICHIER_BACKENDS_RETENUS = "backends_retenus.json"
+
+# Registre des modèles du processus : chaque modèle n'est chargé qu'une fois
+_registre_modeles = {}
+_verrou_registre = threading.Lock()
+_verrou_backends_retenus = threading.Lock()
+_empreintes = {}
+
+
+def importer_ultralytics():
+    """
+    Importe Ultralytics (et PyTorch) au premier besoin seulement : cet import prend
+    plusieurs secondes, il n'est donc fait qu'au chargement effectif d'un modèle.
+    
+    Returns:
+        type: La classe ultralytics.YOLO.
+    """
+    from ultralytics import YOLO
+    return YOLO
+
+
+def empreinte_poids(model_path):
+    """Empreinte SHA-1 (16 caractères) du fichier de poids, mémorisée tant que le fichier ne change pas."""
+    infos = os.stat(model_path)
+    cle = (os.path.abspath(model_path), infos.st_size, infos.st_mtime)
+    if cle not in _empreintes:
+        sha = hashlib.sha1()
+        with open(model_path, "rb") as f:
+            for bloc in iter(lambda: f.read(1 << 20), b""):
+                sha.update(bloc)
+        _empreintes[cle] = sha.hexdigest()[:16]
+    return _empreintes[cle]
+
+
+def chemin_export(model_path, backend, imgsz=TAILLE_ENTREE, int8=False, dossier_cache=CACHE_MODELES):
+    """Chemin, dans le cache, de l'export des poids vers `backend` ('onnx' ou 'openvino')."""
+    nom = os.path.splitext(os.path.basename(model_path))[0]
+    base = f"{nom}-{empreinte_poids(model_path)}-{imgsz}" + ("-int8" if int8 else "")
+    return os.path.join(dossier_cache, base + (".onnx" if backend == "onnx" else "_openvino_model"))
+
+
+def _cle_backend(model_path, task, imgsz):
+    nom = os.path.splitext(os.path.basename(model_path))[0]
+    return f"{nom}-{empreinte_poids(model_path)}-{imgsz}-{task}"
+
+
+def _candidats_optimisation(backends, int8):
+    """Noms des backends essayés par ModeleOptimise._optimiser, dans l'ordre."""
+    return list(backends) + ([backend + "-int8" for backend in backends] if int8 else [])
+
+
+def _lire_backends_retenus(dossier_cache=CACHE_MODELES):
+    try:
+        with open(os.path.join(dossier_cache, FICHIER_BACKENDS_RETENUS), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def backend_retenu(model_path, task, imgsz=TAILLE_ENTREE, int8=QUANTIFICATION_INT8, dossier_cache=CACHE_MODELES):
+    """
+    Backend retenu lors d'une précédente optimisation de ces poids, s'il est encore valable
+    (mêmes backends candidats installés, export toujours présent dans le cache), sinon None.
+    """
+    if not os.path.exists(model_path): # Poids absents : Ultralytics les téléchargera
+        return None
+    retenu = _lire_backends_retenus(dossier_cache).get(_cle_backend(model_path, task, imgsz))
+    if retenu is None or retenu.get("candidats") != _candidats_optimisation(backends_disponibles(), int8):
+        return None
+    backend = retenu["backend"]
+    if backend != "torch" and not os.path.exists(
+        chemin_export(model_path, backend.replace("-int8", ""), imgsz, backend.endswith("-int8"), dossier_cache)
+    ):
+        return None
+    return backend
+
+
+def memoriser_backend(model_path, task, imgsz, backend, candidats, dossier_cache=CACHE_MODELES):
+    """Enregistre le backend retenu pour ces poids (voir backend_retenu)."""
+    with _verrou_backends_retenus:
+        retenus = _lire_backends_retenus(dossier_cache)
+        retenus[_cle_backend(model_path, task, imgsz)] = {"backend": backend, "candidats": candidats}
+        os.makedirs(dossier_cache, exist_ok=True)
+        chemin = os.path.join(dossier_cache, FICHIER_BACKENDS_RETENUS)
+        with open(chemin + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(retenus, f, indent=2)
+        os.replace(chemin + ".tmp", chemin)
+
+
+def backends_disponibles():
+    """Backends optimisés dont le module Python est installé."""
+    return [
+        backend for backend in BACKENDS_OPTIMISES
+        if importlib.util.find_spec(_MODULES_BACKENDS[backend]) is not None
+    ]
+
+
+def exporter_modele(model_path, task, backend, imgsz=TAILLE_ENTREE, int8=False, dossier_cache=CACHE_MODELES):
+    """
+    Exporte les poids .pt vers `backend` ('onnx' ou 'openvino'), ou réutilise l'export en cache.
+    
+    Les exports ont un batch dynamique (batchs multi-flux et tuiles). En INT8, OpenVINO
+    utilise la quantification calibrée d'Ultralytics, ONNX une quantification dynamique
+    des poids (onnxruntime.quantization).
+    
+    Returns:
+        str: Chemin du modèle exporté, ou None si l'export a échoué.
+    """
+    suffixe = "-int8" if int8 else ""
+    cible = chemin_export(model_path, backend, imgsz, int8, dossier_cache)
+    if os.path.exists(cible):
+        return cible
+    
+    # Ultralytics écrit l'export à côté des poids : on exporte depuis une copie placée dans le cache
+    nom = os.path.splitext(os.path.basename(model_path))[0]
+    os.makedirs(dossier_cache, exist_ok=True)
+    copie = os.path.join(dossier_cache, f"{nom}-{empreinte_poids(model_path)}-{imgsz}.pt")
+    print(f"Export du modèle de {task} vers {backend}{suffixe} (une seule fois)...")
+    try:
+        YOLO = importer_ultralytics()
+        shutil.copyfile(model_path, copie)
+        if backend == "onnx":
+            chemin = YOLO(copie, task=task).export(format="onnx", imgsz=imgsz, dynamic=True, verbose=False)
+            if int8:
+                from onnxruntime.quantization import QuantType, quantize_dynamic
+                quantize_dynamic(chemin, cible, weight_type=QuantType.QUInt8)
+                os.remove(chemin)
+            else:
+                os.replace(chemin, cible)
+        else:
+            chemin = YOLO(copie, task=task).export(format="openvino", imgsz=imgsz, dynamic=True, int8=int8, verbose=False)
+            os.replace(str(chemin).rstrip("/\\"), cible)
+    except Exception as e:
+        print(f"Export {backend}{suffixe} du modèle de {task} impossible : {e}")
+        return None
+    finally:
+        if os.path.exists(copie):
+            os.remove(copie)
+    return cible
+
+
+def _mesurer_backends(models, imgsz, repetitions=5):
+    """
+    Préchauffe les modèles puis retourne leurs durées d'inférence médianes (ms) sur une image de test.
+    
+    Les mesures sont entrelacées (un appel de chaque modèle à tour de rôle) : la charge du
+    reste du processus (inférence en direct) pèse de la même façon sur tous les modèles comparés.
+    """
+    image = np.random.default_rng(0).integers(0, 255, (imgsz * 3 // 4, imgsz, 3), dtype=np.uint8)
+    for model in models:
+        for _ in range(2):
+            model(image, imgsz=imgsz, verbose=False)
+    durees = [[] for _ in models]
+    for _ in range(repetitions):
+        for model, durees_model in zip(models, durees):
+            debut = time.perf_counter()
+            model(image, imgsz=imgsz, verbose=False)
+            durees_model.append(time.perf_counter() - debut)
+    return [float(np.median(durees_model)) * 1000.0 for durees_model in durees]
+
+
+class ModeleOptimise:
+    """
+    Modèle YOLO partagé du registre, appelable comme un modèle Ultralytics.
+    
+    Il sert d'abord avec le backend chargé (PyTorch par défaut). optimiser_en_fond()
+    exporte (ou relit du cache) les backends optimisés disponibles, les préchauffe et
+    les chronomètre dans un thread de fond, puis bascule sur le plus rapide : le
+    changement est transparent pour executer_inference_frame / executer_inference_batch.
+    """
+    
+    def __init__(self, model, model_path, task, backend="torch", imgsz=TAILLE_ENTREE):
+        self.model_path = model_path
+        self.task = task
+        self.backend = backend
+        self.imgsz = imgsz
+        self.durees_ms = {}
+        self._model = model
+        self._verrou = threading.Lock() # Un seul appel à la fois par modèle (prédicteur non thread-safe)
+        self._thread_optimisation = None
+    
+    @property
+    def names(self):
+        return self._model.names
+    
+    def __call__(self, source, **options):
+        options.setdefault("imgsz", self.imgsz)
+        with self._verrou:
+            return self._model(source, **options)
+    
+    def optimiser_en_fond(self, backends=None, int8=QUANTIFICATION_INT8):
+        """Lance la sélection du backend le plus rapide dans un thread de fond."""
+        if backends is None:
+            backends = backends_disponibles()
+        self._thread_optimisation = threading.Thread(
+            target=self._optimiser, args=(backends, int8), name=f"optimisation-{self.task}", daemon=True
+        )
+        self._thread_optimisation.start()
+    
+    def attendre_optimisation(self, timeout=None):
+        if self._thread_optimisation is not None:
+            self._thread_optimisation.join(timeout)
+    
+    def _optimiser(self, backends, int8):
+        try:
+            # Les mesures utilisent leurs propres instances, sans le verrou : l'inférence en
+            # direct continue pendant ce temps. Le verrou n'est pris que pour la bascule.
+            YOLO = importer_ultralytics()
+            meilleur_nom, meilleur = self.backend, YOLO(self.model_path, task=self.task)
+            
+            candidats = [(backend, False) for backend in backends]
+            if int8:
+                candidats += [(backend, True) for backend in backends]
+            for backend, quantifie in candidats:
+                chemin = exporter_modele(self.model_path, self.task, backend, self.imgsz, quantifie)
+                if chemin is None:
+                    continue
+                nom = backend + ("-int8" if quantifie else "")
+                candidat = YOLO(chemin, task=self.task)
+                # Candidat comparé au meilleur actuel, mesuré en même temps (même charge CPU)
+                self.durees_ms[meilleur_nom], self.durees_ms[nom] = _mesurer_backends([meilleur, candidat], self.imgsz)
+                if self.durees_ms[nom] < self.durees_ms[meilleur_nom]:
+                    meilleur_nom, meilleur = nom, candidat
+            
+            if meilleur_nom != self.backend:
+                with self._verrou:
+                    self._model = meilleur
+                    self.backend = meilleur_nom
+            
+            resume = ", ".join(f"{nom} {duree:.0f} ms" for nom, duree in self.durees_ms.items())
+            print(f"Modèle de {self.task} : backend '{self.backend}' retenu ({resume}).")
+            memoriser_backend(
+                self.model_path, self.task, self.imgsz, self.backend, _candidats_optimisation(backends, int8)
+            )
+        except Exception as e:
+            print(f"Optimisation du modèle de {self.task} impossible, PyTorch conservé : {e}")
+
+
+def charger_modele(model_path, task="pose", optimiser=True, backend=None):
+    """
+    Charge et retourne un modèle YOLO (pose ou detect), partagé dans tout le processus.
+    
+    Un même fichier n'est chargé qu'une fois : les appels suivants retournent le même
+    objet. Sans `backend` imposé, le modèle sert tout de suite avec PyTorch et, si
+    `optimiser`, le backend le plus rapide est choisi en arrière-plan (pendant
+    l'ouverture de la caméra, la préparation de la base de visages...). Ce choix est
+    mémorisé : aux lancements suivants, le backend retenu est chargé directement.
+    
+    Args:
+        model_path (str): Le chemin vers le fichier du modèle.
+        task (str): La tâche du modèle ('pose' ou 'detect').
+        optimiser (bool): Lance la sélection du backend le plus rapide en arrière-plan.
+        backend (str): Backend imposé ('torch', 'onnx', 'openvino', 'onnx-int8'...).
+        
+    Returns:
+        ModeleOptimise: Le modèle chargé ou None en cas d'erreur.
+    """
+    cle = (os.path.abspath(model_path), task, backend)
+    with _verrou_registre:
+        if cle in _registre_modeles:
+            return _registre_modeles[cle]
+        
+        print(f"Chargement du modèle de {task} : {model_path}...")
+        try:
+            # Backend déjà choisi lors d'un lancement précédent : pas de nouvelle optimisation
+            if backend is None and optimiser:
+                retenu = backend_retenu(model_path, task)
+                if retenu is not None:
+                    backend, optimiser = retenu, False
+                    print(f"Backend '{retenu}' retenu précédemment pour le modèle de {task}.")
+            
+            # Tâche par défaut est 'pose' pour la compatibilité avec l'ancien code.
+            YOLO = importer_ultralytics()
+            chemin = model_path
+            if backend not in (None, "torch"):
+                chemin = exporter_modele(model_path, task, backend.replace("-int8", ""), int8=backend.endswith("-int8"))
+                if chemin is None:
+                    chemin, backend = model_path, "torch"
+            model = ModeleOptimise(YOLO(chemin, task=task), model_path, task, backend=backend or "torch")
+            print(f"Modèle de {task} chargé avec succès.")
+        except Exception as e:
+            print(f"Erreur lors du chargement du modèle de {task} : {e}")
+            return None
+        
+        if optimiser and backend is None:
+            model.optimiser_en_fond()
+        _registre_modeles[cle] = model
+        return model
+
+# Renommé et adapté pour accepter le modèle en paramètre
+def executer_inference_frame(model, frame):
+    """
+    Exécute la détection (pose ou detect) sur une seule frame.
+    
+    Args:
+        model (YOLO): Le modèle de détection chargé.
+        frame (np.ndarray): La frame à analyser.
+        
+    Returns:
+        list: La liste des objets Result d'Ultralytics.
+    """
+    if model is None:
+        return []
+        
+    # 'stream=False' pour une seule frame est plus direct.
+    # Utilisation d'un seuil de confiance par défaut de 0.5
+    with metriques.chronometre(f"yolo_{getattr(model, 'task', 'modele')}"):
+        results = model(frame, stream=False, conf=0.5, save=False, verbose=False)
+    return results
+
+def executer_inference_batch(model, frames, device=None):
+    """
+    Exécute la détection (pose ou detect) sur plusieurs frames en UN SEUL appel au modèle.
+    
+    Args:
+        model (YOLO): Le modèle de détection chargé.
+        frames (list[np.ndarray]): Les frames à analyser (peuvent venir de flux différents).
+        device (str): Périphérique d'inférence ('cpu', '0'...). None = choix d'Ultralytics.
+        
+    Returns:
+        list: Un objet Result d'Ultralytics par frame, dans le même ordre que `frames`.
+    """
+    if model is None or not frames:
+        return []
+    
+    options = dict(stream=False, conf=0.5, save=False, verbose=False)
+    if device is not None:
+        options["device"] = device
+    with metriques.chronometre(f"yolo_{getattr(model, 'task', 'modele')}_batch"):
+        return model(list(frames), **options)
+
+
+def executer_inference_tuilee(model, frame, tuilage, device=None):
+    """
+    Exécute le modèle sur les tuiles de la frame (voir tuilage.Tuilage) en UN SEUL batch,
+    puis refusionne boîtes et keypoints dans le repère de la frame (NMS inter-tuiles).
+    
+    Les élèves du fond, minuscules une fois toute la frame réduite à la taille d'entrée du
+    modèle, sont ainsi analysés à la résolution native de la caméra sur les seules tuiles fines.
+    
+    Args:
+        model (YOLO): Le modèle de détection chargé.
+        frame (np.ndarray): La frame à analyser.
+        tuilage (Tuilage): Plan de découpage et paramètres de fusion.
+        device (str): Périphérique d'inférence. None = choix d'Ultralytics.
+        
+    Returns:
+        list: Un seul objet Result d'Ultralytics, comme executer_inference_frame.
+    """
+    if model is None:
+        return []
+    
+    results = executer_inference_batch(model, tuilage.decouper(frame), device=device)
+    detections = []
+    for result in results:
+        # Un transfert pour les boîtes (boxes.data), un pour les keypoints
+        boites, scores, classes = extraire_boites([result])
+        keypoints = extraire_keypoints([result]) if result.keypoints is not None else None
+        detections.append((boites, scores, classes, keypoints))
+    
+    with metriques.chronometre("fusion_tuiles"):
+        boites, scores, classes, keypoints = tuilage.fusionner(frame, detections)
+    return [_resultat_fusionne(results[0], frame, boites, scores, classes, keypoints)]
+
+
+def _resultat_fusionne(reference, frame, boites, scores, classes, keypoints):
+    """Construit un Result Ultralytics (boîtes + keypoints) pour la frame entière."""
+    import torch
+    from ultralytics.engine.results import Results
+    
+    donnees_boites = np.concatenate([boites, scores[:, np.newaxis], classes[:, np.newaxis]], axis=1)
+    return Results(
+        frame, path=reference.path, names=reference.names,
+        boxes=torch.from_numpy(np.ascontiguousarray(donnees_boites, dtype=np.float32)),
+        keypoints=torch.from_numpy(np.ascontiguousarray(keypoints, dtype=np.float32)) if keypoints is not None else None,
+    )
+
+
+class InferenceMultiFlux:
+    """
+    Inférence groupée sur plusieurs flux (caméras ou fichiers vidéo).
+    
+    Chaque source est lue par son propre thread. Une caméra ne garde que sa frame la plus
+    récente (les frames non traitées à temps sont perdues) ; un fichier vidéo, lu plus
+    vite que l'inférence, attend au contraire que sa frame soit prise avant de lire la
+    suivante : aucune frame n'est perdue. Le thread d'inférence forme un batch dès que `taille_batch_max` frames
+    sont prêtes ou que la plus ancienne attend depuis `attente_max` secondes, exécute
+    le modèle une seule fois sur le batch, puis renvoie chaque Result à son flux via
+    `callback(flux_id, frame_id, frame, result)`.
+    
+    Args:
+        model (YOLO): Le modèle chargé (pose ou detect).
+        sources (list): Index de webcams et/ou chemins de fichiers vidéo.
+        callback (callable): Appelée pour chaque résultat, dans le thread d'inférence.
+        taille_batch_max (int): Nombre maximal de frames par appel au modèle.
+        attente_max (float): Délai maximal (s) avant d'envoyer un batch incomplet.
+        device (str): Périphérique d'inférence, 'cpu' par défaut.
+        sans_perte (list): Pour chaque source, True pour ne perdre aucune frame (lecture
+            bloquante). Par défaut : True pour les fichiers vidéo, False pour les caméras et flux réseau.
+    """
+    
+    def __init__(self, model, sources, callback, taille_batch_max=8, attente_max=0.03, device="cpu", sans_perte=None):
+        self.model = model
+        self.sources = list(sources)
+        if sans_perte is None:
+            sans_perte = [isinstance(source, str) and os.path.isfile(source) for source in self.sources]
+        self.sans_perte = list(sans_perte)
+        self.callback = callback
+        self.taille_batch_max = max(1, int(taille_batch_max))
+        self.attente_max = attente_max
+        self.device = device
+        
+        self._condition = threading.Condition()
+        self._en_attente = {} # flux_id -> (frame_id, instant_arrivee, frame)
+        self._flux_actifs = 0
+        self._arret = threading.Event()
+        self._threads = []
+        
+        # Statistiques
+        self.nb_batchs = 0
+        self.nb_frames_inferees = 0
+        self.nb_frames_perdues = 0
+    
+    def _boucle_lecture(self, flux_id, source):
+        cap = cv2.VideoCapture(source)
+        if not cap.isOpened():
+            print(f"Erreur : Impossible d'ouvrir la source {source}.")
+        frame_id = 0
+        while cap.isOpened() and not self._arret.is_set():
+            success, frame = cap.read()
+            if not success:
+                break
+            with self._condition:
+                if self.sans_perte[flux_id]:
+                    # Fichier vidéo : attendre que la frame précédente ait été prise par un batch
+                    while flux_id in self._en_attente and not self._arret.is_set():
+                        self._condition.wait(timeout=0.1)
+                    if self._arret.is_set():
+                        break
+                if flux_id in self._en_attente:
+                    # L'ancienne frame de ce flux n'a pas encore été traitée : on la remplace
+                    self.nb_frames_perdues += 1
+                    instant = self._en_attente[flux_id][1]
+                else:
+                    instant = time.perf_counter()
+                self._en_attente[flux_id] = (frame_id, instant, frame)
+                # Tous les threads attendent sur la même condition : les réveiller tous
+                self._condition.notify_all()
+            frame_id += 1
+        cap.release()
+        with self._condition:
+            self._flux_actifs -= 1
+            self._condition.notify_all()
+    
+    def _prendre_batch(self):
+        """
+        Attend qu'un batch soit prêt (plein ou délai écoulé) et le retire des frames en attente.
+        
+        Chaque flux n'a au plus qu'une frame en attente : un batch est donc plein dès que
+        chaque flux actif en a une, même si taille_batch_max est plus grand.
+        """
+        with self._condition:
+            while not self._en_attente:
+                if self._arret.is_set() or self._flux_actifs == 0:
+                    return []
+                self._condition.wait(timeout=0.1)
+            
+            plus_ancienne = min(instant for _, instant, _ in self._en_attente.values())
+            while len(self._en_attente) < min(self.taille_batch_max, self._flux_actifs) and not self._arret.is_set():
+                restant = self.attente_max - (time.perf_counter() - plus_ancienne)
+                if restant <= 0 or self._flux_actifs == 0:
+                    break
+                self._condition.wait(timeout=restant)
+            
+            # Les frames les plus anciennes passent en premier
+            ordre = sorted(self._en_attente.items(), key=lambda item: item[1][1])
+            batch = ordre[:self.taille_batch_max]
+            for flux_id, _ in batch:
+                del self._en_attente[flux_id]
+            # Les lecteurs de fichiers attendent que leur frame soit prise
+            self._condition.notify_all()
+            return batch
+    
+    def demarrer(self):
+        self._flux_actifs = len(self.sources)
+        for flux_id, source in enumerate(self.sources):
+            thread = threading.Thread(
+                target=self._boucle_lecture, args=(flux_id, source), name=f"flux-{flux_id}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+    
+    def executer(self):
+        """Boucle d'inférence groupée (bloquante) jusqu'à la fin de tous les flux ou arreter()."""
+        if not self._threads:
+            self.demarrer()
+        
+        while not self._arret.is_set():
+            batch = self._prendre_batch()
+            if not batch:
+                if self._flux_actifs == 0:
+                    break
+                continue
+            
+            frames = [frame for _, (_, _, frame) in batch]
+            results = executer_inference_batch(self.model, frames, device=self.device)
+            self.nb_batchs += 1
+            self.nb_frames_inferees += len(frames)
+            
+            for (flux_id, (frame_id, _, frame)), result in zip(batch, results):
+                self.callback(flux_id, frame_id, frame, result)
+    
+    def arreter(self):
+        self._arret.set()
+        with self._condition:
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+
+
+if __name__ == "__main__":
     print("test1.py est maintenant un module d'utilitaires pour le chargement et l'inférence YOLO.")
\ No newline at end of file
@@ -0,0 +1,96 @@
+# test_comportement.py (Tests des transitions de comportement.AnalyseComportements et de l'écrivain d'événements)
+
+import json
+
+import numpy as np
+
+from comportement import DUREES_MIN_DEBUT, AnalyseComportements, EcrivainEvenements
+from resultats_frame import ResultatsFrame
+
+FPS = 25
+PISTE = 7
+
+
+def frame_eleve(main_levee=False, debout=False):
+    """ResultatsFrame d'un seul élève suivi, assis ou debout, main levée ou non."""
+    keypoints = np.zeros((1, 17, 3), dtype=np.float32)
+    keypoints[..., 2] = 0.9
+    keypoints[0, [5, 6], 1] = 200 # épaules
+    keypoints[0, [9, 10], 1] = 250 # poignets
+    keypoints[0, [11, 12], 1] = 300 # hanches
+    keypoints[0, [13, 14], 1] = 400 if debout else 330 # genoux
+    if main_levee:
+        keypoints[0, 9, 1] = 100
+    return ResultatsFrame(np.zeros((1, 4), dtype=np.float32), keypoints=keypoints, ids_pistes=np.array([PISTE]))
+
+
+def analyser(sequence, analyse=None):
+    """Passe une séquence de (main_levee, debout) à 25 fps ; retourne l'analyse et les événements."""
+    analyse = analyse or AnalyseComportements()
+    evenements = []
+    for index_frame, (main_levee, debout) in enumerate(sequence):
+        evenements += analyse.mettre_a_jour(frame_eleve(main_levee, debout), index_frame / FPS, index_frame)
+    return analyse, evenements
+
+
+def test_faux_positifs_isoles_ignores():
+    # Une frame main levée sur dix : la part de la fenêtre n'atteint jamais seuil_haut
+    _, evenements = analyser([(k % 10 == 0, False) for k in range(200)])
+    assert evenements == []
+
+
+def test_main_levee_debut_et_fin():
+    sequence = [(False, False)] * 25 + [(True, False)] * 75 + [(False, False)] * 50
+    analyse, evenements = analyser(sequence)
+    assert [e["evenement"] for e in evenements] == ["main_levee_debut", "main_levee_fin"]
+    debut, fin = evenements
+    # L'instant de l'événement est celui où la condition d'hystérésis a commencé
+    assert 1.0 < debut["t"] < 1.5
+    # ... et il n'est émis qu'une fois la durée minimale tenue
+    assert debut["frame"] >= (debut["t"] + DUREES_MIN_DEBUT["main_levee"]) * FPS
+    assert 2.9 < fin["duree"] < 3.1
+    assert analyse.agregats[PISTE].nb_mains_levees == 1
+    assert not analyse.etat(PISTE)["main_levee"]
+
+
+def test_bascule_plus_courte_que_duree_min_ignoree():
+    # Debout pendant 0.6 s : l'hystérésis bascule, mais la durée minimale (1 s) n'est pas tenue
+    sequence = [(False, False)] * 25 + [(False, True)] * 15 + [(False, False)] * 50
+    _, evenements = analyser(sequence)
+    assert evenements == []
+
+
+def test_bref_relachement_ne_coupe_pas_la_main_levee():
+    # Trois frames main baissée au milieu d'une main levée : pas de fin intermédiaire
+    sequence = [(True, False)] * 50 + [(False, False)] * 3 + [(True, False)] * 50 + [(False, False)] * 50
+    _, evenements = analyser(sequence)
+    assert [e["evenement"] for e in evenements] == ["main_levee_debut", "main_levee_fin"]
+
+
+def test_disparition_clot_les_etats_ouverts():
+    analyse, evenements = analyser([(True, True)] * 75)
+    assert sorted(e["evenement"] for e in evenements) == ["leve", "main_levee_debut"]
+    fins = analyse.mettre_a_jour(ResultatsFrame(), 75 / FPS + analyse.delai_disparition + 0.1, 200)
+    assert sorted(e["evenement"] for e in fins) == ["assis", "main_levee_fin"]
+    assert all(e["raison"] == "disparition" for e in fins)
+    assert analyse.etat(PISTE) == {"main_levee": False, "debout": False}
+
+
+def test_ecrivain_jsonl(tmp_path):
+    chemin = str(tmp_path / "evenements.jsonl")
+    ecrivain = EcrivainEvenements(chemin, periode=0.05)
+    analyse, evenements = analyser([(False, False)] * 25 + [(True, False)] * 75 + [(False, False)] * 50,
+                                   AnalyseComportements(ecrivain))
+    ecrivain.fermer()
+    with open(chemin, encoding="utf-8") as fichier:
+        assert [json.loads(ligne) for ligne in fichier] == evenements
+    assert ecrivain.nb_perdus == 0
+
+
+def test_ecrivain_chemin_invalide_ne_bloque_pas(tmp_path):
+    ecrivain = EcrivainEvenements(str(tmp_path / "absent" / "evenements.jsonl"), taille_file=5)
+    assert not ecrivain.actif
+    for k in range(20):
+        ecrivain.ecrire({"t": k})
+    ecrivain.fermer(timeout=1.0)
+    assert ecrivain.nb_perdus == 20
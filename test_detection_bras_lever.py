@@ -0,0 +1,94 @@
+# test_detection_bras_lever.py (analyser_postures_batch comparé aux règles scalaires d'origine)
+
+import numpy as np
+import pytest
+
+from detection_bras_lever import (
+    KEYPOINT_INDEX, analyser_postures_batch, est_bras_leve, est_debout, get_keypoints_coordinates,
+)
+
+
+def bras_leve_scalaire(keypoints, bras, seuil_y, seuil_confiance):
+    """Règle d'origine de est_bras_leve : coordonnées int() de get_keypoints_coordinates."""
+    if bras == "droit":
+        épaule_index, poignet_index = KEYPOINT_INDEX["épaule_droite"], KEYPOINT_INDEX["poignet_droit"]
+    else:
+        épaule_index, poignet_index = KEYPOINT_INDEX["épaule_gauche"], KEYPOINT_INDEX["poignet_gauche"]
+    épaule = get_keypoints_coordinates(keypoints, épaule_index)
+    poignet = get_keypoints_coordinates(keypoints, poignet_index)
+    if épaule[2] < seuil_confiance or poignet[2] < seuil_confiance:
+        return False
+    return poignet[1] < épaule[1] - seuil_y
+
+
+def debout_scalaire(keypoints, seuil_ratio, seuil_confiance):
+    """Règle d'origine de est_debout (ratio Hanche->Genou / Épaule->Hanche)."""
+    noms = ["épaule_gauche", "épaule_droite", "hanche_gauche", "hanche_droite", "genou_gauche", "genou_droite"]
+    points = [get_keypoints_coordinates(keypoints, KEYPOINT_INDEX[nom]) for nom in noms]
+    if any(point[2] < seuil_confiance for point in points):
+        return False
+    épaule_y = (points[0][1] + points[1][1]) / 2
+    hanche_y = (points[2][1] + points[3][1]) / 2
+    genou_y = (points[4][1] + points[5][1]) / 2
+    dist_tronc = hanche_y - épaule_y
+    dist_haut_jambe = genou_y - hanche_y
+    if dist_tronc <= 0 or dist_haut_jambe <= 0:
+        return False
+    return dist_haut_jambe / dist_tronc > seuil_ratio
+
+
+def keypoints_aleatoires(nb_personnes, graine):
+    """
+    Keypoints (P, 17, 3) float32 proches des cas limites : y sur une petite plage avec des
+    parties fractionnaires (troncature, égalités après troncature, y négatifs) et
+    confiances réparties autour du seuil, dont exactement 0.7.
+    """
+    rng = np.random.default_rng(graine)
+    keypoints = np.empty((nb_personnes, 17, 3), dtype=np.float32)
+    keypoints[..., 0] = rng.uniform(0, 640, (nb_personnes, 17))
+    keypoints[..., 1] = rng.integers(-5, 15, (nb_personnes, 17)) + rng.choice([0.0, 0.2, 0.5, 0.99], (nb_personnes, 17))
+    # Hanches et genoux en général sous les épaules, pour que les deux postures apparaissent
+    keypoints[:, [11, 12], 1] += 12
+    keypoints[:, [13, 14], 1] += rng.choice([12, 20], (nb_personnes, 1))
+    keypoints[..., 2] = rng.choice([0.0, 0.3, 0.69, 0.7, 0.71, 0.95], (nb_personnes, 17), p=[0.04, 0.04, 0.04, 0.04, 0.04, 0.8])
+    return keypoints
+
+
+@pytest.mark.parametrize("graine", range(5))
+@pytest.mark.parametrize("seuil_y, seuil_ratio, seuil_confiance", [(0, 0.5, 0.7), (10, 0.3, 0.5), (2.5, 1.0, 0.71)])
+def test_batch_identique_aux_regles_scalaires(graine, seuil_y, seuil_ratio, seuil_confiance):
+    keypoints = keypoints_aleatoires(200, graine)
+
+    bras_gauche, bras_droit, debout = analyser_postures_batch(
+        keypoints, seuil_y=seuil_y, seuil_ratio=seuil_ratio, seuil_confiance=seuil_confiance
+    )
+
+    for personne, kp in enumerate(keypoints):
+        assert bras_gauche[personne] == bras_leve_scalaire(kp, "gauche", seuil_y, seuil_confiance)
+        assert bras_droit[personne] == bras_leve_scalaire(kp, "droit", seuil_y, seuil_confiance)
+        assert debout[personne] == debout_scalaire(kp, seuil_ratio, seuil_confiance)
+        assert est_bras_leve(kp, "gauche", seuil_y, seuil_confiance) == bras_gauche[personne]
+        assert est_debout(kp, seuil_ratio, seuil_confiance) == debout[personne]
+
+
+def test_cas_limites_explicites():
+    keypoints = np.zeros((3, 17, 3), dtype=np.float32)
+    keypoints[..., 2] = 0.9
+    keypoints[:, KEYPOINT_INDEX["épaule_gauche"], 1] = 200.9
+    # Poignet à 190.2 : 190 < 200 - 10 est faux après troncature
+    keypoints[0, KEYPOINT_INDEX["poignet_gauche"], 1] = 190.2
+    # Poignet à 189.9 : 189 < 190, levé
+    keypoints[1, KEYPOINT_INDEX["poignet_gauche"], 1] = 189.9
+    # Levé mais épaule sous le seuil de confiance
+    keypoints[2, KEYPOINT_INDEX["poignet_gauche"], 1] = 100.0
+    keypoints[2, KEYPOINT_INDEX["épaule_gauche"], 2] = 0.69
+
+    bras_gauche, _, _ = analyser_postures_batch(keypoints, seuil_y=10, seuil_confiance=0.7)
+
+    assert bras_gauche.tolist() == [False, True, False]
+    assert bras_gauche.tolist() == [bras_leve_scalaire(kp, "gauche", 10, 0.7) for kp in keypoints]
+
+
+def test_aucune_personne():
+    bras_gauche, bras_droit, debout = analyser_postures_batch(np.empty((0, 17, 3), dtype=np.float32))
+    assert bras_gauche.shape == bras_droit.shape == debout.shape == (0,)
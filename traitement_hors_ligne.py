@@ -0,0 +1,298 @@
+# traitement_hors_ligne.py (Analyse de vidéos enregistrées, sans affichage, en parallèle)
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+import test1
+import reconnaissance_faciale
+import identification_embeddings
+from detection_bras_lever import analyser_postures_batch
+from resultats_frame import ResultatsFrame, extraire_boites
+from enregistrement import EnregistreurResultats, fusionner_enregistrements, supprimer_enregistrement
+
+# --- Modèles propres à chaque processus worker (chargés une seule fois par _initialiser_worker) ---
+_modeles = {}
+
+
+def _initialiser_worker(config):
+    """Charge les modèles une fois par processus ; évite la sur-souscription des threads."""
+    cv2.setNumThreads(1)
+    try:
+        import torch
+        torch.set_num_threads(config.get("threads_par_worker", 1))
+    except ImportError:
+        pass
+
+    # Le backend a déjà été choisi par le processus principal (choisir_backend) : pas de mesure par worker
+    backend = config.get("backend")
+    _modeles["pose"] = test1.charger_modele(config["pose"], task="pose", optimiser=False, backend=backend)
+    _modeles["detect"] = None
+    if config.get("detect"):
+        _modeles["detect"] = test1.charger_modele(config["detect"], task="detect", optimiser=False, backend=backend)
+    _modeles["cascade"] = None
+    _modeles["backend_visages"] = None
+    if config.get("base_visages"):
+        cascade = reconnaissance_faciale.charger_haarcascade(reconnaissance_faciale.HAAR_CASCADE_PATH)
+        if cascade is not None:
+            # Le cache a été préparé par traiter_videos : chaque worker ne fait que le relire
+            _modeles["backend_visages"] = identification_embeddings.preparer_backend(
+                config["base_visages"], config.get("identification"),
+                dossier_store=config.get("store_visages"), entrainer=False
+            )
+            if _modeles["backend_visages"] is not None:
+                _modeles["cascade"] = cascade
+    _modeles["taille_batch"] = config.get("taille_batch", 8)
+
+
+def _resultats_frame(frame, result_pose, result_detect):
+    """Regroupe les sorties des modèles et l'identification des visages d'une frame dans un ResultatsFrame."""
+    resultats = ResultatsFrame.depuis_results([result_pose] if result_pose is not None else [])
+    if result_detect is not None:
+        resultats.definir_objets(*extraire_boites([result_detect]))
+    if _modeles.get("cascade") is not None:
+        resultats.definir_visages(
+            *reconnaissance_faciale.detecter_et_identifier_visages_tableaux(
+                frame, _modeles["cascade"], backend=_modeles["backend_visages"]
+            )
+        )
+    return resultats
+
+
+def _resultat_frame(video, index_frame, fps, resultats):
+    """Construit l'enregistrement JSON d'une frame (boîtes, keypoints, postures, identités)."""
+    enregistrement = {"video": video, "frame": index_frame, "t": round(index_frame / fps, 3)}
+
+    bras_gauche, bras_droit, debout = analyser_postures_batch(resultats.keypoints, seuil_y=10)
+
+    # Conversion groupée en types Python (un tolist par tableau)
+    boites = np.round(resultats.boites.astype(np.float64), 1).tolist()
+    keypoints = np.round(resultats.keypoints.astype(np.float64), 2).tolist()
+    enregistrement["personnes"] = [
+        {
+            "boite": boites[i],
+            "keypoints": keypoints[i],
+            "bras_gauche": bool(bras_gauche[i]),
+            "bras_droit": bool(bras_droit[i]),
+            "debout": bool(debout[i]),
+        }
+        for i in range(resultats.keypoints.shape[0])
+    ]
+
+    enregistrement["detections"] = [
+        {"boite": boite, "classe": classe, "score": score}
+        for boite, classe, score in zip(
+            np.round(resultats.objets_boites.astype(np.float64), 1).tolist(),
+            resultats.objets_classes.tolist(),
+            np.round(resultats.objets_scores.astype(np.float64), 3).tolist(),
+        )
+    ]
+
+    enregistrement["visages"] = [
+        {"boite": boite, "nom": resultats.nom_visage(k), "conf": conf}
+        for k, (boite, conf) in enumerate(zip(
+            resultats.visages_boites.tolist(),
+            np.round(resultats.visages_confiances.astype(np.float64), 2).tolist(),
+        ))
+    ]
+    return enregistrement
+
+
+def _traiter_lot(video, fps, lot, fichier, enregistreur=None):
+    """Inférence groupée d'un lot de (index_frame, frame), écrite en JSONL (et dans l'enregistrement binaire)."""
+    frames = [frame for _, frame in lot]
+    results_pose = test1.executer_inference_batch(_modeles["pose"], frames)
+    results_detect = test1.executer_inference_batch(_modeles["detect"], frames) if _modeles["detect"] else [None] * len(frames)
+    for (index_frame, frame), result_pose, result_detect in zip(lot, results_pose, results_detect):
+        resultats = _resultats_frame(frame, result_pose, result_detect)
+        enregistrement = _resultat_frame(video, index_frame, fps, resultats)
+        fichier.write(json.dumps(enregistrement, ensure_ascii=False) + "\n")
+        if enregistreur is not None:
+            enregistreur.ecrire(resultats, index_frame, index_frame / fps)
+
+
+def traiter_segment(video, debut, fin, pas, chemin_sortie, chemin_enregistrement=None):
+    """
+    Traite les frames [debut, fin) d'une vidéo (une frame sur `pas`) et écrit les résultats.
+    Avec fin=None, la lecture continue jusqu'à la fin de la vidéo.
+
+    Les frames ignorées sont seulement "grab" (pas de décodage). Exécuté dans un worker.
+    Si `chemin_enregistrement` est donné, les résultats sont aussi écrits au format binaire
+    d'enregistrement.py (pour le rejeu et le réglage des seuils).
+
+    Returns:
+        tuple: (chemin_sortie, nombre de frames analysées)
+    """
+    cap = cv2.VideoCapture(video)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    cap.set(cv2.CAP_PROP_POS_FRAMES, debut)
+
+    nb_analysees = 0
+    lot = []
+    taille_frame = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    enregistreur = None
+    if chemin_enregistrement:
+        enregistreur = EnregistreurResultats(chemin_enregistrement, source=video, fps=fps, taille_frame=taille_frame)
+    with open(chemin_sortie, "w", encoding="utf-8") as fichier:
+        for index_frame in (itertools.count(debut) if fin is None else range(debut, fin)):
+            if (index_frame - debut) % pas:
+                if not cap.grab():
+                    break
+                continue
+            success, frame = cap.read()
+            if not success:
+                break
+            lot.append((index_frame, frame))
+            if len(lot) >= _modeles["taille_batch"]:
+                _traiter_lot(video, fps, lot, fichier, enregistreur)
+                nb_analysees += len(lot)
+                lot = []
+        if lot:
+            _traiter_lot(video, fps, lot, fichier, enregistreur)
+            nb_analysees += len(lot)
+
+    cap.release()
+    if enregistreur is not None:
+        enregistreur.fermer()
+    return chemin_sortie, nb_analysees
+
+
+def decouper_video(video, duree_segment, pas):
+    """
+    Découpe une vidéo en segments de `duree_segment` secondes, alignés sur le pas d'échantillonnage.
+
+    Le nombre de frames annoncé par le conteneur (CAP_PROP_FRAME_COUNT) n'est qu'une
+    estimation : le dernier segment (fin None) est lu jusqu'à la fin réelle de la vidéo.
+    Si ce nombre est inconnu, toute la vidéo forme un seul segment.
+    """
+    cap = cv2.VideoCapture(video)
+    if not cap.isOpened():
+        print(f"Erreur : Impossible d'ouvrir la vidéo {video}.")
+        return []
+    nb_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    cap.release()
+
+    if nb_frames <= 0:
+        print(f"Attention : nombre de frames inconnu pour {video}, traitement en un seul segment.")
+        return [(0, None)]
+    taille = max(pas, int(round(duree_segment * fps / pas)) * pas)
+    segments = [(debut, debut + taille) for debut in range(0, nb_frames, taille)]
+    segments[-1] = (segments[-1][0], None)
+    return segments
+
+
+def choisir_backend(model_path, task="pose"):
+    """Exporte si besoin et chronomètre les backends disponibles, puis retourne le plus rapide."""
+    model = test1.charger_modele(model_path, task=task)
+    if model is None:
+        return "torch"
+    model.attendre_optimisation()
+    return model.backend
+
+
+def traiter_videos(videos, dossier_sortie, config, duree_segment=60.0, pas=1, nb_workers=None, enregistrer=False):
+    """
+    Analyse des vidéos enregistrées sur un pool de processus, sans affichage.
+
+    Chaque vidéo est découpée en segments traités indépendamment ; les résultats de
+    chaque segment sont ensuite concaténés dans l'ordre en un fichier JSONL par vidéo
+    (une ligne par frame analysée). Avec `enregistrer`, un enregistrement binaire .kpr
+    par vidéo est aussi produit (voir enregistrement.py).
+    """
+    os.makedirs(dossier_sortie, exist_ok=True)
+    nb_workers = nb_workers or os.cpu_count() or 1
+
+    # Entraînement (ou mise à jour) du modèle facial une seule fois, avant le pool :
+    # les workers relisent ensuite le même cache sans jamais l'écrire
+    if config.get("base_visages") and identification_embeddings.preparer_backend(
+        config["base_visages"], config.get("identification"), dossier_store=config.get("store_visages")
+    ) is None:
+        config = dict(config, base_visages=None)
+
+    taches = []
+    for video in videos:
+        base = os.path.splitext(os.path.basename(video))[0]
+        for k, (debut, fin) in enumerate(decouper_video(video, duree_segment, pas)):
+            chemin = os.path.join(dossier_sortie, f"{base}.part{k:05d}")
+            taches.append((video, debut, fin, chemin + ".jsonl", chemin + ".kpr" if enregistrer else None))
+    print(f"{len(videos)} vidéo(s), {len(taches)} segment(s), {nb_workers} worker(s).")
+
+    debut_traitement = time.time()
+    nb_total = 0
+    # "spawn" : pas de fork d'un processus qui a déjà importé torch et lancé des threads
+    # (OpenMP, optimisation du backend), ce qui peut bloquer les workers
+    with ProcessPoolExecutor(
+        max_workers=nb_workers, mp_context=multiprocessing.get_context("spawn"),
+        initializer=_initialiser_worker, initargs=(config,)
+    ) as pool:
+        futures = [
+            pool.submit(traiter_segment, video, debut, fin, pas, chemin, chemin_enregistrement)
+            for video, debut, fin, chemin, chemin_enregistrement in taches
+        ]
+        for future in as_completed(futures):
+            chemin, nb_analysees = future.result()
+            nb_total += nb_analysees
+            duree = time.time() - debut_traitement
+            print(f"Segment terminé : {os.path.basename(chemin)} ({nb_total} frames, {nb_total / duree:.1f} frames/s)")
+
+    # Concaténation des segments dans l'ordre, un fichier par vidéo
+    for video in videos:
+        base = os.path.splitext(os.path.basename(video))[0]
+        parties = [chemin for v, _, _, chemin, _ in taches if v == video]
+        with open(os.path.join(dossier_sortie, f"{base}.jsonl"), "w", encoding="utf-8") as sortie:
+            for chemin in parties:
+                with open(chemin, encoding="utf-8") as partie:
+                    sortie.write(partie.read())
+                os.remove(chemin)
+        if enregistrer:
+            parties = [chemin for v, _, _, _, chemin in taches if v == video]
+            fusionner_enregistrements(parties, os.path.join(dossier_sortie, f"{base}.kpr"), source=video)
+            for chemin in parties:
+                supprimer_enregistrement(chemin)
+
+    print(f"Traitement terminé : {nb_total} frames en {time.time() - debut_traitement:.1f} s.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyse hors ligne (sans affichage) de vidéos de cours.")
+    parser.add_argument("videos", nargs="+", help="Fichiers vidéo à analyser.")
+    parser.add_argument("--sortie", default="resultats", help="Dossier des fichiers JSONL de résultats.")
+    parser.add_argument("--pose", default="yolo11m-pose.pt", help="Modèle YOLO de pose.")
+    parser.add_argument("--detect", default=None, help="Modèle YOLO de détection (optionnel).")
+    parser.add_argument("--base-visages", default=None, help="Dossier de la base de visages (active l'identification).")
+    parser.add_argument("--store-visages", default=reconnaissance_faciale.DOSSIER_STORE_VISAGES,
+                        help="Dossier du store des visages recadrés ('' : entraînement sur les photos entières).")
+    parser.add_argument("--identification", default=identification_embeddings.BACKEND_IDENTIFICATION,
+                        choices=sorted(identification_embeddings.BACKENDS), help="Méthode d'identification des visages.")
+    parser.add_argument("--duree-segment", type=float, default=60.0, help="Durée d'un segment en secondes.")
+    parser.add_argument("--pas", type=int, default=1, help="N'analyser qu'une frame sur N.")
+    parser.add_argument("--workers", type=int, default=None, help="Nombre de processus (défaut : nombre de cœurs).")
+    parser.add_argument("--taille-batch", type=int, default=8, help="Frames par appel au modèle.")
+    parser.add_argument("--backend", default="auto", help="Backend d'inférence (auto, torch, onnx, openvino, onnx-int8...).")
+    parser.add_argument("--enregistrer", action="store_true", help="Écrit aussi un enregistrement binaire .kpr par vidéo (rejeu : enregistrement.py).")
+    args = parser.parse_args()
+
+    config = {
+        "pose": args.pose,
+        "detect": args.detect,
+        "base_visages": args.base_visages,
+        "store_visages": args.store_visages,
+        "identification": args.identification,
+        "taille_batch": args.taille_batch,
+        "backend": choisir_backend(args.pose) if args.backend == "auto" else args.backend,
+    }
+    traiter_videos(
+        args.videos, args.sortie, config, args.duree_segment, max(1, args.pas), args.workers, args.enregistrer
+    )
+
+
+if __name__ == "__main__":
+    main()
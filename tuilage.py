@@ -0,0 +1,177 @@
+# tuilage.py (Inférence par tuiles recouvrantes pour les caméras grand angle)
+
+import math
+
+import numpy as np
+
+
+def _positions(longueur, taille, recouvrement):
+    """Débuts des segments de `taille` couvrant [0, longueur] avec au moins `recouvrement` de chevauchement."""
+    if taille >= longueur:
+        return np.zeros(1, dtype=np.int64)
+    nb = math.ceil((longueur - taille) / (taille * (1.0 - recouvrement))) + 1
+    return np.round(np.linspace(0, longueur - taille, nb)).astype(np.int64)
+
+
+def decouper_tuiles(largeur, hauteur, grille=(1, 1), recouvrement=0.2, zone_lointaine=0.4, taille_lointaine=640):
+    """
+    Calcule les tuiles (x1, y1, x2, y2) à envoyer au modèle pour une frame de taille donnée.
+
+    - Tuiles principales : une grille `grille` (colonnes, lignes) de tuiles recouvrantes
+      couvrant toute la frame. (1, 1) = la frame entière, suffisante pour les premiers rangs.
+    - Tuiles fines : le haut de l'image (fond de la salle, part `zone_lointaine` de la hauteur)
+      est redécoupé en tuiles d'au plus `taille_lointaine` pixels, analysées à leur résolution
+      native au lieu d'être réduites avec toute la frame. 0 désactive les tuiles fines.
+
+    Returns:
+        np.ndarray: (T, 4) int64, coordonnées des tuiles dans la frame.
+    """
+    colonnes, lignes = grille
+    taille_x = largeur / (colonnes - (colonnes - 1) * recouvrement)
+    taille_y = hauteur / (lignes - (lignes - 1) * recouvrement)
+    tuiles = [
+        (x, y, min(largeur, x + int(round(taille_x))), min(hauteur, y + int(round(taille_y))))
+        for y in _positions(hauteur, int(round(taille_y)), recouvrement)
+        for x in _positions(largeur, int(round(taille_x)), recouvrement)
+    ]
+
+    if zone_lointaine > 0:
+        hauteur_zone = int(round(hauteur * zone_lointaine))
+        taille = min(taille_lointaine, largeur)
+        for y in _positions(hauteur_zone, min(taille, hauteur_zone), recouvrement):
+            for x in _positions(largeur, taille, recouvrement):
+                tuiles.append((x, y, x + taille, min(hauteur_zone, y + taille)))
+
+    return np.array(tuiles, dtype=np.int64).reshape(-1, 4)
+
+
+def nms_inter_tuiles(boites, scores, seuil_iou=0.5, seuil_inclusion=0.8, indices_tuiles=None):
+    """
+    Suppression des non-maxima entre les détections de toutes les tuiles.
+
+    En plus de l'IoU classique, une boîte issue d'une autre tuile (`indices_tuiles`, tuile
+    d'origine de chaque boîte) est supprimée si elle est contenue à plus de `seuil_inclusion`
+    dans une boîte mieux notée (intersection / aire de la plus petite) : c'est le cas d'une
+    personne coupée par le bord d'une tuile et vue en entier ailleurs. Entre boîtes d'une
+    même tuile, seule l'IoU s'applique : un élève du fond en partie masqué par celui de
+    devant reste détecté. Sans `indices_tuiles`, l'inclusion s'applique à toutes les paires.
+
+    Returns:
+        np.ndarray: Indices des boîtes conservées, par score décroissant.
+    """
+    if len(boites) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    aires = np.maximum(0, boites[:, 2] - boites[:, 0]) * np.maximum(0, boites[:, 3] - boites[:, 1])
+    ordre = np.argsort(-scores, kind="stable")
+    gardees = []
+    while ordre.size:
+        i = ordre[0]
+        gardees.append(i)
+        reste = ordre[1:]
+        largeur = np.clip(np.minimum(boites[i, 2], boites[reste, 2]) - np.maximum(boites[i, 0], boites[reste, 0]), 0, None)
+        hauteur = np.clip(np.minimum(boites[i, 3], boites[reste, 3]) - np.maximum(boites[i, 1], boites[reste, 1]), 0, None)
+        intersection = largeur * hauteur
+        iou = intersection / np.maximum(aires[i] + aires[reste] - intersection, 1e-6)
+        inclusion = intersection / np.maximum(np.minimum(aires[i], aires[reste]), 1e-6)
+        incluse = inclusion > seuil_inclusion
+        if indices_tuiles is not None:
+            incluse &= indices_tuiles[reste] != indices_tuiles[i]
+        ordre = reste[(iou <= seuil_iou) & ~incluse]
+    return np.array(gardees, dtype=np.int64)
+
+
+class Tuilage:
+    """
+    Découpe les frames en tuiles et refusionne les détections (boîtes + keypoints).
+
+    Le plan de tuiles est calculé une fois par taille de frame. Les détections d'une tuile
+    qui touchent un bord intérieur de la tuile (personne coupée) voient leur score de tri
+    multiplié par `penalite_bord`, pour que la version entière vue par une autre tuile
+    l'emporte lors de la NMS.
+
+    Args:
+        grille, recouvrement, zone_lointaine, taille_lointaine: voir decouper_tuiles.
+        seuil_iou, seuil_inclusion: voir nms_inter_tuiles.
+        penalite_bord (float): Facteur appliqué au score de tri des détections coupées.
+    """
+
+    def __init__(self, grille=(1, 1), recouvrement=0.2, zone_lointaine=0.4, taille_lointaine=640,
+                 seuil_iou=0.5, seuil_inclusion=0.8, penalite_bord=0.8):
+        self.grille = grille
+        self.recouvrement = recouvrement
+        self.zone_lointaine = zone_lointaine
+        self.taille_lointaine = taille_lointaine
+        self.seuil_iou = seuil_iou
+        self.seuil_inclusion = seuil_inclusion
+        self.penalite_bord = penalite_bord
+        self._plans = {}
+
+    def tuiles(self, frame):
+        hauteur, largeur = frame.shape[:2]
+        plan = self._plans.get((largeur, hauteur))
+        if plan is None:
+            plan = decouper_tuiles(
+                largeur, hauteur, self.grille, self.recouvrement, self.zone_lointaine, self.taille_lointaine
+            )
+            self._plans[(largeur, hauteur)] = plan
+        return plan
+
+    def decouper(self, frame):
+        """Retourne les vues (sans copie) de chaque tuile de la frame."""
+        return [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in self.tuiles(frame)]
+
+    def fusionner(self, frame, detections):
+        """
+        Ramène les détections de chaque tuile dans le repère de la frame puis applique la NMS.
+
+        Args:
+            frame (np.ndarray): Frame d'origine (pour sa taille).
+            detections (list): Pour chaque tuile, (boites (N, 4), scores (N,), classes (N,),
+                keypoints (N, K, 3) ou None), dans le repère de la tuile.
+
+        Returns:
+            tuple: (boites, scores, classes, keypoints ou None) fusionnés, par score décroissant.
+        """
+        hauteur, largeur = frame.shape[:2]
+        tuiles = self.tuiles(frame)
+        blocs_boites, blocs_scores, blocs_classes, blocs_keypoints, blocs_tri, blocs_tuiles = [], [], [], [], [], []
+
+        for indice_tuile, ((x1, y1, x2, y2), (boites, scores, classes, keypoints)) in enumerate(zip(tuiles, detections)):
+            if len(boites) == 0:
+                continue
+            blocs_tuiles.append(np.full(len(boites), indice_tuile, dtype=np.int64))
+            decalage = np.array([x1, y1, x1, y1], dtype=np.float32)
+            boites = boites.astype(np.float32) + decalage
+            blocs_boites.append(boites)
+            blocs_scores.append(scores.astype(np.float32))
+            blocs_classes.append(classes.astype(np.float32))
+            if keypoints is not None:
+                keypoints = keypoints.astype(np.float32, copy=True)
+                keypoints[..., 0] += x1
+                keypoints[..., 1] += y1
+                blocs_keypoints.append(keypoints)
+
+            # Bords de la tuile situés à l'intérieur de la frame (marge de 2 px)
+            coupee = (
+                ((x1 > 0) & (boites[:, 0] <= x1 + 2)) | ((y1 > 0) & (boites[:, 1] <= y1 + 2))
+                | ((x2 < largeur) & (boites[:, 2] >= x2 - 2)) | ((y2 < hauteur) & (boites[:, 3] >= y2 - 2))
+            )
+            blocs_tri.append(np.where(coupee, scores * self.penalite_bord, scores))
+
+        if not blocs_boites:
+            return (np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.float32),
+                    np.empty(0, dtype=np.float32), None)
+
+        boites = np.concatenate(blocs_boites)
+        scores = np.concatenate(blocs_scores)
+        classes = np.concatenate(blocs_classes)
+        keypoints = np.concatenate(blocs_keypoints) if len(blocs_keypoints) == len(blocs_boites) else None
+
+        # NMS par classe : les boîtes de classes différentes sont décalées pour ne jamais se recouvrir
+        boites_nms = boites + classes[:, np.newaxis] * float(max(largeur, hauteur) + 1)
+        gardees = nms_inter_tuiles(
+            boites_nms, np.concatenate(blocs_tri), self.seuil_iou, self.seuil_inclusion, np.concatenate(blocs_tuiles)
+        )
+        return (boites[gardees], scores[gardees], classes[gardees],
+                keypoints[gardees] if keypoints is not None else None)
@@ -1,199 +1,453 @@
-# vision_bras.py (VERSION FINALE - INTÉGRATION POSE ET FACIALE)
-
-import cv2
-import test1 
-from detection_bras_lever import est_bras_leve 
-from detection_bras_lever import est_debout 
-import reconnaissance_faciale # Importation du nouveau module
-import time
-import numpy as np
-
-# Configuration pour le dessin des keypoints (de l'original)
-KEYPOINT_COLOR = (125,222, 0) # Cyan/Jaune
-KEYPOINT_RADIUS = 5 
-KEYPOINT_THICKNESS = -1 # Rempli
-
-# Configuration pour le dessin des boîtes de détection YOLO (inchangé)
-BOX_COLOR = (0, 255, 255) # Jaune vif
-BOX_THICKNESS = 2
-
-# Configuration pour le dessin des boîtes de visage (NOUVEAU)
-FACE_BOX_COLOR_KNOWN = (0, 255, 0) # Vert pour connu
-FACE_BOX_COLOR_UNKNOWN = (0, 0, 255) # Rouge pour inconnu
-FACE_BOX_THICKNESS = 2
-
-
-def run_pose_estimation_webcam_avec_detection(model_pose_path, model_detect_path):
-    """
-    Exécute la détection de pose, la détection d'objets (YOLO) et la reconnaissance faciale (Haar/LBPH).
-    """
-    
-    # 1. Charger les modèles et la base de données faciale
-    print("\n--- Chargement des modèles ---")
-    model_pose = test1.charger_modele(model_pose_path, task="pose")
-    model_detect = test1.charger_modele(model_detect_path, task="detect") 
-    
-    # Charger le classifieur Haar Cascade
-    haar_cascade = reconnaissance_faciale.charger_haarcascade(
-        reconnaissance_faciale.HAAR_CASCADE_PATH
-    )
-    
-    # Préparer et entraîner le modèle de reconnaissance faciale
-    db_entrainee = reconnaissance_faciale.preparer_base_de_donnees_visages(
-        reconnaissance_faciale.DATABASE_FOLDER
-    )
-    
-    if model_pose is None:
-        print("ERREUR CRITIQUE: Modèle de pose manquant. Arrêt.")
-        return
-    if haar_cascade is None or not db_entrainee:
-        print("ATTENTION: La reconnaissance faciale est désactivée (Haar Cascade ou DB non prêt).")
-
-    # 2. Ouvrir la capture vidéo (Webcam)
-    cap = cv2.VideoCapture(0) 
-
-    if not cap.isOpened():
-        print("Erreur : Impossible d'ouvrir la webcam (index 0).")
-        return
-
-    # Initialisation pour le FPS
-    fps_start_time = time.time()
-    fps_frame_count = 0
-    fps_text = "FPS: N/A"
-
-    # 3. Boucle de traitement des frames
-    print("\nDémarrage de la détection. Appuyez sur 'q' pour quitter.")
-    while cap.isOpened():
-        success, frame = cap.read()
-        
-        if success:
-            annotated_frame = frame.copy() 
-            
-            # --- 1. Reconnaissance Faciale (Haar + LBPH) ---
-            resultats_visages = []
-            if haar_cascade and db_entrainee:
-                resultats_visages = reconnaissance_faciale.detecter_et_identifier_visages(
-                    frame, haar_cascade
-                )
-                
-                for visage in resultats_visages:
-                    x, y, w, h = visage['box']
-                    name = visage['name']
-                    confidence = visage['conf']
-                    
-                    # Déterminer la couleur
-                    color = FACE_BOX_COLOR_KNOWN if name not in ("Inconnu", "Erreur", "Non entraîné") else FACE_BOX_COLOR_UNKNOWN
-                    
-                    # Dessiner la boîte autour du visage
-                    cv2.rectangle(
-                        annotated_frame, (x, y), (x + w, y + h), color, FACE_BOX_THICKNESS
-                    )
-                    
-                    # Afficher le nom et la confiance
-                    label = f"{name} ({confidence:.1f})"
-                    cv2.putText(
-                        annotated_frame, label, 
-                        (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2
-                    )
-            
-            # --- 2. Inférence Modèle de Détection YOLO (Personnes/Objets) ---
-            if model_detect:
-                results_detect = test1.executer_inference_frame(model_detect, frame)
-                
-                for result in results_detect:
-                    for box in result.boxes.xyxy.cpu().numpy():
-                        x1, y1, x2, y2 = map(int, box[:4])
-                        cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), BOX_COLOR, BOX_THICKNESS)
-                        class_id = int(box[5]) if len(box) > 5 else None
-                        label = f"Detect: Class {class_id}" if class_id is not None else "Detect"
-                        cv2.putText(
-                            annotated_frame, label, 
-                            (x1, y1 - 30), cv2.FONT_HERSHEY_SIMPLEX, 0.5, BOX_COLOR, 2
-                        )
-            
-            # --- 3. Inférence du Modèle de Pose (Keypoints et Logique Bras Levé) ---
-            results_pose = test1.executer_inference_frame(model_pose, frame)
-            
-            # 4. Traitement des résultats de Pose
-            text_y_start = 50 
-            person_count = 0
-
-            for result in results_pose:
-                
-                if result.keypoints and result.keypoints.data.shape[0] > 0:
-                    
-                    for i in range(result.keypoints.data.shape[0]):
-                        person_keypoints = result.keypoints.data[i].cpu().numpy() # [17, 3]
-                        
-                        # --- Dessiner les keypoints ---
-                        for j in range(person_keypoints.shape[0]):
-                            x, y, conf = person_keypoints[j]
-                            if conf > 0.5: 
-                                cv2.circle(
-                                    annotated_frame, 
-                                    (int(x), int(y)), 
-                                    KEYPOINT_RADIUS, 
-                                    KEYPOINT_COLOR, 
-                                    KEYPOINT_THICKNESS
-                                )
-                        
-                        # --- Logique de détection de bras ---
-                        bras_droit_leve = est_bras_leve(person_keypoints, bras="droit", seuil_y=10)
-                        bras_gauche_leve = est_bras_leve(person_keypoints, bras="gauche", seuil_y=10)
-                        
-                        # --- Afficher l'état du bras (Texte) ---
-                        message = None
-                        if bras_droit_leve and bras_gauche_leve:
-                            message = "Bras Droit & Gauche Leve!"
-                        elif bras_droit_leve:
-                            message = "Bras Droit Leve!"
-                        elif bras_gauche_leve:
-                            message = "Bras Gauche Leve!"
-                        
-                        if message:
-                            color = (0, 0, 255) # Rouge
-                            cv2.putText(
-                                annotated_frame, f"Pose {i+1}: {message}", 
-                                (50, text_y_start + person_count * 30), 
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2
-                            )
-                            person_count += 1
-            
-            # 5. Calcul et affichage du FPS 
-            fps_frame_count += 1
-            if time.time() - fps_start_time >= 1.0: 
-                fps = fps_frame_count / (time.time() - fps_start_time)
-                fps_text = f"FPS: {fps:.2f}"
-                fps_start_time = time.time()
-                fps_frame_count = 0
-
-            cv2.putText(
-                annotated_frame, fps_text, 
-                (frame.shape[1] - 150, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2
-            )
-
-            # 6. Afficher la frame
-            cv2.imshow("Multi-Model Vision", annotated_frame)
-            
-            # 7. Quitter la boucle
-            if cv2.waitKey(1) & 0xFF == ord("q"):
-                break
-        else:
-            print("Erreur : Frame vide reçue.")
-            break
-
-    # 8. Libérer les ressources
-    cap.release()
-    cv2.destroyAllWindows()
-    print("Programme terminé.")
-
-
-if __name__ == "__main__":
-    # IMPORTANT: Remplacer ceci par le chemin réel de vos modèles YOLO
-    MODEL_POSE_PATH = 'yolo11m-pose.pt' 
-    MODEL_DETECT_PATH = yolov8n.pt' 
-    
-    # Note: Les chemins des fichiers de reconnaissance faciale sont dans 'reconnaissance_faciale.py'
-
-
-    run_pose_estimation_webcam_avec_detection(MODEL_POSE_PATH, MODEL_DETECT_PATH)
+# vision_bras.py (VERSION FINALE - INTÉGRATION POSE ET FACIALE)
+
+import cv2
+import test1 
+from detection_bras_lever import analyser_postures_batch
+import reconnaissance_faciale # Importation du nouveau module
+import suivi
+import metriques
+from porte_mouvement import PorteMouvement
+from resultats_frame import ResultatsFrame, extraire_boites
+from demarrage import Demarrage
+# Les sous-systèmes optionnels (identification_embeddings, tuilage, enregistrement,
+# comportement, places) ne sont importés que par les branches qui les activent
+import rendu
+import time
+import numpy as np
+
+# Configuration pour le dessin des keypoints (de l'original)
+KEYPOINT_COLOR = (125,222, 0) # Cyan/Jaune
+KEYPOINT_RADIUS = 5 # Disques pleins (rendu.dessiner_points)
+
+# Configuration pour le dessin des boîtes de détection YOLO (inchangé)
+BOX_COLOR = (0, 255, 255) # Jaune vif
+BOX_THICKNESS = 2
+
+# Configuration pour le dessin des boîtes de visage (NOUVEAU)
+FACE_BOX_COLOR_KNOWN = (0, 255, 0) # Vert pour connu
+FACE_BOX_COLOR_UNKNOWN = (0, 0, 255) # Rouge pour inconnu
+FACE_BOX_THICKNESS = 2
+
+# Recherche de visages guidée par la pose : Haar ne parcourt que les régions de tête,
+# avec un scan complet de la frame toutes les N frames (ou si la pose ne trouve personne)
+RECHERCHE_VISAGES_GUIDEE = True
+PERIODE_SCAN_COMPLET_VISAGES = 15
+
+# Méthode d'identification des visages (voir identification_embeddings.py) :
+# "lbph" (modèle LBPH d'OpenCV) ou "embeddings" (vecteurs caractéristiques, un seul
+# produit matriciel pour tous les visages d'une frame)
+BACKEND_IDENTIFICATION = "lbph"
+
+# Instrumentation (voir metriques.py) : chronomètres par étape exposés sur
+# http://127.0.0.1:PORT_METRIQUES/metrics, activables à chaud par POST sur /activer et /desactiver.
+# TRACE_METRIQUES : chemin optionnel d'un fichier de trace .csv ou .jsonl.
+# Le serveur n'est démarré (et le port réservé) que si METRIQUES_ACTIVES ou TRACE_METRIQUES.
+METRIQUES_ACTIVES = False
+PORT_METRIQUES = metriques.PORT_PAR_DEFAUT
+TRACE_METRIQUES = None
+
+# Porte de mouvement (voir porte_mouvement.py) : tant que rien ne bouge dans l'image réduite,
+# les résultats de la dernière inférence sont réutilisés (au plus AGE_MAX_REUTILISATION frames).
+# SENSIBILITE_MOUVEMENT : part des pixels d'une tuile qui doit changer pour relancer l'inférence.
+PORTE_MOUVEMENT_ACTIVE = True
+SENSIBILITE_MOUVEMENT = 0.02
+AGE_MAX_REUTILISATION = 30
+
+# Inférence de pose par tuiles (voir tuilage.py) pour les caméras grand angle : la frame entière
+# plus des tuiles à résolution native sur le fond de la salle (part ZONE_LOINTAINE du haut de l'image),
+# envoyées au modèle en un seul batch puis refusionnées.
+INFERENCE_TUILEE = False
+ZONE_LOINTAINE = 0.4
+TAILLE_TUILES_LOINTAINES = 640
+
+# Enregistrement des résultats de chaque frame (voir enregistrement.py) pour régler les seuils
+# de detection_bras_lever par rejeu, sans relancer les modèles. None = pas d'enregistrement.
+ENREGISTREMENT = None
+
+# Analyse temporelle (voir comportement.py) : événements main levée / levé / assis débruités par
+# personne suivie, écrits en tâche de fond dans FICHIER_EVENEMENTS (.jsonl ou .sqlite, None = aucun).
+ANALYSE_COMPORTEMENTS = True
+FICHIER_EVENEMENTS = None
+
+# Plan des places de la caméra (JSON, voir places.py) : chaque personne est affectée à une place,
+# occupation et événements sont comptés par place. None = pas de plan.
+PLAN_PLACES = None
+
+# Affichage : AFFICHAGE_ACTIF = False sur les postes sans écran (ni copie de frame, ni dessin) ;
+# sinon le dessin et l'affichage tournent au plus à FREQUENCE_AFFICHAGE_MAX images/s, l'analyse
+# continuant à sa propre cadence.
+AFFICHAGE_ACTIF = True
+FREQUENCE_AFFICHAGE_MAX = 15
+
+
+def dessiner_visages(annotated_frame, resultats):
+    """Dessine les boîtes et les noms des visages reconnus (Haar + LBPH) d'un ResultatsFrame."""
+    if resultats.visages_boites.shape[0] == 0:
+        return
+    # Boîtes (x, y, w, h) -> (x1, y1, x2, y2), tracées par couleur en un seul appel
+    boites = resultats.visages_boites.astype(np.int32).copy()
+    boites[:, 2:] += boites[:, :2]
+    connus = resultats.visages_identites >= 0
+    rendu.dessiner_boites(annotated_frame, boites[connus], FACE_BOX_COLOR_KNOWN, FACE_BOX_THICKNESS)
+    rendu.dessiner_boites(annotated_frame, boites[~connus], FACE_BOX_COLOR_UNKNOWN, FACE_BOX_THICKNESS)
+    
+    # Afficher le nom et la confiance
+    for k in range(boites.shape[0]):
+        color = FACE_BOX_COLOR_KNOWN if connus[k] else FACE_BOX_COLOR_UNKNOWN
+        label = f"{resultats.nom_visage(k)} ({resultats.visages_confiances[k]:.1f})"
+        cv2.putText(
+            annotated_frame, label, 
+            (int(boites[k, 0]), int(boites[k, 1]) - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2
+        )
+
+
+def dessiner_detections(annotated_frame, resultats):
+    """Dessine les boîtes du modèle de détection YOLO (Personnes/Objets) d'un ResultatsFrame."""
+    boites = resultats.objets_boites.astype(np.int32)
+    rendu.dessiner_boites(annotated_frame, boites, BOX_COLOR, BOX_THICKNESS)
+    for k in range(boites.shape[0]):
+        cv2.putText(
+            annotated_frame, f"Detect: Class {resultats.objets_classes[k]}", 
+            (int(boites[k, 0]), int(boites[k, 1]) - 30), cv2.FONT_HERSHEY_SIMPLEX, 0.5, BOX_COLOR, 2
+        )
+
+
+def dessiner_poses(annotated_frame, resultats):
+    """
+    Dessine les keypoints et affiche l'état des bras de chaque personne d'un ResultatsFrame.
+    
+    Les keypoints de toutes les personnes sont tracés en une seule passe (rendu.dessiner_keypoints).
+    Les personnes suivies (ids_pistes >= 0) sont étiquetées par leur identifiant stable.
+    """
+    all_keypoints = resultats.keypoints # [P, 17, 3]
+    ids_pistes = resultats.ids_pistes
+    text_y_start = 50 
+    person_count = 0
+
+    if all_keypoints.shape[0] == 0:
+        return
+
+    # --- Dessiner les keypoints (confiance > 0.5) ---
+    rendu.dessiner_keypoints(annotated_frame, all_keypoints, KEYPOINT_COLOR, KEYPOINT_RADIUS, seuil_confiance=0.5)
+
+    # Logique de bras vectorisée pour toutes les personnes
+    bras_gauche, bras_droit, _ = analyser_postures_batch(all_keypoints, seuil_y=10)
+    
+    # --- Afficher l'état du bras (Texte), seulement pour les personnes concernées ---
+    for i in np.flatnonzero(bras_gauche | bras_droit):
+        bras_droit_leve = bras_droit[i]
+        bras_gauche_leve = bras_gauche[i]
+        
+        if bras_droit_leve and bras_gauche_leve:
+            message = "Bras Droit & Gauche Leve!"
+        elif bras_droit_leve:
+            message = "Bras Droit Leve!"
+        else:
+            message = "Bras Gauche Leve!"
+        
+        color = (0, 0, 255) # Rouge
+        pose_id = ids_pistes[i] if ids_pistes[i] >= 0 else i + 1
+        cv2.putText(
+            annotated_frame, f"Pose {pose_id}: {message}", 
+            (50, text_y_start + person_count * 30), 
+            cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2
+        )
+        person_count += 1
+
+
+def dessiner_resultats(annotated_frame, resultats):
+    """Dessine visages, détections et poses d'un ResultatsFrame."""
+    dessiner_visages(annotated_frame, resultats)
+    dessiner_detections(annotated_frame, resultats)
+    # Traitement des résultats de Pose (Keypoints et Logique Bras Levé)
+    dessiner_poses(annotated_frame, resultats)
+
+
+def dessiner_texte_fps(annotated_frame, fps_text):
+    """Affiche le texte du FPS en haut à droite de la frame."""
+    cv2.putText(
+        annotated_frame, fps_text, 
+        (annotated_frame.shape[1] - 150, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2
+    )
+
+
+def dessiner_texte_chargement(annotated_frame, en_cours):
+    """Indique, pendant le démarrage, les chargements encore en cours (frames non analysées)."""
+    cv2.putText(
+        annotated_frame, f"Chargement : {', '.join(en_cours) or 'finalisation'}...",
+        (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 165, 255), 2
+    )
+
+
+def run_pose_estimation_webcam_avec_detection(model_pose_path, model_detect_path):
+    """
+    Exécute la détection de pose, la détection d'objets (YOLO) et la reconnaissance faciale (Haar/LBPH).
+    """
+    
+    demarrage = Demarrage()
+
+    # 1. Modèles et base de données faciale chargés en tâche de fond : la webcam s'ouvre
+    # et les frames s'affichent (sans analyse) pendant ce temps
+    print("\n--- Chargement des modèles (en tâche de fond) ---")
+
+    def charger_modeles():
+        with demarrage.etape("import_ultralytics"):
+            test1.importer_ultralytics()
+        with demarrage.etape("modele_pose"):
+            model_pose = test1.charger_modele(model_pose_path, task="pose")
+        with demarrage.etape("modele_detect"):
+            model_detect = test1.charger_modele(model_detect_path, task="detect")
+        return model_pose, model_detect
+
+    def charger_visages():
+        # Charger le classifieur Haar Cascade
+        with demarrage.etape("haar_cascade"):
+            haar_cascade = reconnaissance_faciale.charger_haarcascade(
+                reconnaissance_faciale.HAAR_CASCADE_PATH
+            )
+        # Préparer et entraîner (ou relire du cache) le modèle de reconnaissance faciale
+        with demarrage.etape("base_visages"):
+            import identification_embeddings
+            backend_visages = identification_embeddings.preparer_backend(
+                reconnaissance_faciale.DATABASE_FOLDER, BACKEND_IDENTIFICATION,
+                dossier_store=reconnaissance_faciale.DOSSIER_STORE_VISAGES
+            )
+        return haar_cascade, backend_visages
+
+    demarrage.lancer("modeles", charger_modeles)
+    demarrage.lancer("visages", charger_visages)
+
+    # Disponibles au fil du démarrage
+    model_pose = model_detect = None
+    haar_cascade, backend_visages = None, None
+    visages_prets = False
+    rapport_affiche = False
+
+    # 2. Ouvrir la capture vidéo (Webcam)
+    with demarrage.etape("ouverture_capture"):
+        cap = cv2.VideoCapture(0) 
+
+    if not cap.isOpened():
+        print("Erreur : Impossible d'ouvrir la webcam (index 0).")
+        return
+
+    # Initialisation pour le FPS
+    fps_start_time = time.time()
+    fps_frame_count = 0
+    fps_text = "FPS: N/A"
+
+    # Tracker : identifiants stables des personnes d'une frame à l'autre
+    suivi_personnes = suivi.SuiviMultiObjets()
+
+    # Cache des identités par piste : LBPH n'est relancé qu'à expiration ou si la piste change
+    cache_identites = reconnaissance_faciale.CacheIdentitesPistes()
+
+    recherche_visages = None
+    if RECHERCHE_VISAGES_GUIDEE:
+        recherche_visages = reconnaissance_faciale.RechercheVisagesGuidee(PERIODE_SCAN_COMPLET_VISAGES)
+
+    tuilage = None
+    if INFERENCE_TUILEE:
+        from tuilage import Tuilage
+        tuilage = Tuilage(zone_lointaine=ZONE_LOINTAINE, taille_lointaine=TAILLE_TUILES_LOINTAINES)
+
+    porte = None
+    if PORTE_MOUVEMENT_ACTIVE:
+        porte = PorteMouvement(sensibilite=SENSIBILITE_MOUVEMENT, age_max=AGE_MAX_REUTILISATION)
+    # Derniers résultats d'inférence, réutilisés quand la porte de mouvement ne s'ouvre pas
+    resultats = ResultatsFrame()
+
+    enregistreur = None
+    if ENREGISTREMENT:
+        from enregistrement import EnregistreurResultats
+        enregistreur = EnregistreurResultats(
+            ENREGISTREMENT, source="webcam 0", fps=cap.get(cv2.CAP_PROP_FPS) or None,
+            taille_frame=(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        )
+    index_frame = 0
+
+    comportements = None
+    if ANALYSE_COMPORTEMENTS:
+        from comportement import AnalyseComportements, EcrivainEvenements
+        comportements = AnalyseComportements(EcrivainEvenements(FICHIER_EVENEMENTS) if FICHIER_EVENEMENTS else None)
+
+    occupation = None
+    if PLAN_PLACES:
+        import places
+        carte_places = places.charger_plan(PLAN_PLACES)
+        if carte_places is not None:
+            occupation = places.OccupationPlaces(carte_places)
+
+    # Serveur de métriques seulement si l'instrumentation est demandée (elle reste ensuite activable à chaud)
+    if METRIQUES_ACTIVES or TRACE_METRIQUES:
+        metriques.demarrer_serveur(PORT_METRIQUES)
+    if METRIQUES_ACTIVES:
+        metriques.METRIQUES.activer()
+    if TRACE_METRIQUES:
+        metriques.METRIQUES.activer_trace(TRACE_METRIQUES)
+
+    # Affichage découplé de l'analyse : au plus FREQUENCE_AFFICHAGE_MAX images/s, aucun sans écran
+    affichage = rendu.AffichageLimite("Multi-Model Vision", FREQUENCE_AFFICHAGE_MAX, AFFICHAGE_ACTIF)
+
+    # 3. Boucle de traitement des frames
+    print(f"\nDémarrage de la détection. {'Appuyez sur q' if AFFICHAGE_ACTIF else 'Ctrl+C'} pour quitter.")
+    try:
+        while cap.isOpened():
+            success, frame = cap.read()
+            
+            if success:
+                debut_frame = time.perf_counter()
+                demarrage.marquer("premiere_frame")
+                # Copie et dessin seulement si une image doit être affichée (cadence limitée, ou jamais sans écran)
+                annotated_frame = affichage.preparer(frame) if affichage.doit_afficher() else None
+                
+                # Récupération des chargements de fond dès qu'ils sont terminés
+                if model_pose is None and demarrage.pret("modeles"):
+                    model_pose, model_detect = demarrage.resultat("modeles") or (None, None)
+                    if model_pose is None:
+                        print("ERREUR CRITIQUE: Modèle de pose manquant. Arrêt.")
+                        break
+                if not visages_prets and demarrage.pret("visages"):
+                    visages_prets = True
+                    haar_cascade, backend_visages = demarrage.resultat("visages") or (None, None)
+                    if haar_cascade is None or backend_visages is None:
+                        print("ATTENTION: La reconnaissance faciale est désactivée (Haar Cascade ou DB non prêt).")
+                analyse_prete = model_pose is not None
+                
+                if analyse_prete:
+                    with metriques.chronometre("porte_mouvement"):
+                        relancer = porte is None or porte.evaluer(frame)
+                else:
+                    # Mode dégradé : frame affichée sans analyse en attendant les modèles
+                    relancer = False
+                    if annotated_frame is not None:
+                        dessiner_texte_chargement(annotated_frame, demarrage.en_cours())
+                
+                if relancer:
+                    # --- 0. Inférence du Modèle de Pose et Tracking ---
+                    # (les keypoints guident la recherche de visages, les pistes portent le cache d'identités)
+                    if tuilage is not None:
+                        results_pose = test1.executer_inference_tuilee(model_pose, frame, tuilage)
+                    else:
+                        results_pose = test1.executer_inference_frame(model_pose, frame)
+                    with metriques.chronometre("copie_cpu"):
+                        resultats = ResultatsFrame.depuis_results(results_pose)
+                    with metriques.chronometre("suivi"):
+                        resultats.ids_pistes = suivi_personnes.mettre_a_jour(resultats.boites, resultats.keypoints)
+                    
+                    # --- 1. Reconnaissance Faciale (Haar + LBPH) ---
+                    if haar_cascade and backend_visages is not None:
+                        resultats.definir_visages(*reconnaissance_faciale.detecter_et_identifier_visages_tableaux(
+                            frame, haar_cascade,
+                            recherche_guidee=recherche_visages,
+                            keypoints=resultats.keypoints,
+                            cache_identites=cache_identites,
+                            ids_pistes=resultats.ids_pistes,
+                            boites_pistes=resultats.boites,
+                            backend=backend_visages
+                        ))
+                    
+                    # --- 2. Inférence Modèle de Détection YOLO (Personnes/Objets) ---
+                    if model_detect:
+                        with metriques.chronometre("copie_cpu"):
+                            resultats.definir_objets(*extraire_boites(test1.executer_inference_frame(model_detect, frame)))
+                    demarrage.marquer("premiere_frame_analysee")
+                elif analyse_prete:
+                    # Scène immobile : les résultats précédents restent valables tels quels
+                    metriques.incrementer("frames_reutilisees")
+                
+                if enregistreur is not None and analyse_prete:
+                    with metriques.chronometre("enregistrement"):
+                        enregistreur.ecrire(resultats, index_frame, time.time())
+                evenements = []
+                if comportements is not None and analyse_prete:
+                    with metriques.chronometre("comportements"):
+                        evenements = comportements.mettre_a_jour(resultats, time.time(), index_frame)
+                if occupation is not None and analyse_prete:
+                    with metriques.chronometre("places"):
+                        occupation.mettre_a_jour(resultats, time.time(), evenements, (frame.shape[1], frame.shape[0]))
+                    if annotated_frame is not None:
+                        occupation.dessiner(annotated_frame)
+                index_frame += 1
+                
+                metriques.jauge("personnes", len(resultats))
+                metriques.jauge("visages", resultats.visages_boites.shape[0])
+                metriques.jauge("cache_identites_hits", cache_identites.nb_hits)
+                metriques.jauge("cache_identites_misses", cache_identites.nb_misses)
+                
+                # 5. Calcul et affichage du FPS 
+                fps_frame_count += 1
+                if time.time() - fps_start_time >= 1.0: 
+                    fps = fps_frame_count / (time.time() - fps_start_time)
+                    fps_text = f"FPS: {fps:.2f}"
+                    fps_start_time = time.time()
+                    fps_frame_count = 0
+
+                # 6. Dessin des résultats (nouveaux ou réutilisés) et affichage, à la cadence d'affichage
+                quitter = False
+                if annotated_frame is not None:
+                    with metriques.chronometre("dessin"):
+                        dessiner_resultats(annotated_frame, resultats)
+                        dessiner_texte_fps(annotated_frame, fps_text)
+                    with metriques.chronometre("affichage"):
+                        quitter = affichage.afficher(annotated_frame)
+                metriques.observer("frame", time.perf_counter() - debut_frame)
+                
+                if not rapport_affiche and not demarrage.en_cours() and "premiere_frame_analysee" in demarrage.etapes:
+                    print(demarrage.rapport())
+                    demarrage.publier()
+                    rapport_affiche = True
+                
+                # 7. Quitter la boucle
+                if quitter:
+                    break
+            else:
+                print("Erreur : Frame vide reçue.")
+                break
+    except KeyboardInterrupt: # Arrêt des postes sans écran
+        print("Interruption demandée (Ctrl+C).")
+
+    # 8. Libérer les ressources
+    cap.release()
+    if not rapport_affiche:
+        print(demarrage.rapport())
+    if enregistreur is not None:
+        enregistreur.fermer()
+        print(f"Enregistrement : {enregistreur.nb_frames} frames dans {ENREGISTREMENT}")
+    if comportements is not None:
+        comportements.terminer(time.time(), index_frame)
+        if comportements.ecrivain is not None:
+            comportements.ecrivain.fermer()
+        for eleve, total in comportements.agregats_par_eleve().items():
+            print(
+                f"{eleve} : {total['nb_mains_levees']} main(s) levée(s), "
+                f"levé {total['nb_leves']} fois ({total['duree_debout']:.0f} s debout)"
+            )
+    if occupation is not None:
+        for place in occupation.bilan():
+            if place["nb_occupants"]:
+                print(
+                    f"Place {place['place']} ({place['identite'] or 'non identifié'}) : occupée {place['duree_occupee']:.0f} s, "
+                    f"{place['nb_mains_levees']} main(s) levée(s), {place['nb_leves']} lever(s)"
+                )
+        print(f"Places vides en fin de séance : {', '.join(occupation.places_vides()) or 'aucune'}")
+    metriques.METRIQUES.desactiver_trace()
+    affichage.fermer()
+    print(
+        f"Cache d'identités : {cache_identites.nb_hits} hits, {cache_identites.nb_misses} misses "
+        f"({cache_identites.taux_hits():.0%})"
+    )
+    if porte is not None:
+        print(f"Porte de mouvement : {porte.taux_reutilisation():.0%} des frames ont réutilisé les résultats précédents")
+    print("Programme terminé.")
+
+
+if __name__ == "__main__":
+    # IMPORTANT: Remplacer ceci par le chemin réel de vos modèles YOLO
+    MODEL_POSE_PATH = 'yolo11m-pose.pt' 
+    MODEL_DETECT_PATH = 'yolov8n.pt' 
+    
+    # Note: Les chemins des fichiers de reconnaissance faciale sont dans 'reconnaissance_faciale.py'
+
+
+    run_pose_estimation_webcam_avec_detection(MODEL_POSE_PATH, MODEL_DETECT_PATH)